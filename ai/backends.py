@@ -0,0 +1,332 @@
+# ai/backends.py
+
+"""
+추론 백엔드 (PyTorch / ONNX Runtime / OpenVINO)
+
+GPU 가 없는 엣지 장비에서는 ultralytics 의 PyTorch 경로보다 ONNX Runtime 이나 OpenVINO 가 CPU 에서 훨씬 빠릅니다.
+모든 백엔드는 같은 인터페이스를 제공합니다.
+  backend = load_backend("onnx", "yolov8n.pt")     # .pt 를 주면 같은 폴더에 ONNX 로 변환해 재사용
+  dets = backend([img1, img2])                      # BGR 이미지 목록 → Detections 목록 (입력 순서)
+  dets[0].xywhn, dets[0].conf, dets[0].cls          # 정규화 xywh(중심), 신뢰도, 클래스 ID (NumPy)
+  backend.names                                     # {클래스 ID: 이름}
+  backend.last_timing                               # 직전 호출의 단계별 시간 (ms): preprocess / infer / postprocess
+
+환경 변수: AI_BACKEND=torch|onnx|openvino, AI_INT8=1 (INT8 양자화 모델 사용), AI_THREADS (CPU 스레드 수)
+선택 의존성: onnxruntime (onnx), openvino (openvino). 필요한 백엔드를 쓸 때만 import 합니다.
+
+모델 변환만 미리 해 두려면:
+  python ai/backends.py export --model yolov8n.pt --format onnx [--int8] [--imgsz 640]
+"""
+
+import argparse                             # export 명령행
+import ast                                  # ONNX 메타데이터의 names(dict 문자열) 파싱
+import os                                   # 경로/환경 변수
+import time                                 # 워밍업 시간 측정
+
+import cv2                                  # 레터박스 리사이즈
+import numpy as np                          # 전처리 버퍼 / 후처리(NMS)
+
+BACKEND = os.getenv("AI_BACKEND", "torch")
+INT8 = os.getenv("AI_INT8", "0") == "1"
+THREADS = int(os.getenv("AI_THREADS", "0"))         # 0 = 런타임 기본값 (물리 코어 수)
+
+
+class Detections:
+    """프레임 1장의 탐지 결과 (백엔드 공통)."""
+    __slots__ = ("xywhn", "conf", "cls")
+
+    def __init__(self, xywhn: np.ndarray, conf: np.ndarray, cls: np.ndarray):
+        self.xywhn = xywhn                          # (N,4) 정규화 중심 xywh
+        self.conf = conf                            # (N,)
+        self.cls = cls                              # (N,) int
+
+    def __len__(self):
+        return len(self.conf)
+
+    @staticmethod
+    def empty() -> "Detections":
+        return Detections(np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int64))
+
+
+# ───────────────────────────────────────────────
+# PyTorch (ultralytics) — 기존 경로
+# ───────────────────────────────────────────────
+class TorchBackend:
+    name = "torch"
+
+    def __init__(self, model_path: str, imgsz: int = 640, conf: float = 0.25):
+        from ultralytics import YOLO
+        if THREADS:
+            import torch
+            torch.set_num_threads(THREADS)
+        self.model = YOLO(model_path)
+        self.names = self.model.names
+        self.imgsz = imgsz
+        self.conf = conf
+        self.last_timing = {}
+
+    def __call__(self, images: list) -> list:
+        results = self.model(images, imgsz=self.imgsz, conf=self.conf, verbose=False)
+        # ultralytics 는 결과마다 이미지당 평균 단계 시간(ms)을 기록 → 배치 합계로 환산
+        speed = (getattr(results[0], "speed", None) or {}) if results else {}
+        n = len(results)
+        self.last_timing = {"preprocess": speed.get("preprocess", 0.0) * n, "infer": speed.get("inference", 0.0) * n,
+                            "postprocess": speed.get("postprocess", 0.0) * n}
+        out = []
+        for r in results:
+            b = r.boxes
+            if b is None or len(b) == 0:
+                out.append(Detections.empty())
+                continue
+            out.append(Detections(b.xywhn.cpu().numpy(), b.conf.cpu().numpy(), b.cls.cpu().numpy().astype(np.int64)))
+        return out
+
+
+# ───────────────────────────────────────────────
+# ONNX Runtime / OpenVINO 공통: 전처리(버퍼 재사용) + YOLOv8 출력 후처리
+# ───────────────────────────────────────────────
+class _ExportedBackend:
+    """
+    YOLOv8 내보내기 모델 공통 처리.
+     - 전처리: 레터박스 캔버스(uint8)와 입력 텐서(float32, N×3×S×S)를 배치 크기별로 한 번만 할당하고 재사용
+     - 후처리: (N, 4+C, A) 출력 → 신뢰도 필터 → 클래스별 NMS(NumPy) → 원본 기준 정규화 xywh
+    """
+
+    def __init__(self, imgsz: int = 640, conf: float = 0.25, iou: float = 0.45, max_det: int = 300):
+        self.imgsz = imgsz
+        self.conf = conf
+        self.iou = iou
+        self.max_det = max_det
+        self._canvas = np.full((imgsz, imgsz, 3), 114, np.uint8)
+        self._blobs = {}                            # 배치 크기 → 입력 텐서 버퍼
+        self.batch_fixed = None                     # 모델 입력 배치가 고정이면 그 크기 (1 등)
+        self.last_timing = {}                       # 직전 호출의 단계별 시간 (ms)
+
+    def _blob(self, n: int) -> np.ndarray:
+        blob = self._blobs.get(n)
+        if blob is None:
+            blob = self._blobs[n] = np.empty((n, 3, self.imgsz, self.imgsz), np.float32)
+        return blob
+
+    def _preprocess(self, images: list):
+        """레터박스 + BGR→RGB + HWC→CHW + 1/255 정규화를 미리 할당한 버퍼에 기록."""
+        s = self.imgsz
+        blob = self._blob(len(images))
+        metas = []
+        canvas = self._canvas
+        for i, img in enumerate(images):
+            h, w = img.shape[:2]
+            r = min(s / h, s / w)
+            nw, nh = int(round(w * r)), int(round(h * r))
+            left, top = (s - nw) // 2, (s - nh) // 2
+            canvas.fill(114)
+            canvas[top:top + nh, left:left + nw] = cv2.resize(img, (nw, nh), interpolation=cv2.INTER_LINEAR) if (nw, nh) != (w, h) else img
+            np.multiply(canvas[..., ::-1].transpose(2, 0, 1), 1.0 / 255.0, out=blob[i], casting="unsafe")
+            metas.append((r, left, top, w, h))
+        return blob, metas
+
+    def _postprocess(self, pred: np.ndarray, meta) -> Detections:
+        """pred: (4+C, A) 한 장 분량."""
+        r, left, top, w, h = meta
+        scores = pred[4:]
+        cls = scores.argmax(0)
+        conf = scores[cls, np.arange(scores.shape[1])]
+        keep = conf >= self.conf
+        if not keep.any():
+            return Detections.empty()
+        boxes = pred[:4, keep].T                    # 입력 좌표 중심 xywh
+        conf, cls = conf[keep], cls[keep]
+        idx = _nms(boxes, conf, cls, self.iou, self.max_det)
+        boxes, conf, cls = boxes[idx], conf[idx], cls[idx]
+        # 레터박스 복원 → 원본 픽셀 → 정규화
+        xywhn = np.empty_like(boxes)
+        xywhn[:, 0] = (boxes[:, 0] - left) / r / w
+        xywhn[:, 1] = (boxes[:, 1] - top) / r / h
+        xywhn[:, 2] = boxes[:, 2] / r / w
+        xywhn[:, 3] = boxes[:, 3] / r / h
+        return Detections(np.clip(xywhn, 0.0, 1.0), conf.astype(np.float32), cls.astype(np.int64))
+
+    def _run(self, blob: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def __call__(self, images: list) -> list:
+        if not images:
+            return []
+        if self.batch_fixed and len(images) != self.batch_fixed:
+            # 고정 배치 모델(dynamic=False 로 내보낸 경우): 나눠서 실행
+            # 마지막 조각이 모자라면 마지막 이미지로 채우고 결과는 잘라냄
+            out, total = [], {"preprocess": 0.0, "infer": 0.0, "postprocess": 0.0}
+            for i in range(0, len(images), self.batch_fixed):
+                chunk = images[i:i + self.batch_fixed]
+                n = len(chunk)
+                out.extend(self(chunk + [chunk[-1]] * (self.batch_fixed - n))[:n])
+                for k, v in self.last_timing.items():
+                    total[k] += v
+            self.last_timing = total
+            return out
+        t0 = time.perf_counter()
+        blob, metas = self._preprocess(images)
+        t1 = time.perf_counter()
+        pred = self._run(blob)
+        t2 = time.perf_counter()
+        out = [self._postprocess(pred[i], m) for i, m in enumerate(metas)]
+        t3 = time.perf_counter()
+        self.last_timing = {"preprocess": (t1 - t0) * 1000, "infer": (t2 - t1) * 1000, "postprocess": (t3 - t2) * 1000}
+        return out
+
+    def warmup(self, n: int = 2):
+        dummy = np.zeros((self.imgsz, self.imgsz, 3), np.uint8)
+        t = time.monotonic()
+        for _ in range(n):
+            self([dummy])
+        print(f"[AI] {self.name} warmup {(time.monotonic() - t) * 1000 / n:.1f} ms/frame")
+
+
+def _nms(boxes: np.ndarray, conf: np.ndarray, cls: np.ndarray, iou_thr: float, max_det: int) -> np.ndarray:
+    """클래스별 NMS (클래스마다 좌표를 멀리 띄워 한 번에 처리)."""
+    offset = cls[:, None] * 4096.0
+    x1y1 = boxes[:, :2] - boxes[:, 2:] / 2 + offset
+    x2y2 = boxes[:, :2] + boxes[:, 2:] / 2 + offset
+    area = boxes[:, 2] * boxes[:, 3]
+    order = conf.argsort()[::-1]
+    keep = []
+    while order.size and len(keep) < max_det:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        wh = np.clip(np.minimum(x2y2[i], x2y2[rest]) - np.maximum(x1y1[i], x1y1[rest]), 0, None)
+        inter = wh[:, 0] * wh[:, 1]
+        order = rest[inter / (area[i] + area[rest] - inter + 1e-9) <= iou_thr]
+    return np.array(keep, dtype=np.int64)
+
+
+def _names_from_meta(value) -> dict:
+    names = ast.literal_eval(value) if isinstance(value, str) else value
+    return {int(k): str(v) for k, v in names.items()}
+
+
+class OnnxBackend(_ExportedBackend):
+    name = "onnx"
+
+    def __init__(self, onnx_path: str, imgsz: int = 640, conf: float = 0.25):
+        super().__init__(imgsz, conf)
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError("AI_BACKEND=onnx requires `pip install onnxruntime`") from e
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if THREADS:
+            opts.intra_op_num_threads = THREADS
+        self.session = ort.InferenceSession(onnx_path, opts, providers=["CPUExecutionProvider"])
+        inp = self.session.get_inputs()[0]
+        self.input_name = inp.name
+        self.batch_fixed = inp.shape[0] if isinstance(inp.shape[0], int) else None
+        meta = self.session.get_modelmeta().custom_metadata_map
+        self.names = _names_from_meta(meta["names"]) if "names" in meta else {}
+
+    def _run(self, blob):
+        return self.session.run(None, {self.input_name: blob})[0]
+
+
+class OpenVinoBackend(_ExportedBackend):
+    name = "openvino"
+
+    def __init__(self, model_path: str, imgsz: int = 640, conf: float = 0.25):
+        super().__init__(imgsz, conf)
+        try:
+            import openvino as ov
+        except ImportError as e:
+            raise RuntimeError("AI_BACKEND=openvino requires `pip install openvino`") from e
+        core = ov.Core()
+        config = {"PERFORMANCE_HINT": "LATENCY"}
+        if THREADS:
+            config["INFERENCE_NUM_THREADS"] = THREADS
+        model = core.read_model(model_path)
+        shape = model.inputs[0].get_partial_shape()
+        self.batch_fixed = shape[0].get_length() if shape[0].is_static else None
+        self.compiled = core.compile_model(model, "CPU", config)
+        self.request = self.compiled.create_infer_request()
+        self.names = self._read_names(model, model_path)
+
+    @staticmethod
+    def _read_names(model, model_path: str) -> dict:
+        # ultralytics openvino 내보내기는 rt_info 또는 같은 폴더의 metadata.yaml 에 names 를 기록
+        try:
+            return _names_from_meta(model.get_rt_info(["model_info", "names"]).astype(str))
+        except Exception:
+            pass
+        meta_yaml = os.path.join(os.path.dirname(model_path), "metadata.yaml")
+        if os.path.exists(meta_yaml):
+            import yaml
+            with open(meta_yaml, encoding="utf-8") as f:
+                return _names_from_meta(yaml.safe_load(f)["names"])
+        return {}
+
+    def _run(self, blob):
+        self.request.infer({0: blob})
+        return self.request.get_output_tensor(0).data
+
+
+# ───────────────────────────────────────────────
+# 모델 변환 / 로딩
+# ───────────────────────────────────────────────
+def export_model(model_path: str, fmt: str = "onnx", int8: bool = False, imgsz: int = 640) -> str:
+    """
+    .pt → ONNX / OpenVINO 변환 (이미 있으면 재사용). 변환된 모델 경로를 반환.
+     - onnx + int8 : onnxruntime 동적 양자화 (가중치 INT8, 보정 데이터 불필요) → *.int8.onnx
+     - openvino + int8 : ultralytics(NNCF) 보정 기반 양자화
+    배치 추론(multi_stream_infer)을 위해 입력 배치 차원은 동적으로 내보냅니다.
+    """
+    stem = os.path.splitext(model_path)[0]
+    if fmt == "onnx":
+        onnx_path = stem + ".onnx"
+        if not os.path.exists(onnx_path):
+            from ultralytics import YOLO
+            onnx_path = YOLO(model_path).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+        if not int8:
+            return onnx_path
+        q_path = stem + ".int8.onnx"
+        if not os.path.exists(q_path):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            quantize_dynamic(onnx_path, q_path, weight_type=QuantType.QUInt8)
+        return q_path
+    if fmt == "openvino":
+        out_dir = stem + ("_int8" if int8 else "") + "_openvino_model"
+        xml = os.path.join(out_dir, os.path.basename(stem) + ".xml")
+        if not os.path.exists(xml):
+            from ultralytics import YOLO
+            out_dir = YOLO(model_path).export(format="openvino", imgsz=imgsz, dynamic=True, int8=int8)
+            xml = os.path.join(out_dir, os.path.basename(stem) + ".xml")
+        return xml
+    raise ValueError(f"unknown export format: {fmt}")
+
+
+def load_backend(kind: str = BACKEND, model_path: str = "yolov8n.pt", imgsz: int = 640,
+                 conf: float = 0.25, int8: bool = INT8):
+    """kind 에 맞는 백엔드를 만든다. 내보내기 백엔드에 .pt 를 주면 자동 변환."""
+    if kind == "torch":
+        return TorchBackend(model_path, imgsz, conf)
+    if kind == "onnx":
+        path = export_model(model_path, "onnx", int8, imgsz) if model_path.endswith(".pt") else model_path
+        backend = OnnxBackend(path, imgsz, conf)
+    elif kind == "openvino":
+        path = export_model(model_path, "openvino", int8, imgsz) if model_path.endswith(".pt") else model_path
+        backend = OpenVinoBackend(path, imgsz, conf)
+    else:
+        raise ValueError(f"unknown AI_BACKEND: {kind} (torch|onnx|openvino)")
+    print(f"[AI] Backend {kind} loaded from {path}")
+    backend.warmup()
+    return backend
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export YOLO weights for CPU backends")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    ex = sub.add_parser("export")
+    ex.add_argument("--model", default="yolov8n.pt")
+    ex.add_argument("--format", choices=["onnx", "openvino"], default="onnx")
+    ex.add_argument("--int8", action="store_true")
+    ex.add_argument("--imgsz", type=int, default=640)
+    args = parser.parse_args()
+    print(export_model(args.model, args.format, args.int8, args.imgsz))
@@ -0,0 +1,268 @@
+# ai/bench_infer.py
+
+"""
+오프라인 추론 벤치마크 (실제 스트림/서버 없이 탐지 파이프라인 측정)
+
+합성 프레임(또는 로컬 영상 파일)을 실제 파이프라인과 같은 순서로 처리합니다.
+  decode → preprocess → infer → postprocess → track → publish
+publish 는 로컬 스텁 /detections/push_batch 서버로 보냅니다.
+백엔드 × 배치 크기 × 입력 크기(imgsz) × 원본 해상도 조합마다 다음을 측정합니다.
+  - 처리 FPS
+  - 단계별 지연 (배치당 p50/p95, 프레임당 평균)
+  - 메모리 (RSS, 최대 RSS)
+결과는 릴리스 간 비교를 위해 JSON 으로 저장합니다.
+
+사용 예:
+  python ai/bench_infer.py --backends torch,onnx --batch 1,4 --imgsz 320,640 --frames 200
+  python ai/bench_infer.py --source video.mp4 --backends onnx --out bench/onnx.json
+"""
+
+import argparse                             # 명령행 인자
+import json                                 # 결과 저장 / 스텁 서버 요청 파싱
+import os                                   # RSS 측정, 경로
+import platform                             # 실행 환경 기록
+import resource                             # 최대 RSS
+import subprocess                           # git 커밋 기록
+import threading                            # 스텁 서버 스레드
+import time                                 # 단계별 시간 측정
+from datetime import datetime, timezone     # 결과 타임스탬프
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # 스텁 탐지 엔드포인트
+
+import cv2                                  # JPEG 인코딩/디코딩, 영상 파일 읽기
+import numpy as np                          # 합성 프레임 / 통계
+
+from backends import load_backend           # 추론 백엔드
+from detection_publisher import DetectionPublisher  # 백그라운드 일괄 전송
+from frame_pipeline import Frame            # 캡처 시각 포함 프레임
+from tracker import Tracker, event_payloads  # 다중 객체 추적
+
+STAGES = ("decode", "preprocess", "infer", "postprocess", "track", "publish")
+
+
+# ───────────────────────────────────────────────
+# 스텁 /detections/push_batch
+# ───────────────────────────────────────────────
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"               # keep-alive (퍼블리셔 세션 재사용 확인)
+    received = 0
+    requests = 0
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        _StubHandler.requests += 1
+        _StubHandler.received += len(json.loads(body or b"[]"))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", "11")
+        self.end_headers()
+        self.wfile.write(b'{"ok": true}')
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_server() -> str:
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    threading.Thread(target=srv.serve_forever, name="stub-detections", daemon=True).start()
+    return f"http://127.0.0.1:{srv.server_address[1]}/detections/push_batch"
+
+
+# ───────────────────────────────────────────────
+# 프레임 소스
+# ───────────────────────────────────────────────
+def synthetic_jpegs(n: int, width: int, height: int, seed: int = 0) -> list:
+    """움직이는 사각형/원이 있는 합성 프레임을 JPEG 으로 미리 인코딩 (decode 단계를 실제처럼 측정)."""
+    rng = np.random.default_rng(seed)
+    base = np.zeros((height, width, 3), np.uint8)
+    base[:] = np.linspace(40, 160, width, dtype=np.uint8)[None, :, None]   # 배경 그라디언트
+    objs = [(rng.uniform(0.1, 0.9, 2), rng.uniform(-0.004, 0.004, 2), rng.uniform(0.05, 0.15)) for _ in range(8)]
+    out = []
+    for i in range(n):
+        img = base.copy()
+        for k, (pos, vel, size) in enumerate(objs):
+            cx, cy = (pos + vel * i) % 1.0
+            w, h = int(size * width * 0.5), int(size * height)
+            x, y = int(cx * width), int(cy * height)
+            color = tuple(int(c) for c in rng.integers(0, 255, 3)) if i == 0 else (60 + 20 * k, 200 - 15 * k, 120)
+            if k % 2:
+                cv2.rectangle(img, (x - w // 2, y - h // 2), (x + w // 2, y + h // 2), color, -1)
+            else:
+                cv2.circle(img, (x, y), max(h // 2, 2), color, -1)
+        ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 85])
+        out.append(buf)
+    return out
+
+
+def iter_frames(source: str, n: int, width: int, height: int):
+    """(decode_ms, BGR 이미지) 를 n 개 생성. 파일이 끝나면 처음부터 다시 읽음."""
+    if source == "synthetic":
+        jpegs = synthetic_jpegs(min(n, 300), width, height)
+        for i in range(n):
+            t = time.perf_counter()
+            img = cv2.imdecode(jpegs[i % len(jpegs)], cv2.IMREAD_COLOR)
+            yield (time.perf_counter() - t) * 1000, img
+        return
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise SystemExit(f"[bench] Unable to open {source}")
+    for _ in range(n):
+        t = time.perf_counter()
+        ret, img = cap.read()
+        if not ret:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, img = cap.read()
+        yield (time.perf_counter() - t) * 1000, img
+    cap.release()
+
+
+# ───────────────────────────────────────────────
+# 측정
+# ───────────────────────────────────────────────
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if platform.system() == "Darwin" else peak / 1024     # macOS 는 바이트, Linux 는 KB
+
+
+def _summary(values: list, frames: int) -> dict:
+    a = np.asarray(values, dtype=float)
+    if not a.size:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "per_frame_ms": 0.0}
+    return {"p50_ms": round(float(np.percentile(a, 50)), 3), "p95_ms": round(float(np.percentile(a, 95)), 3),
+            "per_frame_ms": round(float(a.sum()) / max(frames, 1), 3)}
+
+
+def run_config(backend, api: str, source: str, batch: int, width: int, height: int,
+               frames: int, warmup: int) -> dict:
+    """한 조합 실행. 단계 시간은 배치 단위로 기록 (decode/track/publish 는 배치 내 합)."""
+    tracker = Tracker()
+    publisher = DetectionPublisher(api)
+    stage = {k: [] for k in STAGES}
+    sent_before = _StubHandler.received
+    done = detections = events = 0
+    t_start = time.perf_counter() if warmup == 0 else None    # 측정 구간 시작 (워밍업 직후)
+    pending, decode_ms = [], 0.0
+
+    for i, (d_ms, img) in enumerate(iter_frames(source, frames + warmup * batch, width, height)):
+        pending.append(Frame(img, i + 1))
+        decode_ms += d_ms
+        if len(pending) < batch:
+            continue
+        dets = backend([f.image for f in pending])
+        timing = backend.last_timing
+        t = time.perf_counter()
+        payloads = []
+        for f, det in zip(pending, dets):
+            keep = det.conf >= 0.5
+            ev = tracker.update(det.xywhn[keep], det.conf[keep],
+                                [backend.names.get(int(c), str(int(c))) for c in det.cls[keep]], f.t_mono)
+            detections += int(keep.sum())
+            events += len(ev)
+            payloads.extend(event_payloads(ev, "bench", f))
+        t_track = time.perf_counter()
+        if payloads:
+            publisher.publish(payloads)
+        t_pub = time.perf_counter()
+
+        if i + 1 == warmup * batch:                 # 마지막 워밍업 배치 → 여기서부터 측정
+            t_start = time.perf_counter()
+        elif i + 1 > warmup * batch:
+            stage["decode"].append(decode_ms)
+            for k in ("preprocess", "infer", "postprocess"):
+                stage[k].append(timing.get(k, 0.0))
+            stage["track"].append((t_track - t) * 1000)
+            stage["publish"].append((t_pub - t_track) * 1000)
+            done += len(pending)
+        pending, decode_ms = [], 0.0
+
+    elapsed = time.perf_counter() - (t_start or time.perf_counter())
+    publisher.close()
+    return {
+        "frames": done,
+        "fps": round(done / max(elapsed, 1e-9), 2),
+        "stages": {k: _summary(v, done) for k, v in stage.items()},
+        "detections": detections,
+        "track_events": events,
+        "published": _StubHandler.received - sent_before,
+        "publisher": publisher.stats(),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except Exception:
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline YOLO inference pipeline benchmark")
+    parser.add_argument("--model", default="yolov8n.pt")
+    parser.add_argument("--backends", default="torch", help="comma list: torch,onnx,openvino")
+    parser.add_argument("--batch", default="1", help="comma list of batch sizes")
+    parser.add_argument("--imgsz", default="640", help="comma list of model input sizes")
+    parser.add_argument("--resolution", default="1280x720", help="comma list of synthetic source sizes WxH")
+    parser.add_argument("--source", default="synthetic", help="'synthetic' or a local video file")
+    parser.add_argument("--frames", type=int, default=200, help="measured frames per configuration")
+    parser.add_argument("--warmup", type=int, default=3, help="warmup batches per configuration (excluded)")
+    parser.add_argument("--int8", action="store_true", help="use INT8 models for onnx/openvino")
+    parser.add_argument("--out", default=None, help="JSON output path (default: bench_infer_<time>.json)")
+    args = parser.parse_args()
+
+    api = start_stub_server()
+    resolutions = [tuple(int(v) for v in r.lower().split("x")) for r in args.resolution.split(",")]
+    if args.source != "synthetic":
+        resolutions = [(0, 0)]                      # 파일 원본 해상도 사용
+    results = []
+    for kind in args.backends.split(","):
+        for imgsz in (int(v) for v in args.imgsz.split(",")):
+            rss0 = rss_mb()
+            backend = load_backend(kind, args.model, imgsz=imgsz, int8=args.int8)
+            model_mb = rss_mb() - rss0
+            for batch in (int(v) for v in args.batch.split(",")):
+                for w, h in resolutions:
+                    r = run_config(backend, api, args.source, batch, w, h, args.frames, args.warmup)
+                    r.update(backend=kind, int8=args.int8, imgsz=imgsz, batch=batch,
+                             resolution=f"{w}x{h}" if w else "source",
+                             rss_mb=round(rss_mb(), 1), peak_rss_mb=round(peak_rss_mb(), 1),
+                             model_rss_mb=round(model_mb, 1))
+                    results.append(r)
+                    st = r["stages"]
+                    print(f"[bench] {kind:8s} imgsz={imgsz:4d} batch={batch:2d} {r['resolution']:>9s} "
+                          f"{r['fps']:7.2f} fps | " + " ".join(f"{k}={st[k]['per_frame_ms']:.2f}" for k in STAGES)
+                          + f" ms/frame | rss {r['rss_mb']:.0f} MB")
+            del backend
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": git_commit(),
+            "host": platform.node(),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "model": args.model,
+            "source": args.source,
+            "frames": args.frames,
+        },
+        "results": results,
+    }
+    out = args.out or f"bench_infer_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"[bench] Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
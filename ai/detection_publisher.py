@@ -0,0 +1,95 @@
+# ai/detection_publisher.py
+
+"""
+탐지 결과 백그라운드 퍼블리셔
+
+추론 루프에서 박스마다 requests.post 를 호출하면 매번 TCP 연결을 새로 맺고,
+서버 응답을 기다리는 동안 추론이 멈춥니다. DetectionPublisher 는
+ - publish() : 큐에 넣고 즉시 반환 (추론 스레드는 네트워크를 절대 기다리지 않음)
+ - 전송 스레드: 짧은 시간 창(window_ms) 동안 모인 박스를 /detections/push_batch 한 번으로 전송
+ - requests.Session 으로 keep-alive 연결 재사용
+ - 큐가 가득 차면(서버 장애 등) 가장 오래된 탐지부터 버림 → 실시간 관제에는 최신 결과가 중요
+"""
+
+import queue                                # 추론 스레드 → 전송 스레드 전달용 큐
+import threading                            # 전송 스레드
+import time                                 # 시간 창 계산
+import requests                             # HTTP 세션 (keep-alive)
+
+
+class DetectionPublisher:
+
+    def __init__(self, api: str = "http://127.0.0.1:8000/detections/push_batch",
+                 window_ms: float = 50.0, max_batch: int = 200, max_queue: int = 5000, timeout: float = 3.0):
+        self.api = api
+        self.window = window_ms / 1000.0                    # 첫 탐지 이후 배치를 모으는 시간
+        self.max_batch = max_batch                          # 서버 PUSH_BATCH_LIMIT(500) 이하
+        self.timeout = timeout
+        self._q = queue.Queue(maxsize=max_queue)
+        self._session = requests.Session()
+        self._stop = threading.Event()
+        self.sent = 0                                       # 전송 성공한 탐지 수
+        self.requests = 0                                   # HTTP 요청 수
+        self.failed = 0                                     # 전송 실패로 버린 탐지 수
+        self.dropped = 0                                    # 큐 포화로 버린 탐지 수
+        self._thread = threading.Thread(target=self._run, name="detection-publisher", daemon=True)
+        self._thread.start()
+
+    def publish(self, payloads: list):
+        """탐지 목록을 전송 큐에 넣고 즉시 반환."""
+        for p in payloads:
+            while True:
+                try:
+                    self._q.put_nowait(p)
+                    break
+                except queue.Full:
+                    try:
+                        self._q.get_nowait()                # 가장 오래된 탐지 버림
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+
+    def _collect(self) -> list:
+        try:
+            batch = [self._q.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._q.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _send(self, batch: list):
+        try:
+            r = self._session.post(self.api, json=batch, timeout=self.timeout)
+            self.requests += 1
+            if r.status_code >= 400:
+                self.failed += len(batch)
+                print(f"[WARN] Detection batch rejected: {r.status_code} {r.text[:200]}")
+                return
+            self.sent += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            print(f"[WARN] Detection batch push failed ({len(batch)} items): {e}")
+
+    def _run(self):
+        while not (self._stop.is_set() and self._q.empty()):
+            batch = self._collect()
+            if batch:
+                self._send(batch)
+
+    def stats(self) -> dict:
+        return {"sent": self.sent, "requests": self.requests, "failed": self.failed,
+                "dropped": self.dropped, "queued": self._q.qsize()}
+
+    def close(self, timeout: float = 5.0):
+        """남은 탐지를 최대 timeout 초 동안 전송한 뒤 종료."""
+        self._stop.set()
+        self._thread.join(timeout=timeout)
+        self._session.close()
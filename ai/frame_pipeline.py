@@ -0,0 +1,221 @@
+# ai/frame_pipeline.py
+
+"""
+프레임 캡처 / 적응형 추론 스케줄링 유틸리티
+
+라이브 스트림(RTSP/HLS)에서 추론이 프레임 속도보다 느리면 디코더 버퍼가 쌓여
+탐지 결과가 실제보다 수 초씩 뒤처진다. 이를 막기 위해
+ - LatestFrameCapture : 별도 스레드가 계속 프레임을 읽고 "가장 최근 프레임 1장"만 보관
+ - AdaptiveScheduler  : 지연 예산(latency budget)을 기준으로 처리할 프레임을 고르고 나머지는 건너뜀
+ - LatencyStats       : 캡처 → 탐지 완료 지연(p50/p95/max), 처리 FPS, 건너뛴 프레임 수 집계
+"""
+
+import threading                            # 캡처 스레드 및 동기화
+import time                                 # 단조 시계(monotonic) 기반 지연 측정
+from collections import deque               # 최근 지연 샘플 보관용 고정 길이 큐
+from datetime import datetime, timezone     # 캡처 시각(UTC) 기록
+
+import cv2                                  # OpenCV: 비디오 I/O
+
+
+class Frame:
+    """캡처된 프레임과 캡처 시각 정보."""
+    __slots__ = ("image", "seq", "t_mono", "ts")
+
+    def __init__(self, image, seq: int):
+        self.image = image                              # BGR 이미지 (numpy 배열)
+        self.seq = seq                                  # 캡처 순번 (건너뛴 프레임 수 계산용)
+        self.t_mono = time.monotonic()                  # 지연 측정용 단조 시각
+        self.ts = datetime.now(timezone.utc)            # 서버 전송용 캡처 시각 (UTC)
+
+    def age_ms(self) -> float:
+        return (time.monotonic() - self.t_mono) * 1000.0
+
+
+def is_live_source(source) -> bool:
+    """RTSP/HLS/웹캠 등 실시간 소스 여부 (파일은 원래 속도로 재생해 실시간처럼 취급)."""
+    if isinstance(source, int) or str(source).isdigit():
+        return True
+    return str(source).lower().startswith(("rtsp://", "rtmp://", "http://", "https://", "udp://", "srt://"))
+
+
+class LatestFrameCapture:
+    """
+    캡처 전용 스레드. 디코딩은 쉬지 않고 진행하고 슬롯에는 최신 프레임 1장만 남긴다.
+    소비자가 가져가기 전에 덮어쓴 프레임은 dropped 로 센다.
+    파일 소스는 원본 FPS 에 맞춰 읽어 라이브 스트림과 같은 조건을 재현한다.
+    """
+
+    def __init__(self, source, reconnect_sec: float = 2.0, notify: threading.Event = None):
+        self.source = source
+        self.notify = notify                                # 여러 스트림을 한 루프에서 기다릴 때 공유 이벤트
+        self.live = is_live_source(source)
+        self.reconnect_sec = reconnect_sec
+        self.cap = self._open()
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0   # 원본 FPS (알 수 없으면 30)
+        self._cond = threading.Condition()
+        self._latest = None                                 # 최신 Frame
+        self._seq = 0
+        self.captured = 0                                   # 읽은 프레임 수
+        self.dropped = 0                                    # 소비 전에 덮어쓴 프레임 수
+        self.ended = False                                  # 파일 끝 또는 복구 불가
+        self._taken_seq = 0
+        self._thread = threading.Thread(target=self._run, name="capture", daemon=True)
+
+    def _open(self):
+        cap = cv2.VideoCapture(int(self.source) if str(self.source).isdigit() else self.source)
+        if self.live:
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)             # 백엔드가 지원하면 내부 버퍼 최소화
+        return cap
+
+    def is_opened(self) -> bool:
+        return self.cap.isOpened()
+
+    def start(self) -> "LatestFrameCapture":
+        self._thread.start()
+        return self
+
+    def _run(self):
+        interval = 1.0 / self.fps if not self.live else 0.0
+        next_t = time.monotonic()
+        while not self.ended:
+            ret, image = self.cap.read()
+            if not ret:
+                if not self.live:
+                    break                                   # 파일 끝
+                # 라이브 스트림 끊김 → 재연결
+                print(f"[AI] Stream read failed, reconnecting in {self.reconnect_sec}s")
+                self.cap.release()
+                time.sleep(self.reconnect_sec)
+                self.cap = self._open()
+                continue
+            self._seq += 1
+            self.captured += 1
+            frame = Frame(image, self._seq)
+            with self._cond:
+                if self._latest is not None and self._latest.seq > self._taken_seq:
+                    self.dropped += 1                       # 아무도 가져가지 않은 프레임을 덮어씀
+                self._latest = frame
+                self._cond.notify_all()
+            if self.notify is not None:
+                self.notify.set()
+            if interval:
+                next_t += interval
+                delay = next_t - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_t = time.monotonic()
+        with self._cond:
+            self.ended = True
+            self._cond.notify_all()
+        if self.notify is not None:
+            self.notify.set()
+
+    def read(self, after_seq: int = 0, timeout: float = 1.0):
+        """after_seq 보다 새로운 최신 프레임을 기다려 반환. 끝났거나 시간 초과면 None."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while (self._latest is None or self._latest.seq <= after_seq) and not self.ended:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            if self._latest is None or self._latest.seq <= after_seq:
+                return None
+            self._taken_seq = self._latest.seq
+            return self._latest
+
+    def poll(self, after_seq: int = 0):
+        """대기 없이 after_seq 보다 새로운 최신 프레임 (없으면 None)."""
+        with self._cond:
+            if self._latest is None or self._latest.seq <= after_seq:
+                return None
+            self._taken_seq = self._latest.seq
+            return self._latest
+
+    def stop(self):
+        self.ended = True
+        self._thread.join(timeout=2.0)
+        self.cap.release()
+
+
+class AdaptiveScheduler:
+    """
+    지연 예산 기반 프레임 선택.
+     - 추론 시간을 EWMA 로 추정하고, (프레임 나이 + 예상 추론 시간) 이 예산을 넘는 프레임은
+       처리하지 않고 다음 최신 프레임을 기다린다 (정체 직후 쌓인 낡은 프레임 제거).
+     - 추론 자체가 예산보다 길면 어떤 프레임도 예산을 지킬 수 없으므로 최신 프레임을 그대로 처리(over_budget).
+     - max_fps 를 주면 추론 간 최소 간격을 둬서 CPU 를 다른 작업(전송 등)에 남긴다.
+    """
+
+    def __init__(self, budget_ms: float = 300.0, max_fps: float = 0.0, alpha: float = 0.2):
+        self.budget_ms = budget_ms
+        self.min_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.alpha = alpha
+        self.infer_ms = None                # 추론 시간 EWMA
+        self.skipped_stale = 0              # 예산 초과로 건너뛴 프레임 수
+        self.over_budget = 0                # 추론 자체가 예산을 넘은 횟수
+        self._last_start = 0.0
+
+    def accept(self, frame: Frame) -> bool:
+        est = self.infer_ms or 0.0
+        if est >= self.budget_ms:
+            self.over_budget += 1
+            return True
+        if frame.age_ms() + est > self.budget_ms:
+            self.skipped_stale += 1
+            return False
+        return True
+
+    def wait_slot(self):
+        """max_fps 제한: 직전 추론 시작 후 min_interval 이 지날 때까지 대기."""
+        if self.min_interval:
+            delay = self._last_start + self.min_interval - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        self._last_start = time.monotonic()
+
+    def observe(self, infer_ms: float):
+        self.infer_ms = infer_ms if self.infer_ms is None else self.alpha * infer_ms + (1 - self.alpha) * self.infer_ms
+
+
+class LatencyStats:
+    """캡처 → 탐지 완료 지연 및 처리량 집계 (최근 window 개 샘플)."""
+
+    def __init__(self, window: int = 300):
+        self.latency = deque(maxlen=window)             # 캡처 → 결과 준비 (ms)
+        self.infer = deque(maxlen=window)               # 순수 추론 시간 (ms)
+        self.processed = 0
+        self._t0 = time.monotonic()
+        self._n0 = 0
+
+    def add(self, latency_ms: float, infer_ms: float):
+        self.latency.append(latency_ms)
+        self.infer.append(infer_ms)
+        self.processed += 1
+
+    @staticmethod
+    def _pct(values, q: float) -> float:
+        if not values:
+            return 0.0
+        s = sorted(values)
+        return s[min(len(s) - 1, int(q * len(s)))]
+
+    def report(self, capture: LatestFrameCapture = None, scheduler: AdaptiveScheduler = None) -> dict:
+        """최근 구간 요약을 반환하고 처리 FPS 측정 구간을 재시작."""
+        now = time.monotonic()
+        fps = (self.processed - self._n0) / max(now - self._t0, 1e-6)
+        self._t0, self._n0 = now, self.processed
+        out = {
+            "processed_fps": round(fps, 2),
+            "latency_p50_ms": round(self._pct(self.latency, 0.50), 1),
+            "latency_p95_ms": round(self._pct(self.latency, 0.95), 1),
+            "latency_max_ms": round(max(self.latency, default=0.0), 1),
+            "infer_p50_ms": round(self._pct(self.infer, 0.50), 1),
+        }
+        if capture is not None:
+            out.update(captured=capture.captured, dropped=capture.dropped)
+        if scheduler is not None:
+            out.update(skipped_stale=scheduler.skipped_stale, over_budget=scheduler.over_budget)
+        return out
@@ -0,0 +1,184 @@
+# ai/multi_stream_infer.py
+
+"""
+다중 스트림 배치 추론 서비스 (Multi-Stream Batched YOLO Inference)
+
+드론마다 video_infer_yolo.py 를 하나씩 띄우면 모델 가중치가 프로세스 수만큼 복제되고
+프레임을 묶어 처리할 기회도 사라집니다. 이 서비스는
+ - 모델을 한 번만 로드하고
+ - 스트림마다 캡처 스레드(LatestFrameCapture)와 지연 예산 스케줄러(AdaptiveScheduler)를 두며
+ - 새 프레임이 있는 스트림들의 최신 프레임을 모아 한 번의 배치 추론으로 처리한 뒤
+ - 결과를 stream_id 별로 나눠 관제 서버(/detections/push_batch)로 전송합니다. (백그라운드 퍼블리셔)
+
+스트림 목록:
+  AI_STREAMS="drone-001=rtsp://10.0.0.5/live,drone-002=video.mp4"   (쉼표 구분, id=url)
+  또는  python ai/multi_stream_infer.py --streams streams.json        ({"drone-001": "rtsp://...", ...})
+"""
+
+import argparse                             # 명령행 인자 처리
+import json                                 # 스트림 목록 파일(JSON) 로드
+import os                                   # 환경 변수 기반 설정
+import threading                            # 스트림 간 공유 이벤트
+import time                                 # 배치 대기 / 리포트 주기
+from backends import load_backend, BACKEND  # 추론 백엔드 (torch / onnx / openvino)
+from frame_pipeline import LatestFrameCapture, AdaptiveScheduler, LatencyStats  # 캡처/스케줄링 유틸리티
+from detection_publisher import DetectionPublisher  # 백그라운드 일괄 전송
+from tracker import Tracker, event_payloads  # 스트림별 다중 객체 추적
+
+# --- 1. 시스템 설정 변수 ---
+API = os.getenv("AI_DETECTIONS_API", "http://127.0.0.1:8000/detections/push_batch")  # 탐지 결과 전송 API
+MODEL_PATH = os.getenv("AI_MODEL_PATH", "yolov8n.pt")                         # YOLO 가중치 (.onnx/.xml 도 가능)
+LATENCY_BUDGET_MS = float(os.getenv("AI_LATENCY_BUDGET_MS", "300"))           # 캡처 → 탐지 완료 목표 지연 (ms)
+BATCH_MAX = int(os.getenv("AI_BATCH_MAX", "8"))                               # 한 번에 추론할 최대 프레임 수
+BATCH_WAIT_MS = float(os.getenv("AI_BATCH_WAIT_MS", "10"))                    # 첫 프레임 이후 배치를 채우려 기다리는 시간
+CONF_MIN = float(os.getenv("AI_CONF_MIN", "0.5"))                             # 신뢰도 임계값
+REPORT_SEC = 10                                                               # 스트림별 지연/처리량 리포트 주기 (초)
+
+
+class Stream:
+    """스트림 1개의 캡처/스케줄링/통계 상태."""
+
+    def __init__(self, stream_id: str, url: str, notify: threading.Event):
+        self.stream_id = stream_id
+        self.url = url
+        self.capture = LatestFrameCapture(url, notify=notify)
+        self.scheduler = AdaptiveScheduler(LATENCY_BUDGET_MS)
+        self.stats = LatencyStats()
+        self.tracker = Tracker()            # 스트림별 track_id 공간
+        self.last_seq = 0                   # 마지막으로 가져간 프레임 순번
+        self.last_frame = None              # 마지막으로 추론한 프레임 (종료 시 트랙 정리용)
+
+    def take(self):
+        """처리할 새 프레임 (없거나 예산을 넘긴 낡은 프레임이면 None)."""
+        frame = self.capture.poll(self.last_seq)
+        if frame is None:
+            return None
+        self.last_seq = frame.seq
+        return frame if self.scheduler.accept(frame) else None
+
+
+def load_streams(path: str = None) -> dict:
+    """스트림 목록 {stream_id: url}. 파일 인자가 없으면 AI_STREAMS 환경 변수를 사용."""
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return {str(k): str(v) for k, v in json.load(f).items()}
+    streams = {}
+    for item in os.getenv("AI_STREAMS", "drone-001=video.mp4").split(","):
+        if item.strip():
+            sid, _, url = item.strip().partition("=")
+            streams[sid] = url
+    return streams
+
+
+def result_events(det, names: dict, stream: Stream, frame) -> list:
+    """탐지 결과(backends.Detections) 1개 → 스트림 추적기 갱신 → /detections/push_batch 페이로드 (트랙 이벤트만)."""
+    keep = det.conf >= CONF_MIN
+    xywhn, conf = det.xywhn[keep], det.conf[keep]
+    cls_names = [names.get(int(c), str(int(c))) for c in det.cls[keep]]
+    events = stream.tracker.update(xywhn, conf, cls_names, frame.t_mono)
+    stream.last_frame = frame
+    return event_payloads(events, stream.stream_id, frame)
+
+
+def collect_batch(streams: list, notify: threading.Event) -> list:
+    """새 프레임이 있는 스트림들의 (Stream, Frame) 목록. 가장 오래된 프레임부터 BATCH_MAX 개."""
+    batch = []
+    deadline = None
+    while True:
+        notify.clear()
+        for s in streams:
+            if len(batch) >= BATCH_MAX:
+                break
+            if any(s is b[0] for b in batch):
+                continue
+            frame = s.take()
+            if frame is not None:
+                batch.append((s, frame))
+        if len(batch) >= min(BATCH_MAX, len(streams)):
+            break
+        if batch and deadline is None:
+            deadline = time.monotonic() + BATCH_WAIT_MS / 1000.0
+        if all(s.capture.ended for s in streams):
+            break
+        timeout = 1.0 if deadline is None else deadline - time.monotonic()
+        if timeout <= 0 or not notify.wait(timeout):
+            if batch:
+                break
+    # 스트림 수가 BATCH_MAX 보다 많으면 마감이 가까운(가장 오래된) 프레임을 우선
+    batch.sort(key=lambda b: b[1].t_mono)
+    return batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-stream batched YOLO inference")
+    parser.add_argument("--streams", help="JSON file {stream_id: url} (default: AI_STREAMS env)")
+    args = parser.parse_args()
+
+    # --- 2. 모델 로드 (프로세스당 1회, 모든 스트림이 공유) ---
+    model = load_backend(BACKEND, MODEL_PATH)
+
+    # --- 3. 스트림별 캡처 스레드 시작 ---
+    notify = threading.Event()
+    streams = []
+    for sid, url in load_streams(args.streams).items():
+        s = Stream(sid, url, notify)
+        if not s.capture.is_opened():
+            print(f"[ERROR] Unable to open video source for {sid}: {url}")
+            continue
+        s.capture.start()
+        streams.append(s)
+    if not streams:
+        print("[ERROR] No video source available")
+        exit(1)
+    publisher = DetectionPublisher(API)
+    print(f"[AI] Batched inference started: {len(streams)} streams, backend {BACKEND}, batch<={BATCH_MAX}, budget {LATENCY_BUDGET_MS:.0f}ms")
+
+    last_report = time.monotonic()
+    batches = frames = 0
+
+    # --- 4. 배치 추론 루프 ---
+    try:
+        while True:
+            batch = collect_batch(streams, notify)
+            if not batch:
+                if all(s.capture.ended for s in streams):
+                    break
+                continue
+
+            # 4.1. 한 번의 호출로 배치 추론 (결과 순서 = 입력 순서)
+            t_infer = time.monotonic()
+            results = model([f.image for _, f in batch])
+            infer_ms = (time.monotonic() - t_infer) * 1000.0
+            batches += 1
+            frames += len(batch)
+
+            # 4.2. stream_id 별로 결과 분배 후 배치 전체를 한 번에 전송 큐로
+            payloads = []
+            for (s, frame), result in zip(batch, results):
+                s.scheduler.observe(infer_ms)   # 각 프레임이 체감하는 추론 시간 = 배치 전체 시간
+                s.stats.add(frame.age_ms(), infer_ms)
+                payloads.extend(result_events(result, model.names, s, frame))
+            if payloads:
+                publisher.publish(payloads)
+
+            # 4.3. 주기적 리포트
+            if time.monotonic() - last_report >= REPORT_SEC:
+                last_report = time.monotonic()
+                print(f"[AI] avg batch {frames / max(batches, 1):.2f} frames", publisher.stats())
+                batches = frames = 0
+                for s in streams:
+                    print(f"[AI] {s.stream_id}", s.stats.report(s.capture, s.scheduler), s.tracker.stats())
+    except KeyboardInterrupt:
+        pass
+
+    # --- 5. 자원 해제 ---
+    for s in streams:
+        s.capture.stop()
+        if s.last_frame is not None:    # 남은 트랙은 lost 이벤트로 닫음
+            publisher.publish(event_payloads(s.tracker.flush(time.monotonic()), s.stream_id, s.last_frame))
+    publisher.close()
+    print("[AI] Stopped")
+
+
+if __name__ == "__main__":
+    main()
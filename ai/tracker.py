@@ -0,0 +1,190 @@
+# ai/tracker.py
+
+"""
+경량 다중 객체 추적기 (SORT 방식, NumPy 전용)
+
+매 프레임 모든 박스를 서버로 보내면 1분 동안 보이는 사람 한 명이 수천 건의 동일한 탐지가 됩니다.
+Tracker 는 프레임 간 박스를 이어 안정적인 track_id 를 부여하고, 의미 있는 변화가 있을 때만 이벤트를 냅니다.
+ - 상태: 정규화 [cx, cy, w, h] + 속도 (등속 칼만 필터, 프레임 간격 dt 는 실제 시간 기준 → 프레임 건너뛰기에 강함)
+ - 연관: 예측 박스와 탐지 박스의 IoU 행렬(벡터화) → IoU 내림차순 탐욕 매칭
+ - 이벤트:
+     birth  : min_hits 번 연속 매칭되어 확정된 순간 (한두 프레임 오탐은 보내지 않음)
+     update : 마지막 보고 대비 중심 이동 ≥ move_min, 크기 변화 ≥ 30 %, 클래스 변경, 신뢰도 변화 ≥ conf_delta,
+              또는 heartbeat_sec 동안 보고가 없을 때 (존재 확인용)
+     lost   : max_age_sec 동안 매칭되지 않아 추적 종료 (마지막 위치 포함)
+"""
+
+import numpy as np                          # 벡터화 칼만 예측 / IoU 계산
+
+# 상태 x = [cx, cy, w, h, vx, vy, vw, vh] (속도 단위: 정규화 좌표/초), 관측 z = [cx, cy, w, h]
+_H = np.hstack([np.eye(4), np.zeros((4, 4))])
+_R = np.diag([1e-4, 1e-4, 4e-4, 4e-4])             # 관측 잡음 (크기 관측이 위치보다 불안정)
+_P0 = np.diag([1e-4, 1e-4, 4e-4, 4e-4, 1e-2, 1e-2, 1e-2, 1e-2])  # 초기 공분산 (속도는 모름)
+_Q_RATE = np.diag([1e-4, 1e-4, 1e-4, 1e-4, 5e-3, 5e-3, 5e-3, 5e-3])  # 초당 과정 잡음
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """xywh(중심) 박스 배열 a (N,4), b (M,4) 의 IoU 행렬 (N,M)."""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)))
+    a1, a2 = a[:, None, :2] - a[:, None, 2:] / 2, a[:, None, :2] + a[:, None, 2:] / 2
+    b1, b2 = b[None, :, :2] - b[None, :, 2:] / 2, b[None, :, :2] + b[None, :, 2:] / 2
+    wh = np.clip(np.minimum(a2, b2) - np.maximum(a1, b1), 0, None)
+    inter = wh[..., 0] * wh[..., 1]
+    area_a = (a[:, 2] * a[:, 3])[:, None]
+    area_b = (b[:, 2] * b[:, 3])[None, :]
+    return inter / np.maximum(area_a + area_b - inter, 1e-9)
+
+
+def greedy_match(iou: np.ndarray, iou_min: float):
+    """IoU 내림차순 탐욕 매칭 → (track_idx, det_idx) 목록."""
+    pairs = []
+    if iou.size == 0:
+        return pairs
+    order = np.argsort(-iou, axis=None)
+    used_t, used_d = set(), set()
+    for flat in order:
+        t, d = divmod(int(flat), iou.shape[1])
+        if iou[t, d] < iou_min:
+            break
+        if t in used_t or d in used_d:
+            continue
+        used_t.add(t)
+        used_d.add(d)
+        pairs.append((t, d))
+    return pairs
+
+
+class Tracker:
+    """스트림 1개에 대한 추적기. update() 가 서버로 보낼 이벤트 목록을 반환."""
+
+    def __init__(self, iou_min: float = 0.3, min_hits: int = 2, max_age_sec: float = 1.0,
+                 move_min: float = 0.05, conf_delta: float = 0.15, heartbeat_sec: float = 5.0):
+        self.iou_min = iou_min
+        self.min_hits = min_hits
+        self.max_age_sec = max_age_sec
+        self.move_min = move_min
+        self.conf_delta = conf_delta
+        self.heartbeat_sec = heartbeat_sec
+        self.x = np.zeros((0, 8))                   # 트랙별 칼만 상태
+        self.P = np.zeros((0, 8, 8))                # 트랙별 공분산
+        self.tracks = []                            # 트랙별 메타 (x/P 와 같은 순서)
+        self._next_id = 1
+        self._t = None                              # 직전 update 시각
+        self.detections_in = 0                      # 입력 박스 수
+        self.events_out = 0                         # 출력 이벤트 수
+
+    # ── 칼만 필터 ────────────────────────────────
+    def _predict(self, dt: float):
+        if not len(self.x) or dt <= 0:
+            return
+        F = np.eye(8)
+        F[:4, 4:] = np.eye(4) * dt
+        self.x = self.x @ F.T
+        self.P = F @ self.P @ F.T + _Q_RATE * dt
+        self.x[:, 2:4] = np.maximum(self.x[:, 2:4], 1e-4)      # 크기가 음수가 되지 않도록
+
+    def _correct(self, idx: np.ndarray, z: np.ndarray):
+        P = self.P[idx]
+        S = _H @ P @ _H.T + _R                                 # (k,4,4)
+        K = P @ _H.T @ np.linalg.inv(S)                         # (k,8,4)
+        y = z - self.x[idx] @ _H.T                              # (k,4)
+        self.x[idx] += np.einsum("kij,kj->ki", K, y)
+        self.P[idx] = (np.eye(8) - K @ _H) @ P
+
+    # ── 이벤트 ───────────────────────────────────
+    def _event(self, tr: dict, kind: str, t: float) -> dict:
+        bbox = tr["box"]
+        tr.update(rep_box=bbox, rep_cls=tr["cls"], rep_conf=tr["conf"], rep_t=t)
+        return {"track_id": tr["id"], "event": kind, "cls": tr["cls"],
+                "conf": round(tr["conf"], 3), "bbox": [round(float(v), 5) for v in bbox]}
+
+    def _changed(self, tr: dict, t: float) -> bool:
+        (cx, cy, w, h), (rx, ry, rw, rh) = tr["box"], tr["rep_box"]
+        return (np.hypot(cx - rx, cy - ry) >= self.move_min
+                or abs(w * h - rw * rh) >= 0.3 * max(rw * rh, 1e-9)
+                or tr["cls"] != tr["rep_cls"]
+                or abs(tr["conf"] - tr["rep_conf"]) >= self.conf_delta
+                or t - tr["rep_t"] >= self.heartbeat_sec)
+
+    def update(self, boxes: np.ndarray, confs, classes, t: float) -> list:
+        """
+        boxes: 정규화 xywh(중심) (N,4), confs: (N,), classes: 클래스 이름 N 개, t: 캡처 시각 (monotonic 초).
+        반환: 이벤트 dict 목록 {track_id, event, cls, conf, bbox}.
+        """
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        self.detections_in += len(boxes)
+        dt = 0.0 if self._t is None else t - self._t
+        self._t = t
+        self._predict(dt)
+
+        pairs = greedy_match(iou_matrix(self.x[:, :4], boxes), self.iou_min)
+        if pairs:
+            ti = np.array([p[0] for p in pairs])
+            di = np.array([p[1] for p in pairs])
+            self._correct(ti, boxes[di])
+
+        events = []
+        matched_t = set()
+        for t_i, d_i in pairs:
+            tr = self.tracks[t_i]
+            matched_t.add(t_i)
+            tr.update(box=boxes[d_i], conf=float(confs[d_i]), cls=classes[d_i], last_t=t, hits=tr["hits"] + 1)
+            if not tr["confirmed"]:
+                if tr["hits"] >= self.min_hits:
+                    tr["confirmed"] = True
+                    events.append(self._event(tr, "birth", t))
+            elif self._changed(tr, t):
+                events.append(self._event(tr, "update", t))
+
+        # 매칭되지 않은 트랙: max_age 초과 시 종료 (확정 트랙만 lost 이벤트)
+        keep = []
+        for i, tr in enumerate(self.tracks):
+            if i not in matched_t:
+                if t - tr["last_t"] > self.max_age_sec or (not tr["confirmed"] and tr["hits"] < self.min_hits and t > tr["last_t"]):
+                    if tr["confirmed"]:
+                        events.append(self._event(tr, "lost", t))
+                    continue
+            keep.append(i)
+        if len(keep) != len(self.tracks):
+            self.x, self.P = self.x[keep], self.P[keep]
+            self.tracks = [self.tracks[i] for i in keep]
+
+        # 매칭되지 않은 탐지: 새 트랙 (min_hits=1 이면 즉시 birth)
+        used_d = {p[1] for p in pairs}
+        new = [d for d in range(len(boxes)) if d not in used_d]
+        if new:
+            x_new = np.zeros((len(new), 8))
+            x_new[:, :4] = boxes[new]
+            self.x = np.vstack([self.x, x_new])
+            self.P = np.concatenate([self.P, np.repeat(_P0[None], len(new), axis=0)])
+            for d in new:
+                tr = {"id": self._next_id, "box": boxes[d], "conf": float(confs[d]), "cls": classes[d],
+                      "last_t": t, "hits": 1, "confirmed": False}
+                self._next_id += 1
+                self.tracks.append(tr)
+                if self.min_hits <= 1:
+                    tr["confirmed"] = True
+                    events.append(self._event(tr, "birth", t))
+
+        self.events_out += len(events)
+        return events
+
+    def flush(self, t: float) -> list:
+        """스트림 종료 시 남은 확정 트랙을 모두 lost 로 닫는다."""
+        events = [self._event(tr, "lost", t) for tr in self.tracks if tr["confirmed"]]
+        self.x, self.P, self.tracks = np.zeros((0, 8)), np.zeros((0, 8, 8)), []
+        self.events_out += len(events)
+        return events
+
+    def stats(self) -> dict:
+        return {"active_tracks": sum(tr["confirmed"] for tr in self.tracks),
+                "detections_in": self.detections_in, "events_out": self.events_out,
+                "reduction": round(self.detections_in / max(self.events_out, 1), 1)}
+
+
+def event_payloads(events: list, stream_id: str, frame) -> list:
+    """추적 이벤트 → /detections/push_batch 페이로드 (캡처 시각, 지연 포함)."""
+    ts = frame.ts.isoformat()
+    latency_ms = round(frame.age_ms(), 1)
+    return [dict(ev, stream_id=stream_id, ts=ts, latency_ms=latency_ms) for ev in events]
@@ -7,102 +7,126 @@
 Ultralytics YOLOv8 모델을 활용하여 실시간으로 분석하는 모듈입니다.
 탐지된 객체 (예: 사람, 화재, 연기 등)의 정보는 정규화된 좌표와 함께 
 지정된 서버 API 엔드포인트로 즉시 전송(Push)되어 관제 시스템의 상황 인지 자료로 활용됩니다.
+
+캡처와 추론은 분리되어 있습니다. 캡처 스레드는 항상 최신 프레임 1장만 보관하고,
+추론 루프는 지연 예산(LATENCY_BUDGET_MS)을 넘길 프레임을 건너뛰어 CPU 전용 환경에서도
+탐지 결과가 실시간을 유지하도록 합니다. (ai/frame_pipeline.py 참고)
 """
 
 import cv2                                  # OpenCV: 비디오 I/O 및 프레임 처리 라이브러리
+import os                                   # 환경 변수 기반 설정
 import time                                 # 시간 관련 모듈
-import requests                             # HTTP 통신 (서버로 탐지 결과 전송) 라이브러리
-from datetime import datetime, timezone     # 타임스탬프 기록을 위한 시간 처리 모듈
-from ultralytics import YOLO                # YOLO 모델 로딩 및 추론을 위한 핵심 라이브러리
+import sys                                  # 헤드리스 환경 판별
+from backends import load_backend, BACKEND  # 추론 백엔드 (torch / onnx / openvino)
+from frame_pipeline import LatestFrameCapture, AdaptiveScheduler, LatencyStats  # 캡처/스케줄링 유틸리티
+from detection_publisher import DetectionPublisher  # 백그라운드 일괄 전송 (추론 루프는 네트워크를 기다리지 않음)
+from tracker import Tracker, event_payloads  # 다중 객체 추적 (track_id 부여, 변화 시에만 이벤트)
 
 # --- 1. 시스템 설정 변수 (Configuration Parameters) ---
-API = "http://127.0.0.1:8000/detections/push"    # 탐지 결과를 전송할 관제 서버의 API 엔드포인트
+API = "http://127.0.0.1:8000/detections/push_batch"  # 탐지 결과를 일괄 전송할 관제 서버의 API 엔드포인트
 STREAM_URL = "video.mp4"                         # 분석 대상 비디오 소스 URL 또는 파일 경로 (Source Video Stream)
-MODEL_PATH = "yolov8n.pt"                        # 사용할 YOLO 모델 가중치 파일 경로 (YOLOv8 nano 모델)
+MODEL_PATH = os.getenv("AI_MODEL_PATH", "yolov8n.pt")  # 사용할 YOLO 모델 가중치 파일 경로 (YOLOv8 nano 모델, .onnx/.xml 도 가능)
 STREAM_ID = "drone-001"                          # 탐지 이벤트를 식별하기 위한 드론/스트림 고유 ID
+LATENCY_BUDGET_MS = float(os.getenv("AI_LATENCY_BUDGET_MS", "300"))  # 캡처 → 탐지 완료 목표 지연 (ms)
+MAX_FPS = float(os.getenv("AI_MAX_FPS", "0"))    # 추론 최대 FPS (0 = 제한 없음)
+REPORT_SEC = 10                                  # 지연/처리량 리포트 주기 (초)
+# 헤드리스 모드: 컨테이너/엣지 장비에서는 화면이 없으므로 imshow/waitKey 를 호출하지 않음
+# (AI_HEADLESS 미지정 시 Linux 에서 DISPLAY 가 없으면 자동으로 헤드리스)
+HEADLESS = os.getenv("AI_HEADLESS", "1" if sys.platform.startswith("linux") and not os.getenv("DISPLAY") else "0") == "1"
 
 # --- 2. 모델 로드 및 초기화 ---
-# Ultralytics 라이브러리를 사용하여 지정된 경로의 YOLO 모델을 메모리에 로드합니다.
+# AI_BACKEND 에 맞는 추론 백엔드를 로드합니다. (torch: Ultralytics 기본 경로,
+# onnx/openvino: .pt 를 자동 변환해 CPU 최적화 런타임으로 실행, AI_INT8=1 이면 INT8 양자화 모델)
 # 이 모델은 모든 추론 작업에 사용됩니다.
-model = YOLO(MODEL_PATH) 
+model = load_backend(BACKEND, MODEL_PATH)
 
-# --- 3. 비디오 스트림 캡처 ---
-# OpenCV를 사용하여 STREAM_URL에 해당하는 비디오 스트림을 엽니다.
-cap = cv2.VideoCapture(STREAM_URL)
+# --- 3. 비디오 스트림 캡처 (별도 스레드, 최신 프레임만 유지) ---
+# 캡처 스레드가 STREAM_URL 을 계속 읽고, 추론 루프는 그중 가장 최근 프레임만 가져갑니다.
+capture = LatestFrameCapture(STREAM_URL)
 
 # 비디오 소스 열림 여부 확인 및 예외 처리
-if not cap.isOpened():
+if not capture.is_opened():
     print(f"[ERROR] Unable to open video source: {STREAM_URL}")
     exit(1) # 스트림 연결 실패 시 프로그램 종료
 
-print(f"[AI] YOLO inference service started on {STREAM_URL}")
+capture.start()
+scheduler = AdaptiveScheduler(LATENCY_BUDGET_MS, MAX_FPS)   # 지연 예산 기반 프레임 선택
+stats = LatencyStats()                                      # 캡처 → 탐지 지연 집계
+publisher = DetectionPublisher(API)                         # 프레임/짧은 시간 창 단위로 묶어 전송
+tracker = Tracker()                                         # 스트림 단위 객체 추적기
+last_seq = 0                                                # 마지막으로 처리한 프레임 순번
+last_frame = None                                           # 마지막으로 추론한 프레임 (종료 시 트랙 정리용)
+last_report = time.monotonic()
+
+print(f"[AI] YOLO inference service started on {STREAM_URL} (backend {BACKEND}, budget {LATENCY_BUDGET_MS:.0f}ms, headless={HEADLESS})")
 
 # --- 4. 메인 추론 루프 (Main Inference Loop) ---
 while True:
-    # 4.1. 프레임 읽기
-    ret, frame = cap.read() # ret: 성공 여부, frame: 읽어온 이미지 데이터
-    
-    # 스트림 종료 또는 프레임 읽기 실패 시 루프 탈출
-    if not ret: 
-        break 
-
-    # 4.2. 객체 탐지 (Inference)
+    # 4.1. 최신 프레임 가져오기 (직전에 처리한 것보다 새로운 프레임만)
+    frame_obj = capture.read(after_seq=last_seq, timeout=1.0)
+
+    # 스트림 종료 시 루프 탈출 (라이브 스트림은 캡처 스레드가 재연결)
+    if frame_obj is None:
+        if capture.ended:
+            break
+        continue
+    last_seq = frame_obj.seq
+
+    # 4.2. 적응형 스케줄링: 예산 안에 결과를 낼 수 없는 낡은 프레임은 건너뜀
+    if not scheduler.accept(frame_obj):
+        continue
+    scheduler.wait_slot()
+    frame = frame_obj.image
+
+    # 4.3. 객체 탐지 (Inference)
     # 현재 프레임에 대해 YOLO 모델을 실행합니다. (추론 수행)
-    results = model(frame, verbose=False) # verbose=False로 콘솔 출력 최소화
-
-    # 4.3. 탐지 결과 반복 처리
-    for r in results: # 하나의 프레임에 대한 결과
-        for box in r.boxes: # 탐지된 개별 객체의 바운딩 박스 정보
-            
-            cls_id = int(box.cls[0])    # 탐지된 객체의 클래스 ID (정수)
-            conf = float(box.conf[0])   # 해당 탐지의 신뢰도(Confidence Score)
-            
-            # 신뢰도 임계값 필터링 (0.5 미만은 낮은 품질로 판단하여 무시)
-            if conf < 0.5:
-                continue
-
-            # 클래스 이름 추출 (예: 0 -> 'person')
-            cls_name = model.names[cls_id] 
-            
-            # 바운딩 박스 좌표 추출: (중앙 x, 중앙 y, 너비, 높이) 형식의 픽셀 값
-            xywh = box.xywh[0].cpu().numpy()
-            
-            # 프레임의 크기 (높이 h, 너비 w) 획득
-            h, w = frame.shape[:2]
-            
-            # 4.4. 좌표 정규화 (Normalization)
-            # 픽셀 좌표를 0.0부터 1.0 사이의 값으로 정규화하여 해상도 독립성을 확보
-            bbox = [
-                float(xywh[0]/w), # 정규화된 중앙 X
-                float(xywh[1]/h), # 정규화된 중앙 Y
-                float(xywh[2]/w), # 정규화된 너비 W
-                float(xywh[3]/h)  # 정규화된 높이 H
-            ]
-
-            # 4.5. 서버 전송용 Payload 구성
-            payload = {
-                "stream_id": STREAM_ID,                       # 드론 식별자
-                "cls": cls_name,                              # 탐지된 객체 클래스
-                "conf": round(conf, 3),                       # 신뢰도 (소수점 셋째 자리까지 반올림)
-                "bbox": bbox,                                 # 정규화된 바운딩 박스 좌표
-                "ts": datetime.now(timezone.utc).isoformat(), # UTC 기준 ISO 8601 형식 타임스탬프
-            }
-            
-            # 4.6. 서버로 탐지 결과 전송 (HTTP POST Request)
-            try:
-                # 관제 서버 API로 JSON 데이터를 전송하며, 타임아웃을 3초로 설정합니다.
-                requests.post(API, json=payload, timeout=3)
-            except Exception as e:
-                # 네트워크 오류 등 서버 전송 실패 시 경고 출력
-                print(f"[WARN] Detection push failed: {e}")
-
-    # 4.7. (선택적) 디버깅 및 시각화를 위한 화면 표시
-    cv2.imshow("YOLO Detection", frame)
-    # ESC 키 (아스키 코드 27) 입력 시 루프 종료
-    if cv2.waitKey(1) == 27:
-        break
+    t_infer = time.monotonic()
+    det = model([frame])[0]               # 프레임 1장의 탐지 결과 (정규화 좌표, 신뢰도, 클래스 ID)
+    infer_ms = (time.monotonic() - t_infer) * 1000.0
+    scheduler.observe(infer_ms)
+
+    # 캡처 시점부터 탐지 결과가 준비될 때까지의 지연
+    latency_ms = frame_obj.age_ms()
+    stats.add(latency_ms, infer_ms)
+
+    # 4.4. 탐지 결과 수집 (신뢰도 임계값 이상 박스만)
+    conf = det.conf                              # 탐지별 신뢰도(Confidence Score)
+    keep = conf >= 0.5                           # 0.5 미만은 낮은 품질로 판단하여 무시
+    # 바운딩 박스 좌표: 프레임 크기로 정규화된 (중앙 x, 중앙 y, 너비, 높이) → 해상도 독립성 확보
+    boxes = det.xywhn[keep]
+    cls_names = [model.names.get(int(c), str(int(c))) for c in det.cls[keep]]  # 클래스 이름 (예: 0 -> 'person')
+
+    # 4.5. 다중 객체 추적 (프레임 간 박스 연결 → 안정적인 track_id)
+    # 매 프레임 박스를 모두 보내지 않고, 트랙 생성/의미 있는 이동·변화/소실 시점에만 이벤트를 만듭니다.
+    events = tracker.update(boxes, conf[keep], cls_names, frame_obj.t_mono)
+    last_frame = frame_obj
+
+    # 4.6. 서버 전송용 Payload 구성 (stream_id, 캡처 시각, 지연 추가)
+    payloads = event_payloads(events, STREAM_ID, frame_obj)
+
+    # 4.7. 서버로 탐지 결과 전송 (백그라운드 스레드가 keep-alive 세션으로 /detections/push_batch 호출)
+    # 큐에 넣고 즉시 반환하므로 네트워크 지연/장애가 추론을 멈추지 않습니다.
+    if payloads:
+        publisher.publish(payloads)
+
+    # 4.8. 주기적 지연/처리량 리포트
+    if time.monotonic() - last_report >= REPORT_SEC:
+        last_report = time.monotonic()
+        print("[AI] latency report", stats.report(capture, scheduler), publisher.stats(), tracker.stats())
+
+    # 4.9. (선택적) 디버깅 및 시각화를 위한 화면 표시 (헤드리스 모드에서는 GUI 호출 없음)
+    if not HEADLESS:
+        cv2.imshow("YOLO Detection", frame)
+        # ESC 키 (아스키 코드 27) 입력 시 루프 종료
+        if cv2.waitKey(1) == 27:
+            break
 
 # --- 5. 자원 해제 (Resource Cleanup) ---
-cap.release()               # 비디오 캡처 객체 해제
-cv2.destroyAllWindows()     # OpenCV 창 모두 닫기
+capture.stop()              # 캡처 스레드 종료 및 비디오 캡처 객체 해제
+if last_frame is not None:  # 남은 트랙은 lost 이벤트로 닫음
+    publisher.publish(event_payloads(tracker.flush(time.monotonic()), STREAM_ID, last_frame))
+publisher.close()           # 남은 탐지 전송 후 세션 종료
+if not HEADLESS:
+    cv2.destroyAllWindows() # OpenCV 창 모두 닫기
+print("[AI] Final report", stats.report(capture, scheduler))
 print("[AI] Stopped")
@@ -8,25 +8,35 @@ OSDK (Onboard Software Development Kit) 클라이언트 스텁
 해당 임무를 시뮬레이션하며, 비행 중 주기적으로 드론의 위치 및 상태 정보를 서버에 보고하는 것입니다.
 이는 관제 시스템의 백엔드 임무 할당 및 위치 추적 로직을 검증하는 데 활용됩니다.
 """
-import os, time, math, random, requests
-from typing import Dict
+import os, time, math, json, random, requests
+from typing import Dict, Iterator
 
 # --- 1. 시스템 환경 설정 ---
 # 서버 API 주소 설정: 환경 변수 'DROWNI_API'를 우선 사용하고, 없으면 로컬 기본값 사용
 API = os.getenv("DROWNI_API", "http://127.0.0.1:8000")
+DRONE_ID = os.getenv("DROWNI_DRONE_ID", "drone-001")   # 드론 고유 식별자
+LONG_POLL_SEC = 30                                     # long-poll 대기 시간 (미션 채널 사용 불가 시)
+# 기지(이착륙 지점) 좌표: 서버 sortie_planner 와 같은 환경 변수/기본값
+HOME = (float(os.getenv("DROWNI_HOME_LAT", "37.2771")),
+        float(os.getenv("DROWNI_HOME_LON", "127.7352")))
+# 드론의 현재 위치 (기지에서 시작, 비행하면서 갱신)
+POSITION = {"lat": HOME[0], "lon": HOME[1], "alt": 0.0}
 
 # --- 2. 서버 통신 함수 ---
 
 def fetch_next_waypoint() -> Dict | None:
     """
-    관제 서버로부터 다음 비행 임무(Waypoint)를 요청합니다. (임무 Polling)
+    관제 서버로부터 다음 비행 임무(Waypoint)를 요청합니다. (long-poll)
+    서버는 임무가 배정되거나 LONG_POLL_SEC 가 지날 때까지 응답을 보류합니다.
     
     Returns:
         Dict | None: 다음 임무 정보를 담은 딕셔너리 또는 임무가 없을 경우 None
     """
     try:
         # GET 요청을 통해 서버의 '/missions/next' 엔드포인트에서 임무 정보를 가져옵니다.
-        r = requests.get(f"{API}/missions/next", timeout=5)
+        r = requests.get(f"{API}/missions/next",
+                         params={"wait": LONG_POLL_SEC, "drone_id": DRONE_ID},
+                         timeout=LONG_POLL_SEC + 5)
         if not r.ok:
             # HTTP 응답 코드가 200(OK)이 아닐 경우 임무 없음으로 간주
             return None
@@ -36,6 +46,28 @@ def fetch_next_waypoint() -> Dict | None:
         # 네트워크 오류 등 예외 발생 시 임무 없음으로 처리
         return None
 
+def stream_missions() -> Iterator[Dict]:
+    """
+    드론 전용 미션 채널(SSE, '/missions/stream')에 접속하여 배정되는 임무를 즉시 수신합니다.
+    서버는 현재 임무의 완료 보고(ack) 전까지 다음 임무를 보내지 않으므로,
+    수신한 임무를 처리(비행)하는 동안 연결을 유지해도 됩니다.
+    
+    Yields:
+        Dict: 배정된 웨이포인트 임무
+    """
+    # 읽기 타임아웃은 서버 keep-alive 주기(15초)보다 넉넉하게 설정
+    with requests.get(f"{API}/missions/stream", params={"drone_id": DRONE_ID},
+                      stream=True, timeout=(5, 60)) as r:
+        r.raise_for_status()
+        event = None
+        for line in r.iter_lines(decode_unicode=True):
+            if line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:") and event == "mission":
+                yield json.loads(line[5:].strip())
+            elif not line:
+                event = None  # 빈 줄 = SSE 메시지 경계
+
 def send_tracker_update(lat: float, lon: float, alt: float, spd: float):
     """
     드론의 현재 상태(위치, 속도, 배터리)를 관제 서버에 주기적으로 업데이트합니다.
@@ -49,7 +81,7 @@ def send_tracker_update(lat: float, lon: float, alt: float, spd: float):
     try:
         # POST 요청을 통해 '/tracker/update' 엔드포인트로 드론 상태 정보를 전송합니다.
         requests.post(f"{API}/tracker/update", json={
-            "drone_id": "drone-001", # 드론 고유 식별자
+            "drone_id": DRONE_ID, # 드론 고유 식별자
             "lat": lat, "lon": lon,
             "alt": alt, "speed_mps": spd,
             # 배터리 잔량은 시뮬레이션을 위해 랜덤 값 (3.6V ~ 4.2V)으로 설정
@@ -61,6 +93,29 @@ def send_tracker_update(lat: float, lon: float, alt: float, spd: float):
 
 # --- 3. 비행 시뮬레이션 로직 ---
 
+# --- 지리 좌표계 변환 함수 (거리 계산) ---
+# 위도/경도 차이를 미터 단위로 변환하는 근사 함수
+def deg2m_lat(d): return d * 111_000.0 # 위도 1도당 약 111km
+def deg2m_lon(d, phi): return d * 111_000.0 * math.cos(math.radians(phi))
+
+def fly_to(lat: float, lon: float, alt: float, spd: float):
+    """
+    현재 위치(POSITION)에서 목표 지점까지 선형 보간으로 이동하며 위치를 보고합니다.
+    """
+    lat0, lon0, alt0 = POSITION["lat"], POSITION["lon"], POSITION["alt"]
+    # 현재 위치 → 목표 지점의 2D 거리(미터) 계산 (대략적인 평면 거리)
+    dist_m = math.hypot(deg2m_lat(lat - lat0), deg2m_lon(lon - lon0, lat0))
+    # 비행 소요 시간 계산: 거리 / 속도. 최소 1초, 최대 15초로 제한하여 시뮬레이션 속도 제어
+    travel_sec = min(max(dist_m / max(spd, 0.1), 1.0), 15.0)
+
+    for i in range(10): # 총 10단계로 나누어 이동을 시뮬레이션
+        frac = (i + 1) / 10.0 # 현재 이동 진행률 (0.1, 0.2, ..., 1.0)
+        # 출발지-목적지 사이를 비율(frac)로 선형 보간하여 서버에 업데이트
+        POSITION.update(lat=lat0 + (lat - lat0) * frac, lon=lon0 + (lon - lon0) * frac,
+                        alt=alt0 + (alt - alt0) * frac)
+        send_tracker_update(POSITION["lat"], POSITION["lon"], POSITION["alt"], spd)
+        time.sleep(travel_sec / 10.0) # 한 단계 이동에 해당하는 시간만큼 대기
+
 def simulate_flight(wp: Dict):
     """
     수신된 웨이포인트 임무에 따라 드론의 비행 과정을 시뮬레이션하고 상태를 보고합니다.
@@ -68,39 +123,28 @@ def simulate_flight(wp: Dict):
     Args:
         wp (Dict): 수행할 웨이포인트 임무 데이터
     """
-    # 임무 데이터 파싱
-    lat, lon, alt, spd = wp["lat"], wp["lon"], wp["alt"], wp["speed_mps"]
-    loiter = wp.get("loiter_sec", 0.0) # 선회 시간 (Loiter Time) - 기본값 0
+    # 다중 레그 출격이면 "legs" 순서대로, 단일 임무면 웨이포인트 하나만 비행
+    for leg in wp.get("legs") or [wp]:
+        # 임무 데이터 파싱
+        lat, lon, alt, spd = leg["lat"], leg["lon"], leg["alt"], leg["speed_mps"]
+        loiter = leg.get("loiter_sec", 0.0) # 선회 시간 (Loiter Time) - 기본값 0
 
-    print(f"[DRONE] TAKEOFF → target=({lat:.6f},{lon:.6f}), alt={alt}m")
+        print(f"[DRONE] TAKEOFF → target=({lat:.6f},{lon:.6f}), alt={alt}m")
 
-    # --- 지리 좌표계 변환 함수 (거리 계산) ---
-    # 위도/경도 차이를 미터 단위로 변환하는 근사 함수
-    def deg2m_lat(d): return d * 111_000.0 # 위도 1도당 약 111km
-    def deg2m_lon(d, phi): return d * 111_000.0 * math.cos(math.radians(phi)) 
-    
-    # 목표 지점까지의 2D 거리(미터) 계산 (대략적인 평면 거리)
-    dist_m = math.hypot(deg2m_lat(lat), deg2m_lon(lon, lat))
-    # 비행 소요 시간 계산: 거리 / 속도. 최소 1초, 최대 15초로 제한하여 시뮬레이션 속도 제어
-    travel_sec = min(max(dist_m / max(spd, 0.1), 1.0), 15.0)
+        # --- 웨이포인트 이동 시뮬레이션 (현재 위치에서 출발) ---
+        fly_to(lat, lon, alt, spd)
 
-    # --- 웨이포인트 이동 시뮬레이션 ---
-    for i in range(10): # 총 10단계로 나누어 이동을 시뮬레이션
-        frac = (i + 1) / 10.0 # 현재 이동 진행률 (0.1, 0.2, ..., 1.0)
-        
-        # 현재 위치를 출발지-목적지 사이의 비율(frac)로 선형 보간하여 서버에 업데이트
-        send_tracker_update(lat * frac, lon * frac, alt * frac, spd) 
-        time.sleep(travel_sec / 10.0) # 한 단계 이동에 해당하는 시간만큼 대기
-
-    # --- 선회 (Loiter) 시뮬레이션 ---
-    if loiter > 0:
-        print(f"[DRONE] LOITER {loiter:.1f}s")
-        time.sleep(min(loiter, 10.0)) # 최대 10초로 제한하여 선회 대기
+        # --- 선회 (Loiter) 시뮬레이션 ---
+        if loiter > 0:
+            print(f"[DRONE] LOITER {loiter:.1f}s")
+            time.sleep(min(loiter, 10.0)) # 최대 10초로 제한하여 선회 대기
 
     # --- 임무 완료 및 복귀(RTL) 시뮬레이션 ---
     print("[DRONE] RTL → Base")
-    # 최종 위치를 목표 위경도, 고도 0 (착륙)으로 서버에 전송
-    send_tracker_update(lat, lon, 0, 0) 
+    # 기지까지 비행 후 착륙 (고도 0) 위치를 서버에 전송
+    fly_to(HOME[0], HOME[1], POSITION["alt"], spd)
+    POSITION["alt"] = 0.0
+    send_tracker_update(HOME[0], HOME[1], 0, 0)
     time.sleep(1.0)
     print("[DRONE] MISSION COMPLETE")
 
@@ -117,21 +161,26 @@ def simulate_flight(wp: Dict):
 
 def main():
     """
-    클라이언트 스텁의 메인 루프: 서버를 폴링하여 임무를 받고 처리합니다.
+    클라이언트 스텁의 메인 루프: 미션 채널(SSE)로 임무를 받아 처리합니다.
+    채널 접속에 실패하면 long-poll 방식으로 한 건씩 임무를 요청합니다.
     """
-    print(f"[DRONE] polling {API} ... (Ctrl+C to stop)")
+    print(f"[DRONE] {DRONE_ID} listening {API}/missions/stream ... (Ctrl+C to stop)")
     while True:
         try:
-            # 4.1. 다음 임무 요청
+            # 4.1. 미션 채널로 임무 수신 및 시뮬레이션
+            try:
+                for wp in stream_missions():
+                    simulate_flight(wp)
+                continue  # 서버가 채널을 닫으면 재접속
+            except requests.RequestException as e:
+                print(f"[DRONE] mission stream unavailable ({e}), falling back to long-poll")
+
+            # 4.2. long-poll 폴백: 임무가 없으면 서버가 최대 LONG_POLL_SEC 동안 대기 후 응답
             wp = fetch_next_waypoint() 
-            
-            if not wp:
-                # 임무가 없으면 2초 대기 후 다시 요청
-                time.sleep(2.0)
-                continue
-                
-            # 4.2. 임무 시뮬레이션 및 처리
-            simulate_flight(wp)
+            if wp:
+                simulate_flight(wp)
+            else:
+                time.sleep(1.0)  # 서버 미응답 등으로 즉시 반환된 경우의 과도한 재시도 방지
             
         except KeyboardInterrupt:
             # 사용자 입력(Ctrl+C)으로 안전하게 종료
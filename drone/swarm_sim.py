@@ -0,0 +1,356 @@
+# drone/swarm_sim.py
+
+"""
+드론 군집(swarm) 시뮬레이터 (asyncio, 단일 프로세스)
+--------------------------------------------------
+osdk_client_stub.py 와 같은 서버 프로토콜을 수백 대 규모로 재현해
+트래커(/tracker/update), 디스패처(/missions/stream · /next · /ack), 실시간 팬아웃(/realtime)을 로컬에서 부하 시험합니다.
+ - 드론마다 미션 채널(SSE) 1개 + 텔레메트리 태스크 1개, 물리 갱신은 전역 루프 1개가 모든 드론을 한 번에 진행
+ - 운동학: 현재 위치에서 출발, 가속/감속 한계, 상승/하강 속도 한계, 이륙 → 순항 → 레그 순회 → 기지 복귀(RTL) → 착륙
+ - 배터리: 비행 부하(속도²)에 비례해 방전, 기지 대기 중 충전, 잔량이 RTL_SOC 미만이면 남은 레그를 버리고 복귀
+ - 미션 종료 시 /missions/ack (정상 완료 "completed", 배터리 복귀 "rtl")
+ - 텔레메트리 주기(--telemetry-hz), 시뮬레이션 배속(--time-scale), 무작위 미션 투입(--mission-rate) 설정 가능
+ - 주기적으로 상태별 드론 수, 텔레메트리 처리량/지연(p50/p99), 미션 수신/완료 수를 출력
+
+사용 예:
+  python drone/swarm_sim.py --drones 300 --telemetry-hz 2
+  python drone/swarm_sim.py --drones 100 --mission-rate 2 --time-scale 10 --duration 120
+"""
+
+import argparse                             # 명령행 인자
+import asyncio                              # 드론별 태스크
+import json                                 # SSE 미션 파싱
+import math                                 # 좌표/운동학 계산
+import os                                   # 환경 변수
+import random                               # 초기 위치/위상/미션 목표
+import time                                 # 지연 측정
+from collections import Counter, deque      # 상태 집계 / 지연 표본
+from typing import Dict, List, Optional
+
+import httpx                                # 비동기 HTTP (연결 재사용)
+
+# --- 1. 시스템 환경 설정 ---
+API = os.getenv("DROWNI_API", "http://127.0.0.1:8000")
+HOME = (float(os.getenv("DROWNI_HOME_LAT", "37.2771")),   # 기지 좌표 (서버 sortie_planner 와 같은 기본값)
+        float(os.getenv("DROWNI_HOME_LON", "127.7352")))
+
+M_PER_DEG = 111_000.0       # 위도 1도당 약 111km (스텁과 같은 평면 근사)
+PHYS_TICK = 0.1             # 물리 갱신 주기 (실제 초)
+SUB_STEP = 0.2              # 물리 적분 최대 간격 (시뮬레이션 초, 배속이 커도 안정)
+MAX_ACCEL = 2.5             # 수평 가감속 한계 (m/s²)
+CLIMB_RATE = 3.0            # 상승 속도 (m/s)
+DESCENT_RATE = 2.0          # 하강 속도 (m/s)
+MAX_SPEED = 15.0            # 기체 최대 속도 (m/s)
+CRUISE_ALT = 50.0           # RTL 순항 고도 (m)
+ARRIVE_M = 2.0              # 도착 판정 반경 (m)
+ENDURANCE_SEC = float(os.getenv("DRONE_ENDURANCE_SEC", "1200"))   # 만충 호버링 기준 비행 가능 시간
+CHARGE_SEC = 600.0          # 0 → 100 % 충전 시간
+RTL_SOC = 0.2               # 이 잔량 미만이면 미션 중단 후 복귀
+BATTERY_FULL_V = 4.2
+BATTERY_EMPTY_V = 3.5
+LONG_POLL_SEC = 30          # 미션 채널 사용 불가 시 long-poll 대기
+
+
+def offset_m(lat1: float, lon1: float, lat2: float, lon2: float):
+    """(북, 동) 방향 거리(m)."""
+    return (lat2 - lat1) * M_PER_DEG, (lon2 - lon1) * M_PER_DEG * math.cos(math.radians(lat1))
+
+
+# --- 2. 드론 모델 ---
+
+class SimDrone:
+    """드론 1대의 상태 + 운동학/배터리 모델. step() 은 물리 루프에서만 호출."""
+
+    def __init__(self, drone_id: str, lat: float, lon: float, soc: float):
+        self.drone_id = drone_id
+        self.lat, self.lon, self.alt = lat, lon, 0.0
+        self.speed = 0.0                    # 수평 속도 (m/s)
+        self.heading = 0.0                  # 진행 방향 (도, 북=0)
+        self.soc = soc                      # 배터리 잔량 (0~1)
+        self.state = "idle"                 # idle | takeoff | cruise | loiter | rtl | landing
+        self.target: Optional[tuple] = None  # (lat, lon, alt, speed)
+        self.mission_id: Optional[str] = None
+        self.low_battery = False
+        self.arrived = asyncio.Event()
+
+    # ── 운동학 ──
+    def goto(self, lat: float, lon: float, alt: float, speed: float, state: str) -> None:
+        self.target = (lat, lon, alt, min(max(speed, 0.5), MAX_SPEED))
+        self.state = state
+        self.arrived.clear()
+
+    def step(self, dt: float) -> None:
+        while dt > 1e-9:
+            h = min(dt, SUB_STEP)
+            self._integrate(h)
+            dt -= h
+
+    def _integrate(self, dt: float) -> None:
+        airborne = self.alt > 0.1 or self.target is not None
+        if self.target is not None:
+            lat, lon, alt, cruise = self.target
+            dn, de = offset_m(self.lat, self.lon, lat, lon)
+            dist = math.hypot(dn, de)
+            dz = alt - self.alt
+            # 이륙 중(목표 고도의 80 % 미만)에는 수직 상승만
+            can_move = self.alt >= 0.8 * alt or dz < 0 or dist < ARRIVE_M
+            self.alt += max(-DESCENT_RATE * dt, min(CLIMB_RATE * dt, dz))
+            # 남은 거리 안에서 멈출 수 있는 속도까지만 (v² = 2ad)
+            v_des = min(cruise, math.sqrt(2 * MAX_ACCEL * dist)) if can_move else 0.0
+            self.speed += max(-MAX_ACCEL * dt, min(MAX_ACCEL * dt, v_des - self.speed))
+            move = min(self.speed * dt, dist)
+            if dist > 1e-6:
+                self.lat += dn / dist * move / M_PER_DEG
+                self.lon += de / dist * move / (M_PER_DEG * math.cos(math.radians(self.lat)))
+                self.heading = math.degrees(math.atan2(de, dn)) % 360
+            if self.state == "takeoff" and can_move:
+                self.state = "cruise"
+            if dist - move < ARRIVE_M and abs(alt - self.alt) < 0.5:
+                self.target = None
+                self.speed = 0.0
+                self.arrived.set()
+        else:
+            self.speed = 0.0
+
+        # 배터리: 비행 중 호버 부하 + 속도² 부하, 지상 기지에서는 충전
+        if airborne:
+            load = 1.0 + 0.5 * (self.speed / MAX_SPEED) ** 2
+            self.soc = max(0.0, self.soc - dt * load / ENDURANCE_SEC)
+            if self.soc < RTL_SOC and self.mission_id and not self.low_battery:
+                self.low_battery = True
+                self.arrived.set()          # 비행 태스크를 깨워 복귀 전환
+        elif self.state == "idle" and self.at_home():
+            self.soc = min(1.0, self.soc + dt / CHARGE_SEC)
+
+    def at_home(self) -> bool:
+        return math.hypot(*offset_m(self.lat, self.lon, *HOME)) < 10.0
+
+    def battery_v(self) -> float:
+        return BATTERY_EMPTY_V + (BATTERY_FULL_V - BATTERY_EMPTY_V) * self.soc
+
+    def telemetry(self) -> Dict:
+        return {"drone_id": self.drone_id, "lat": round(self.lat, 7), "lon": round(self.lon, 7),
+                "alt": round(self.alt, 1), "speed_mps": round(self.speed, 2),
+                "battery": round(self.battery_v(), 3)}
+
+
+# --- 3. 군집 ---
+
+class Swarm:
+    def __init__(self, args):
+        self.args = args
+        rng = random.Random(args.seed)
+        self.drones: List[SimDrone] = []
+        for i in range(args.drones):
+            # 기지 주변 spread_m 안에 흩어 배치 (일부는 기지 위에서 대기)
+            r, a = args.spread_m * math.sqrt(rng.random()), rng.uniform(0, 2 * math.pi)
+            lat = HOME[0] + r * math.cos(a) / M_PER_DEG
+            lon = HOME[1] + r * math.sin(a) / (M_PER_DEG * math.cos(math.radians(HOME[0])))
+            self.drones.append(SimDrone(f"{args.prefix}-{i + 1:04d}", lat, lon, rng.uniform(0.6, 1.0)))
+        self.rng = rng
+        self.running = True
+        # 통계
+        self.tele_sent = self.tele_ok = self.tele_late = 0
+        self.tele_errors: Counter = Counter()
+        self.tele_lat_ms: deque = deque(maxlen=20000)
+        self.missions = Counter()           # received / completed / rtl / enqueued
+        # 미션 채널은 드론당 장기 연결 1개, 텔레메트리/ack 는 공유 연결 풀
+        self.stream_client = httpx.AsyncClient(base_url=args.api, timeout=httpx.Timeout(5.0, read=60.0),
+                                               limits=httpx.Limits(max_connections=None))
+        self.client = httpx.AsyncClient(base_url=args.api, timeout=args.timeout,
+                                        limits=httpx.Limits(max_connections=args.concurrency,
+                                                            max_keepalive_connections=args.concurrency))
+
+    # ── 물리 ──
+    async def physics_loop(self):
+        loop = asyncio.get_running_loop()
+        last = loop.time()
+        while self.running:
+            await asyncio.sleep(PHYS_TICK)
+            now = loop.time()
+            dt = (now - last) * self.args.time_scale
+            last = now
+            for d in self.drones:
+                d.step(dt)
+
+    # ── 텔레메트리 ──
+    async def telemetry_loop(self, d: SimDrone):
+        loop = asyncio.get_running_loop()
+        period = 1.0 / self.args.telemetry_hz
+        next_t = loop.time() + self.rng.uniform(0, period)   # 위상 분산 (동시 폭주 방지)
+        while self.running:
+            await asyncio.sleep(max(0.0, next_t - loop.time()))
+            t0 = time.perf_counter()
+            self.tele_sent += 1
+            try:
+                r = await self.client.post("/tracker/update", json=d.telemetry())
+                if r.status_code < 400:
+                    self.tele_ok += 1
+                else:
+                    self.tele_errors[r.status_code] += 1
+            except httpx.HTTPError as e:
+                self.tele_errors[type(e).__name__] += 1
+            self.tele_lat_ms.append((time.perf_counter() - t0) * 1000)
+            next_t += period
+            if next_t < loop.time():        # 서버가 느려 주기를 놓치면 건너뛰고 밀린 보고를 몰아 보내지 않음
+                self.tele_late += 1
+                next_t = loop.time() + period
+
+    # ── 미션 ──
+    async def mission_loop(self, d: SimDrone):
+        while self.running:
+            try:
+                async with self.stream_client.stream("GET", "/missions/stream",
+                                                     params={"drone_id": d.drone_id}) as r:
+                    r.raise_for_status()
+                    event = None
+                    async for line in r.aiter_lines():
+                        if line.startswith("event:"):
+                            event = line[6:].strip()
+                        elif line.startswith("data:") and event == "mission":
+                            await self.fly(d, json.loads(line[5:].strip()))
+                        elif not line:
+                            event = None
+                continue                     # 서버가 채널을 닫으면 재접속
+            except httpx.HTTPError:
+                pass
+            # long-poll 폴백
+            try:
+                r = await self.stream_client.get("/missions/next",
+                                                 params={"wait": LONG_POLL_SEC, "drone_id": d.drone_id},
+                                                 timeout=LONG_POLL_SEC + 5)
+                wp = r.json().get("waypoint") if r.status_code == 200 else None
+            except (httpx.HTTPError, ValueError):
+                wp = None
+            if wp:
+                await self.fly(d, wp)
+            else:
+                await asyncio.sleep(1.0)
+
+    async def _fly_to(self, d: SimDrone, lat, lon, alt, speed, state) -> bool:
+        """목표까지 비행. 배터리 부족으로 중단되면 False."""
+        d.goto(lat, lon, alt, speed, "takeoff" if d.alt < 0.8 * alt else state)
+        await d.arrived.wait()
+        return not (d.low_battery and state != "rtl" and state != "landing")
+
+    async def fly(self, d: SimDrone, wp: Dict):
+        self.missions["received"] += 1
+        d.mission_id = wp["id"]
+        reason = "completed"
+        for leg in wp.get("legs") or [wp]:
+            if not await self._fly_to(d, leg["lat"], leg["lon"], leg["alt"], leg["speed_mps"], "cruise"):
+                reason = "rtl"
+                break
+            if leg.get("loiter_sec", 0) > 0:
+                d.state = "loiter"
+                await asyncio.sleep(leg["loiter_sec"] / self.args.time_scale)
+                if d.low_battery:
+                    reason = "rtl"
+                    break
+        # 기지 복귀 → 착륙
+        await self._fly_to(d, HOME[0], HOME[1], max(d.alt, CRUISE_ALT), MAX_SPEED * 0.8, "rtl")
+        await self._fly_to(d, HOME[0], HOME[1], 0.0, 1.0, "landing")
+        d.state, d.mission_id, d.low_battery = "idle", None, False
+        try:
+            await self.client.post("/missions/ack", json={"mission_id": wp["id"], "reason": reason})
+            self.missions[reason] += 1
+        except httpx.HTTPError as e:
+            self.missions["ack_failed"] += 1
+            print(f"[SWARM] {d.drone_id} ack failed: {e}")
+
+    async def enqueue_loop(self):
+        """--mission-rate 건/초로 기지 주변 무작위 목표를 투입 (디스패처 부하)."""
+        while self.running:
+            await asyncio.sleep(self.rng.expovariate(self.args.mission_rate))
+            r_m, a = self.args.area_m * math.sqrt(self.rng.random()), self.rng.uniform(0, 2 * math.pi)
+            body = {"lat": HOME[0] + r_m * math.cos(a) / M_PER_DEG,
+                    "lon": HOME[1] + r_m * math.sin(a) / (M_PER_DEG * math.cos(math.radians(HOME[0]))),
+                    "altitude": 40.0, "speed_mps": 8.0, "loiter_sec": self.rng.choice((0.0, 0.0, 10.0))}
+            try:
+                await self.client.post("/missions/enqueue", json=body)
+                self.missions["enqueued"] += 1
+            except httpx.HTTPError:
+                self.missions["enqueue_failed"] += 1
+
+    # ── 보고 ──
+    def snapshot(self, elapsed: float) -> Dict:
+        lat = sorted(self.tele_lat_ms)
+        pct = lambda q: round(lat[min(int(q * len(lat)), len(lat) - 1)], 2) if lat else 0.0
+        return {
+            "elapsed_sec": round(elapsed, 1),
+            "drones": dict(Counter(d.state for d in self.drones)),
+            "telemetry": {"sent": self.tele_sent, "ok": self.tele_ok, "late_ticks": self.tele_late,
+                          "errors": dict(self.tele_errors), "rate_per_sec": round(self.tele_sent / max(elapsed, 1e-9), 1),
+                          "p50_ms": pct(0.5), "p99_ms": pct(0.99)},
+            "missions": dict(self.missions),
+            "battery_avg_v": round(sum(d.battery_v() for d in self.drones) / max(len(self.drones), 1), 3),
+        }
+
+    async def report_loop(self, t0: float):
+        while self.running:
+            await asyncio.sleep(self.args.report_sec)
+            s = self.snapshot(time.perf_counter() - t0)
+            t = s["telemetry"]
+            print(f"[SWARM] t={s['elapsed_sec']:.0f}s drones={s['drones']} "
+                  f"tele {t['rate_per_sec']}/s p50={t['p50_ms']}ms p99={t['p99_ms']}ms late={t['late_ticks']} "
+                  f"err={t['errors']} missions={s['missions']} batt={s['battery_avg_v']}V")
+
+    async def run(self) -> Dict:
+        t0 = time.perf_counter()
+        tasks = [asyncio.create_task(self.physics_loop()), asyncio.create_task(self.report_loop(t0))]
+        for d in self.drones:
+            tasks.append(asyncio.create_task(self.telemetry_loop(d)))
+            if not self.args.no_missions:
+                tasks.append(asyncio.create_task(self.mission_loop(d)))
+        if self.args.mission_rate > 0:
+            tasks.append(asyncio.create_task(self.enqueue_loop()))
+        try:
+            if self.args.duration > 0:
+                await asyncio.sleep(self.args.duration)
+            else:
+                await asyncio.gather(*tasks)
+        finally:
+            self.running = False
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.stream_client.aclose()
+            await self.client.aclose()
+        return self.snapshot(time.perf_counter() - t0)
+
+
+# --- 4. 메인 ---
+
+def main():
+    parser = argparse.ArgumentParser(description="Asyncio drone swarm simulator")
+    parser.add_argument("--api", default=API)
+    parser.add_argument("--drones", type=int, default=100)
+    parser.add_argument("--prefix", default="sim-drone", help="drone id prefix (<prefix>-0001 ...)")
+    parser.add_argument("--telemetry-hz", type=float, default=1.0, help="/tracker/update rate per drone")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="simulation speed-up factor")
+    parser.add_argument("--mission-rate", type=float, default=0.0, help="random missions enqueued per second")
+    parser.add_argument("--area-m", type=float, default=1500.0, help="radius for random mission targets")
+    parser.add_argument("--spread-m", type=float, default=300.0, help="radius for initial drone positions")
+    parser.add_argument("--no-missions", action="store_true", help="telemetry only (no mission channels)")
+    parser.add_argument("--concurrency", type=int, default=100, help="shared HTTP connection pool size")
+    parser.add_argument("--timeout", type=float, default=5.0)
+    parser.add_argument("--duration", type=float, default=0.0, help="seconds to run (0 = until Ctrl+C)")
+    parser.add_argument("--report-sec", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", default=None, help="write the final summary to this file")
+    args = parser.parse_args()
+
+    print(f"[SWARM] {args.drones} drones → {args.api} (telemetry {args.telemetry_hz} Hz, x{args.time_scale})")
+    try:
+        summary = asyncio.run(Swarm(args).run())
+    except KeyboardInterrupt:
+        print("\n[SWARM] STOP")
+        return
+    print("[SWARM] summary:", json.dumps(summary, ensure_ascii=False))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,11 +10,13 @@ Admin Control API Router
 
 import os
 from datetime import datetime, timezone
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from server.db.models import SessionLocal, Log             # 데이터베이스 세션 및 로그 모델 임포트
 from server.services.metrics_collector import METRICS     # 시스템 성능 메트릭 수집기 임포트
 from server.api.realtime import broadcast_status          # 실시간 웹소켓 상태 알림 함수 임포트
+from server.services.command_bus import BUS               # 내부 명령 버스 (감사 기록 조회용)
+from server.services.tracing import TRACER                # 종단 간 지연 추적 집계
 
 # 'admin' 태그와 '/admin' 프리픽스를 가진 API 라우터 인스턴스 생성
 router = APIRouter(prefix="/admin", tags=["admin"]) 
@@ -102,3 +104,34 @@ def manual_rtl():
         return {"ok": True, "action": "rtl", "result": res}
     finally:
         db.close() # 작업 완료 후 DB 세션 반드시 닫기
+
+
+@router.get("/commands")
+def command_audit(limit: int = Query(100, ge=1, le=500)):
+    """
+    GET /admin/commands: 내부 명령 버스의 최근 실행 기록(감사 추적)을 조회합니다.
+    자동 RTL 등 서비스 간 명령의 요청자, 시도 횟수, 소요 시간, 실패 사유를 확인할 수 있습니다.
+    
+    Args:
+        limit (int): 반환할 최대 기록 수 (최신순)
+        
+    Returns:
+        list: 명령 실행 기록 목록
+    """
+    return BUS.audit(limit)
+
+
+@router.get("/traces")
+def trace_stats(recent: int = Query(10, ge=0, le=50)):
+    """
+    GET /admin/traces: 종단 간 지연 추적(샘플링) 결과를 조회합니다.
+    센서 수신 → 검증 → DB 커밋 → 브로드캐스트 → SSE 전달, TDOA 해석 → 웨이포인트 적재 → 미션 디스패치
+    각 단계의 지연 백분위수(p50/p90/p99, 최근 TRACE_WINDOW 건 기준)를 종류별로 반환합니다.
+    
+    Args:
+        recent (int): 함께 반환할 최근 완료 추적 수 (단계별 상세)
+        
+    Returns:
+        dict: 샘플링 비율, 추적 수, 종류·단계별 지연 백분위수, 최근 추적 목록
+    """
+    return TRACER.snapshot(recent)
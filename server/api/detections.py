@@ -3,24 +3,32 @@
 #                 이를 저장하며, 웹소켓을 통해 관제 클라이언트에게 브로드캐스트하는 핵심 역할을 수행합니다.
 # 주요 기능: 1. 새로운 감지 데이터를 수신 및 기록합니다.
 #         2. 실시간 대시보드 업데이트를 위해 데이터를 브로드캐스트합니다.
-#         3. 최근 감지 기록을 조회하는 기능을 제공합니다.
+#         3. 최근 감지 기록 조회 및 스트림/클래스/신뢰도/시간 범위 필터 질의(/detections/query)를 제공합니다.
+#            (저장은 server/services/detection_store.py: 색인된 메모리 계층 + DB 일괄 저장)
+#         4. AI 서비스의 프레임/시간 창 단위 일괄 전송(/detections/push_batch)을 한 번에 처리합니다.
+#         5. 추적 이벤트(track_id, birth/update/lost)로 현재 활성 트랙 목록(/detections/tracks)을 유지합니다.
 
-from collections import deque
+import time
+from collections import Counter
 from datetime import datetime, timezone
-from typing import Dict, List
-from fastapi import APIRouter
+from typing import Dict, List, Literal, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel, Field
-from server.api.realtime import broadcast_detection
+from server.api.realtime import broadcast_detection, broadcast_detections
 from server.services.metrics_collector import METRICS    # ✅ B3: 메트릭 수집 서비스 (시스템 성능 및 감지 통계 기록)
+from server.services.detection_store import STORE, QUERY_LIMIT_MAX
 import json
 
 # FastAPI 라우터 인스턴스 생성
 router = APIRouter(prefix="/detections", tags=["detections"])
 
-# 최근 감지 결과를 저장하는 데 사용되는 이중 종료 큐(Double-ended Queue, Deque).
-# maxlen=200 설정으로, 큐의 크기가 200개를 초과하면 가장 오래된 항목(오른쪽)이 자동으로 제거되어
-# 메모리 오버헤드를 방지하고 최근 데이터만 효율적으로 유지 관리합니다.
-_RECENT = deque(maxlen=200)
+PUSH_BATCH_LIMIT = 500   # /detections/push_batch 1회 최대 건수
+
+# 활성 트랙: (stream_id, track_id) → (서버 수신 시각(monotonic), 마지막 이벤트). lost 이벤트가 오면 제거하고,
+# AI 서비스가 비정상 종료해 lost 가 오지 않은 트랙은 TRACK_STALE_SEC 이후 조회 시 정리합니다.
+# (정리 기준은 서버 수신 시각 — 엣지 장비 시계가 틀려도 영향 없음)
+_TRACKS: Dict[Tuple[str, int], Tuple[float, Dict]] = {}
+TRACK_STALE_SEC = 30.0
 
 class Detection(BaseModel):
     """
@@ -33,6 +41,9 @@ class Detection(BaseModel):
         conf (float): 감지 신뢰도 (0.0 ~ 1.0). 데이터 품질 확인 및 필터링에 사용됩니다.
         bbox (List[float] | None): 감지된 객체의 경계 상자(Bounding Box) 좌표. [x1, y1, x2, y2] 형식일 수 있습니다.
         ts (datetime): 감지 데이터가 생성된 UTC 시간 스탬프.
+        latency_ms (float | None): 프레임 캡처부터 탐지 완료까지 걸린 시간(ms). 실시간성 모니터링용.
+        track_id (int | None): 스트림 내에서 같은 객체에 유지되는 추적 ID. (AI 서비스 추적기 부여)
+        event (str | None): 추적 이벤트 종류 — birth(등장), update(이동/변화), lost(소실).
     """
     stream_id: str = Field(..., examples=["drone-1"])
     cls: str = Field(..., examples=["person","smoke","fire"])
@@ -40,6 +51,21 @@ class Detection(BaseModel):
     bbox: List[float] | None = None
     # default_factory를 사용하여 요청 수신 시 UTC 타임존의 현재 시간을 기본값으로 자동 설정합니다.
     ts: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    # AI 서비스가 보고하는 캡처 → 탐지 지연 (선택)
+    latency_ms: float | None = Field(None, ge=0)
+    # 추적 정보 (추적기를 쓰지 않는 클라이언트는 생략 → 기존처럼 프레임 단위 감지로 취급)
+    track_id: int | None = Field(None, ge=0)
+    event: Literal["birth", "update", "lost"] | None = None
+
+def _note_track(item: Dict) -> None:
+    """추적 이벤트를 활성 트랙 테이블에 반영합니다."""
+    if item.get("track_id") is None:
+        return
+    key = (item["stream_id"], item["track_id"])
+    if item.get("event") == "lost":
+        _TRACKS.pop(key, None)
+    else:
+        _TRACKS[key] = (time.monotonic(), item)
 
 @router.post("/push")
 def push_detection(det: Detection):
@@ -57,33 +83,114 @@ def push_detection(det: Detection):
     # ✅ B3: 시스템 운영 메트릭 카운트
     # 감지 이벤트가 발생할 때마다 METRICS 서비스를 통해 해당 횟수를 기록합니다.
     # 이는 시스템의 처리량(Throughput) 및 드론 활동을 모니터링하는 데 중요합니다.
-    METRICS.note_detection()
+    METRICS.note_detection(det.stream_id, det.cls)
 
     # Pydantic 모델을 Python Dict 타입으로 변환합니다.
     item: Dict = det.model_dump()
     
-    # 최근 감지 데이터 큐의 맨 앞(가장 최근)에 항목을 추가합니다.
-    _RECENT.appendleft(item)
+    # 탐지 저장소에 기록합니다. (id 부여, 메모리 색인, DB 일괄 저장 대기열)
+    STORE.add_many([item])
+    _note_track(item)
     
     # 웹소켓을 통해 실시간 관제 클라이언트(프론트엔드)에게 감지 데이터를 브로드캐스트합니다.
     # 데이터는 JSON 문자열로 직렬화되며, `default=str`은 datetime 객체와 같은 기본 타입이 아닌 객체를 문자열로 안전하게 변환합니다.
     broadcast_detection(json.dumps(item, default=str))
     
-    return {"ok": True}
+    return {"ok": True, "id": item["id"]}
+
+@router.post("/push_batch")
+def push_detection_batch(dets: List[Detection]):
+    """
+    **여러 감지 데이터를 한 번에 수신하여 처리합니다.**
+
+    AI 서비스의 백그라운드 퍼블리셔가 한 프레임(또는 짧은 시간 창)의 모든 박스를 모아 보냅니다.
+    메트릭은 (스트림, 클래스)별로 합산해 한 번씩, SSE 는 구독자당 한 번의 큐 적재로 처리합니다.
+
+    Parameters:
+        dets (List[Detection]): 감지 객체 배열 (최대 PUSH_BATCH_LIMIT 건).
+
+    Return Value:
+        Dict: `{"ok": True, "count": n}`
+    """
+    if len(dets) > PUSH_BATCH_LIMIT:
+        raise HTTPException(status_code=413, detail=f"Max {PUSH_BATCH_LIMIT} detections per batch")
+
+    counts = Counter((d.stream_id, d.cls) for d in dets)
+    for (stream_id, cls), n in counts.items():
+        METRICS.note_detection(stream_id, cls, n)
+
+    items: List[Dict] = STORE.add_many([d.model_dump() for d in dets])
+    for item in items:
+        _note_track(item)
+    broadcast_detections([json.dumps(item, default=str) for item in items])
+
+    return {"ok": True, "count": len(items)}
 
 @router.get("/recent")
-def recent(limit: int = 50):
+def recent(limit: int = 50, stream_id: Optional[str] = None, track_id: Optional[int] = None):
     """
     **가장 최근에 기록된 감지 목록을 조회합니다.**
     이 엔드포인트는 관제 시스템 대시보드 초기 로딩 또는 기록 조회를 위해 사용됩니다.
     
     Parameters:
-        limit (int): 반환할 감지 기록의 최대 개수 (기본값: 50).
+        limit (int): 반환할 감지 기록의 최대 개수 (기본값: 50, 1~200).
+        stream_id (str | None): 특정 스트림만 조회.
+        track_id (int | None): 특정 트랙의 이벤트 이력만 조회 (stream_id 와 함께 사용).
+
+    Return Value:
+        List: 최근 감지 기록 목록 (최신순).
+    """
+    # 저장소 색인에서 필요한 개수만 읽습니다. (버퍼 전체 복사 없음)
+    return STORE.recent(max(1, min(limit, 200)), stream_id=stream_id, track_id=track_id)
+
+@router.get("/query")
+def query(
+    stream_id: Optional[str] = None,
+    cls: Optional[str] = None,
+    min_conf: Optional[float] = Query(None, ge=0, le=1),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    track_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=QUERY_LIMIT_MAX),
+    cursor: Optional[str] = Query(None, pattern=r"^-?\d+:\d+$"),
+):
+    """
+    **감지 기록 필터 질의 (대시보드 / 사후 분석용).**
+
+    최신순으로 반환하며, 메모리 계층 범위를 벗어나는 오래된 구간은 DB 에서 이어서 읽습니다.
+
+    Parameters:
+        stream_id, cls (str | None): 스트림 / 클래스 필터.
+        min_conf (float | None): 최소 신뢰도.
+        since, until (datetime | None): 감지 시각 범위 (양 끝 포함, ISO 8601).
+        track_id (int | None): 특정 트랙.
+        limit (int): 페이지 크기 (최대 QUERY_LIMIT_MAX).
+        cursor (str | None): 이전 응답의 next_cursor (다음 페이지).
+
+    Return Value:
+        Dict: `{"count", "items", "next_cursor", "source"}` — next_cursor 가 null 이면 마지막 페이지.
+    """
+    return STORE.query(stream_id=stream_id, cls=cls, min_conf=min_conf, since=since, until=until,
+                       track_id=track_id, limit=limit, cursor=cursor)
+
+@router.get("/tracks")
+def tracks(stream_id: Optional[str] = None):
+    """
+    **현재 활성 트랙 목록을 조회합니다.**
+
+    트랙별 마지막 이벤트(birth/update)를 반환합니다. lost 이벤트를 받은 트랙은 이미 제거되어 있으며,
+    TRACK_STALE_SEC 동안 갱신이 없는 트랙(AI 서비스 중단 등)은 조회 시 정리됩니다.
+
+    Parameters:
+        stream_id (str | None): 특정 스트림의 트랙만 조회.
 
     Return Value:
-        List: 최근 감지 기록 목록 (최대 200개, 요청된 limit 범위 내).
+        Dict: `{"count": n, "tracks": [...]}` (최근 갱신 순)
     """
-    # _RECENT Deque에서 지정된 limit만큼의 슬라이스를 가져옵니다.
-    # max(1, min(limit, 200)) 로직을 통해 limit 값을 1과 200 사이로 안전하게 제한합니다.
-    # 이는 불필요하게 많은 데이터를 요청하는 것을 방지하고, 최소 1개의 결과를 보장합니다.
-    return list(_RECENT)[:max(1, min(limit, 200))]
+    now = time.monotonic()
+    for key, (seen, _) in list(_TRACKS.items()):
+        if now - seen > TRACK_STALE_SEC:
+            _TRACKS.pop(key, None)
+    rows = sorted((v for v in _TRACKS.values() if stream_id is None or v[1]["stream_id"] == stream_id),
+                  key=lambda v: v[0], reverse=True)
+    return {"count": len(rows), "tracks": [item for _, item in rows]}
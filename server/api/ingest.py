@@ -3,39 +3,51 @@
 DrownI Main API Server (Final Integrated Version)
 -------------------------------------------------
 ✅ 기능 포함:
- - 센서 데이터 업링크 (/ingest/audio)
+ - 센서 데이터 업링크 (/ingest/audio, /ingest/audio/batch)
  - FailSafe 모니터링 / 자동 RTL
  - Metrics 실시간 수집
  - 전역 예외 핸들러 (JSON 응답 + 로그)
- - MQTT 브리지 (센서 노드용)
+ - MQTT 브리지 (센서 노드용, 프로세스 내 마이크로 배치 적재)
  - 관리자 제어 API (/admin)
  - API Key 인증 보호
  - 드론 실시간 위치 트래킹
+ - 이벤트/센서/드론 공간 질의 (/spatial)
+ - 센서 상태/배터리 방전 예측 (/sensors/health)
+ - AI 탐지 저장/필터 질의 (/detections/query)
  - SSE 기반 실시간 관제
+ - 종단 간 지연 추적 (샘플링, /admin/traces)
 
 Author : Park Jaekyun (DrownI Project)
 """
 
-import asyncio, json
+import asyncio, time
 from datetime import datetime, timezone
-from typing import Optional, Any, Dict
+from typing import List
 
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field, field_validator
 from sqlalchemy.orm import Session
 
 # ───────────────────────────────────────────────
 # 내부 모듈 import
 # ───────────────────────────────────────────────
 from server.db.models import SessionLocal, init_db, AudioEvent
-from server.services.audio_event_filter import is_event_accepted
 from server.jobs.data_retention import run_scheduler
-from server.services.failsafe_monitor import run_failsafe_monitor, update_sensor_heartbeat
-from server.services.metrics_collector import METRICS, run_metrics_scheduler
+from server.services.failsafe_monitor import run_failsafe_monitor, mark_mission_start
+from server.services.metrics_collector import run_metrics_scheduler
 from server.services.mqtt_bridge import run_mqtt_bridge
-from server.api.realtime import broadcast_event
+from server.services.waypoint_builder import restore_missions, inflight_missions, run_journal_compactor
+from server.services.command_bus import BUS
+from server.services.track_history import run_track_flusher
+from server.services.detection_store import STORE as DETECTION_STORE, run_detection_flusher
+from server.services.spatial_index import seed_sensors, warm_start, SPATIAL_EVENT_CAPACITY
+from server.services.tdoa_solver import SENSOR_POSITIONS
+from server.services.ingest_pipeline import IngestPayload, ingest_batch, parse_uplink, start_traces
+from server.services.uplink_codec import CONTENT_TYPE as UPLINK_CONTENT_TYPE
 from server.core.error_handler import register_exception_handlers
+from server.core.timing_middleware import TimingMiddleware
 from server.security.auth import verify_api_key
 
 # ───────────────────────────────────────────────
@@ -55,6 +67,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 라우트별 요청 지연 히스토그램 (가장 바깥에서 측정하도록 마지막에 등록)
+app.add_middleware(TimingMiddleware)
+
 # ───────────────────────────────────────────────
 # 라우터 등록
 # ───────────────────────────────────────────────
@@ -67,6 +82,8 @@ from server.api.detections import router as detections_router
 from server.api.realtime import router as realtime_router
 from server.api.metrics import router as metrics_router
 from server.api.admin import router as admin_router
+from server.api.spatial import router as spatial_router
+from server.api.sensors import router as sensors_router
 from server.services import drone_tracker
 
 app.include_router(tdoa_router)
@@ -78,6 +95,8 @@ app.include_router(detections_router)
 app.include_router(realtime_router)
 app.include_router(metrics_router)
 app.include_router(drone_tracker.router)
+app.include_router(spatial_router)
+app.include_router(sensors_router)
 # ✅ 관리자 API는 인증 보호 적용
 app.include_router(admin_router, dependencies=[Depends(verify_api_key)])
 
@@ -91,35 +110,39 @@ def get_db():
     finally:
         db.close()
 
-# ───────────────────────────────────────────────
-# 요청 모델 정의
-# ───────────────────────────────────────────────
-class IngestPayload(BaseModel):
-    sensor_id: str = Field(..., examples=["sensor-001"])
-    prob_help: float = Field(..., ge=0.0, le=1.0, examples=[0.95])
-    ts: Optional[datetime] = None
-    battery: Optional[float] = None
-    features: Optional[Dict[str, Any]] = None
-    meta: Optional[Dict[str, Any]] = None
-
-    @field_validator("ts", mode="before")
-    @classmethod
-    def parse_ts(cls, v):
-        if v is None or isinstance(v, datetime):
-            return v
-        return datetime.fromisoformat(str(v).replace("Z", "+00:00"))
+INGEST_BATCH_LIMIT = 1000   # /ingest/audio/batch 1회 최대 건수
 
 # ───────────────────────────────────────────────
 # 서버 시작 시 초기화
 # ───────────────────────────────────────────────
 @app.on_event("startup")
 def on_startup():
-    """DB 초기화 + 스케줄러 + 페일세이프 + 메트릭 수집기 + MQTT 브리지 실행"""
+    """DB 초기화 + 미션 큐 복구 + 스케줄러 + 페일세이프 + 메트릭 수집기 + MQTT 브리지 실행"""
     init_db()
+    BUS.bind(asyncio.get_event_loop())            # 스레드풀에서의 명령 제출용
+    restored = restore_missions()                 # 저널 → 대기/진행 중 미션 복구
+    for wp in sorted(inflight_missions(), key=lambda w: w.get("dispatched_at") or ""):
+        started = wp.get("dispatched_at")
+        mark_mission_start(wp["id"], datetime.fromisoformat(started).timestamp() if started else None)
+    if restored:
+        print(f"[DrownI] Restored {restored} missions from journal")
+    seed_sensors(SENSOR_POSITIONS)                # 공간 인덱스: 등록 센서 + 최근 이벤트
+    db = SessionLocal()
+    try:
+        rows = (db.query(AudioEvent.id, AudioEvent.sensor_id, AudioEvent.ts, AudioEvent.prob_help, AudioEvent.meta)
+                .filter(AudioEvent.accepted.is_(True), AudioEvent.meta.isnot(None))
+                .order_by(AudioEvent.id.desc()).limit(SPATIAL_EVENT_CAPACITY).all())
+    finally:
+        db.close()
+    print(f"[DrownI] Spatial index warm start: {warm_start(reversed(rows))} events")
+    print(f"[DrownI] Detection store warm start: {DETECTION_STORE.warm_start()} detections")
     asyncio.create_task(run_scheduler())          # 7일 데이터 보존 정책
     asyncio.create_task(run_failsafe_monitor())   # 드론/센서 상태 감시
     asyncio.create_task(run_metrics_scheduler())  # Metrics 롤링
-    asyncio.create_task(run_mqtt_bridge())        # MQTT → HTTP 브리지
+    asyncio.create_task(run_mqtt_bridge())        # MQTT → 적재 파이프라인
+    asyncio.create_task(run_journal_compactor())  # 미션 저널 스냅샷
+    asyncio.create_task(run_track_flusher())      # 드론 궤적 DB 일괄 저장
+    asyncio.create_task(run_detection_flusher())  # AI 탐지 결과 DB 일괄 저장
     print(f"[DrownI] Server started at {datetime.now(timezone.utc).isoformat()}")
 
 # ───────────────────────────────────────────────
@@ -132,52 +155,46 @@ def health():
 # ───────────────────────────────────────────────
 # 센서 업링크 API
 # ───────────────────────────────────────────────
-@app.post("/ingest/audio", status_code=202)
-def ingest_audio(payload: IngestPayload, db: Session = Depends(get_db)):
+async def uplink_payloads(request: Request) -> List[IngestPayload]:
+    """Content-Type 에 따라 JSON 또는 바이너리 프레임(application/x-drowni-uplink) 바디를 해석."""
+    received = time.time()
+    body = await request.body()
+    ctype = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    try:
+        payloads = parse_uplink(body, binary=(ctype == UPLINK_CONTENT_TYPE))
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Malformed uplink body: {e}")
+    start_traces(payloads, received)
+    return payloads
+
+def _uplink_body(schema: dict) -> dict:
+    return {"requestBody": {"required": True, "content": {
+        "application/json": {"schema": schema},
+        UPLINK_CONTENT_TYPE: {"schema": {"type": "string", "format": "binary"}},
+    }}}
+
+_PAYLOAD_SCHEMA = IngestPayload.model_json_schema()
+
+@app.post("/ingest/audio", status_code=202, openapi_extra=_uplink_body(_PAYLOAD_SCHEMA))
+def ingest_audio(payloads: List[IngestPayload] = Depends(uplink_payloads), db: Session = Depends(get_db)):
     """
     센서 → 서버 업링크 처리:
      - prob_help >= threshold → 이벤트 accepted
      - 배터리 상태 갱신
      - 메트릭 카운트 및 SSE 브로드캐스트
+    (MQTT 경로와 같은 ingest_pipeline 을 사용, 바디는 JSON 또는 바이너리 프레임 1개)
     """
-    # ✅ Metrics 카운트
-    METRICS.note_audio_event()
-
-    ts = payload.ts or datetime.now(timezone.utc)
-    accepted = is_event_accepted(payload.prob_help)
-
-    # 센서 하트비트 갱신
-    update_sensor_heartbeat(payload.sensor_id, payload.battery or 4.0)
-
-    # DB 저장
-    ev = AudioEvent(
-        sensor_id=payload.sensor_id,
-        prob_help=payload.prob_help,
-        accepted=accepted,
-        ts=ts,
-        battery=payload.battery,
-        features=json.dumps(payload.features) if payload.features else None,
-        meta=json.dumps(payload.meta) if payload.meta else None,
-    )
-    db.add(ev)
-    db.commit()
-    db.refresh(ev)
-
-    # SSE 브로드캐스트 (지도/실시간 이벤트)
-    if accepted:
-        meta = payload.meta or {}
-        broadcast_event(json.dumps({
-            "type": "audio_event",
-            "id": ev.id,
-            "ts": ts.isoformat(),
-            "sensor_id": payload.sensor_id,
-            "prob_help": payload.prob_help,
-            "lat": meta.get("lat"),
-            "lon": meta.get("lon"),
-        }, default=str))
-
-    return {
-        "status": "accepted" if accepted else "queued",
-        "event_id": ev.id,
-        "accepted": accepted,
-    }
+    if len(payloads) != 1:
+        raise HTTPException(status_code=400, detail="Exactly one event expected (use /ingest/audio/batch)")
+    return ingest_batch(payloads, db)[0]
+
+@app.post("/ingest/audio/batch", status_code=202,
+          openapi_extra=_uplink_body({"type": "array", "items": _PAYLOAD_SCHEMA}))
+def ingest_audio_batch(payloads: List[IngestPayload] = Depends(uplink_payloads), db: Session = Depends(get_db)):
+    """게이트웨이용 일괄 업링크 (JSON 배열 또는 이어 붙인 바이너리 프레임): 한 번의 커밋으로 저장, 결과는 입력 순서대로."""
+    if len(payloads) > INGEST_BATCH_LIMIT:
+        raise HTTPException(status_code=413, detail=f"Max {INGEST_BATCH_LIMIT} events per batch")
+    results = ingest_batch(payloads, db)
+    return {"count": len(results), "results": results}
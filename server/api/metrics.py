@@ -1,9 +1,56 @@
 # server/api/metrics.py
-from fastapi import APIRouter
-from server.services.metrics_collector import METRICS
+import re
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+from server.services.metrics_collector import METRICS, RESOLUTIONS, DEFAULT_RESOLUTION
+from server.services.prom_metrics import render
 
 router = APIRouter(prefix="/metrics", tags=["metrics"])
 
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+def _parse_range(value: str) -> int:
+    """'90s' / '30m' / '24h' / '7d' 또는 초 단위 정수"""
+    m = re.fullmatch(r"(\d+)([smhd]?)", value.strip())
+    if not m:
+        raise HTTPException(status_code=400, detail=f"Invalid range: {value}")
+    return int(m.group(1)) * _UNITS[m.group(2) or "s"]
+
 @router.get("/summary")
-def summary():
-    return METRICS.snapshot()
+def summary(resolution: str = Query(DEFAULT_RESOLUTION, pattern="^(1s|1m|1h)$"),
+            range_: str = Query("30m", alias="range", examples=["30m", "24h", "7d"])):
+    """
+    누적 카운터 + 타임시리즈. resolution 별 최대 조회 범위는 1s=1h, 1m=24h, 1h=30d.
+    """
+    range_sec = _parse_range(range_)
+    res, size = RESOLUTIONS[resolution]
+    if range_sec > res * size:
+        raise HTTPException(status_code=400,
+                            detail=f"range exceeds retention of {resolution} ({res * size}s)")
+    return METRICS.snapshot(resolution, range_sec)
+
+@router.get("/labels")
+def labels(top: int = Query(20, ge=1, le=500)):
+    """센서/스트림/탐지 클래스별 상위 카운트 (family 별 Space-Saving 스케치)"""
+    return {name: counter.top(top) for name, counter in METRICS.labels.items()}
+
+@router.get("/labels/{family}")
+def label_family(family: str, top: int = Query(20, ge=1, le=500),
+                 silent_sec: Optional[float] = Query(None, ge=0)):
+    """
+    단일 family 조회. silent_sec 를 주면 해당 시간 이상 보고가 끊긴 키를 오래된 순으로 반환
+    (예: /metrics/labels/detections_by_stream?silent_sec=60 → 1분 이상 조용한 스트림).
+    """
+    counter = METRICS.labels.get(family)
+    if counter is None:
+        raise HTTPException(status_code=404, detail=f"Unknown label family: {family}")
+    return counter.top(top, silent_sec)
+
+@router.get("/prom", response_class=PlainTextResponse)
+def prom(request: Request):
+    """Prometheus 스크레이프용. Accept 헤더에 openmetrics 가 있으면 OpenMetrics 포맷으로 응답."""
+    if "application/openmetrics-text" in request.headers.get("accept", ""):
+        return PlainTextResponse(render(openmetrics=True),
+                                 media_type="application/openmetrics-text; version=1.0.0; charset=utf-8")
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4; charset=utf-8")
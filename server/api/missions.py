@@ -1,18 +1,25 @@
 # server/api/missions.py
-from fastapi import APIRouter
+import asyncio
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Dict
+from typing import Dict, Optional
 import json
 
 from server.services.waypoint_builder import (
-    build_waypoint, enqueue_waypoint, get_next_waypoint, peek_queue_size
+    build_waypoint, enqueue_waypoint, peek_queue_size,
+    wait_next_waypoint, requeue_waypoint, wait_for_change, is_inflight,
 )
 from server.services.failsafe_monitor import mark_mission_start, mark_mission_end
 from server.api.realtime import broadcast_status
 from server.services.metrics_collector import METRICS       # ✅ B3
+from server.services.tracing import TRACER
 
 router = APIRouter(prefix="/missions", tags=["missions"])
 
+MAX_WAIT_SEC = 60.0
+KEEPALIVE_SEC = 15.0   # 미션 채널 keep-alive 주기 (연결 끊김 감지용)
+
 class EnqueueReq(BaseModel):
     lat: float = Field(...); lon: float = Field(...)
     altitude: float = 50.0; speed_mps: float = 5.0; loiter_sec: float = 0.0
@@ -24,22 +31,65 @@ class AckReq(BaseModel):
 @router.post("/enqueue")
 def enqueue(req: EnqueueReq) -> Dict:
     wp = build_waypoint(req.lat, req.lon, req.altitude, req.speed_mps, req.loiter_sec)
-    enqueue_waypoint(wp)
+    durable = enqueue_waypoint(wp)
     # ✅ B3: 미션 등록 카운트
     METRICS.note_mission_enqueued()
 
     broadcast_status(json.dumps({"type":"mission_enqueued","waypoint":wp}))
-    return {"queued": True, "waypoint": wp, "queue_size": peek_queue_size()}
+    return {"queued": True, "durable": durable, "waypoint": wp, "queue_size": peek_queue_size()}
+
+def _dispatch(wp: Dict) -> None:
+    mark_mission_start(wp["id"])
+    # TDOA 에서 시작된 추적: 출격에 묶인 레그마다 디스패치 시각 표시 후 종료
+    for leg in wp.get("legs") or [wp]:
+        tr = TRACER.take(leg["id"])
+        if tr:
+            tr.mark("mission_dispatched")
+            TRACER.finish(tr)
+    broadcast_status(json.dumps({"type":"mission_dispatched","waypoint":wp}))
 
 @router.get("/next")
-def next_mission() -> Dict:
-    wp = get_next_waypoint()
+async def next_mission(wait: float = Query(0.0, ge=0.0, le=MAX_WAIT_SEC),
+                       drone_id: Optional[str] = None) -> Dict:
+    """
+    다음 미션 조회. wait > 0 이면 미션이 들어올 때까지 최대 wait 초 동안 응답을 보류(long-poll).
+    """
+    wp = await wait_next_waypoint(wait, drone_id)
     if not wp:
         return {"waypoint": None}
-    mark_mission_start(wp["id"])
-    broadcast_status(json.dumps({"type":"mission_dispatched","waypoint":wp}))
+    _dispatch(wp)
     return {"waypoint": wp}
 
+async def _mission_channel(request: Request, drone_id: str):
+    """
+    드론 1대 전용 미션 채널.
+     - 미션이 배정되는 즉시 `event: mission` 으로 푸시
+     - 해당 미션이 ack/timeout 으로 끝날 때까지 다음 미션은 보내지 않음
+     - 유휴 시에는 keep-alive 주석만 전송
+    """
+    try:
+        while not await request.is_disconnected():
+            wp = await wait_next_waypoint(KEEPALIVE_SEC, drone_id)
+            if not wp:
+                yield ": keepalive\n\n"
+                continue
+            try:
+                yield f"event: mission\ndata: {json.dumps(wp)}\n\n"
+            except BaseException:
+                requeue_waypoint(wp)
+                raise
+            _dispatch(wp)
+            while is_inflight(wp["id"]):
+                if not await wait_for_change(KEEPALIVE_SEC):
+                    yield ": keepalive\n\n"
+    except asyncio.CancelledError:
+        pass
+
+@router.get("/stream")
+async def mission_stream(request: Request, drone_id: str = Query(..., examples=["drone-001"])):
+    """GET /missions/stream?drone_id=: 드론별 미션 푸시 채널 (SSE)"""
+    return StreamingResponse(_mission_channel(request, drone_id), media_type="text/event-stream")
+
 @router.post("/ack")
 def ack(req: AckReq) -> Dict:
     mark_mission_end(req.mission_id, reason=req.reason)
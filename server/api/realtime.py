@@ -3,6 +3,8 @@ import asyncio
 from fastapi import APIRouter, Request
 from fastapi.responses import StreamingResponse
 
+from server.services.tracing import TRACER
+
 router = APIRouter(prefix="/realtime", tags=["realtime"])
 
 # 구독 큐
@@ -11,33 +13,48 @@ _det_subs: list[asyncio.Queue] = []
 _status_subs: list[asyncio.Queue] = []
 _event_subs: list[asyncio.Queue] = []
 
-async def _gen(q: asyncio.Queue):
+async def _gen(q: asyncio.Queue, subs: list[asyncio.Queue]):
     try:
         while True:
             msg = await q.get()
-            yield f"data: {msg}\n\n"
+            if isinstance(msg, list):
+                # 일괄 브로드캐스트: 이벤트는 건별로 유지하되 한 번에 기록
+                yield "".join(f"data: {m}\n\n" for m in msg)
+            elif isinstance(msg, tuple):
+                # (메시지, 추적): 첫 구독자에게 기록된 시각을 sse_write 로 표시
+                msg, tr = msg
+                yield f"data: {msg}\n\n"
+                if not tr.done:
+                    tr.mark("sse_write")
+                    TRACER.finish(tr)
+            else:
+                yield f"data: {msg}\n\n"
     except asyncio.CancelledError:
         pass
+    finally:
+        # 연결이 끊긴 구독자의 큐 제거 (브로드캐스트 대상/메모리 누수 방지)
+        if q in subs:
+            subs.remove(q)
 
 @router.get("/logs")
 async def stream_logs(request: Request):
     q = asyncio.Queue(); _log_subs.append(q)
-    return StreamingResponse(_gen(q), media_type="text/event-stream")
+    return StreamingResponse(_gen(q, _log_subs), media_type="text/event-stream")
 
 @router.get("/detections")
 async def stream_detections(request: Request):
     q = asyncio.Queue(); _det_subs.append(q)
-    return StreamingResponse(_gen(q), media_type="text/event-stream")
+    return StreamingResponse(_gen(q, _det_subs), media_type="text/event-stream")
 
 @router.get("/status")
 async def stream_status(request: Request):
     q = asyncio.Queue(); _status_subs.append(q)
-    return StreamingResponse(_gen(q), media_type="text/event-stream")
+    return StreamingResponse(_gen(q, _status_subs), media_type="text/event-stream")
 
 @router.get("/events")
 async def stream_events(request: Request):
     q = asyncio.Queue(); _event_subs.append(q)
-    return StreamingResponse(_gen(q), media_type="text/event-stream")
+    return StreamingResponse(_gen(q, _event_subs), media_type="text/event-stream")
 
 def broadcast_log(message: str):
     for q in _log_subs: q.put_nowait(message)
@@ -45,8 +62,29 @@ def broadcast_log(message: str):
 def broadcast_detection(message: str):
     for q in _det_subs: q.put_nowait(message)
 
+def broadcast_detections(messages: list[str]):
+    """여러 감지를 구독자당 큐 1회 적재로 전달 (SSE 이벤트는 건별)."""
+    if messages:
+        for q in _det_subs: q.put_nowait(messages)
+
 def broadcast_status(message: str):
     for q in _status_subs: q.put_nowait(message)
 
-def broadcast_event(message: str):
-    for q in _event_subs: q.put_nowait(message)
+def broadcast_event(message: str, trace=None):
+    if trace is None:
+        for q in _event_subs: q.put_nowait(message)
+        return
+    trace.mark("broadcast_enqueue")
+    if not _event_subs:
+        TRACER.finish(trace)          # 구독자 없음: 적재까지만 집계
+        return
+    for q in _event_subs: q.put_nowait((message, trace))
+
+def subscriber_stats() -> dict[str, dict[str, int]]:
+    """채널별 구독자 수와 대기 중인 메시지 수 (지표 수집용)"""
+    out = {}
+    for ch, subs in (("logs", _log_subs), ("detections", _det_subs),
+                     ("status", _status_subs), ("events", _event_subs)):
+        sizes = [q.qsize() for q in list(subs)]
+        out[ch] = {"subscribers": len(sizes), "queued": sum(sizes), "max_queued": max(sizes, default=0)}
+    return out
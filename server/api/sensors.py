@@ -0,0 +1,31 @@
+# server/api/sensors.py
+"""
+Sensor Fleet Health API
+-----------------------
+GET /sensors/health : 센서별 마지막 수신, 패킷률, 배터리 추세(V/h), 방전 예상까지 남은 시간
+ - sort: sensor_id | last_seen | rate_per_min | battery | slope_v_per_h | hours_left | packets
+ - only: stale(하트비트 만료) | alive | low_battery
+ - max_hours_left: N 시간 안에 방전 예상인 센서만 (배터리 교체 계획용)
+메모리 테이블(sensor_health.HEALTH)만 읽으므로 DB 를 건드리지 않는다.
+"""
+
+from typing import Literal, Optional
+from fastapi import APIRouter, HTTPException, Query
+
+from server.services.sensor_health import HEALTH, SORT_KEYS
+from server.services.failsafe_monitor import HEARTBEAT_TIMEOUT, LOW_BATTERY_THRESHOLD
+
+router = APIRouter(prefix="/sensors", tags=["sensors"])
+
+@router.get("/health")
+def sensor_health(sort: str = "hours_left",
+                  order: Literal["asc", "desc"] = "asc",
+                  only: Optional[Literal["stale", "alive", "low_battery"]] = None,
+                  max_hours_left: Optional[float] = Query(None, ge=0),
+                  max_battery: Optional[float] = Query(None, gt=0),
+                  limit: int = Query(500, ge=1, le=10000)):
+    if sort not in SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {list(SORT_KEYS)}")
+    return HEALTH.query(sort=sort, desc=(order == "desc"), stale_after=HEARTBEAT_TIMEOUT,
+                        only=only, max_hours_left=max_hours_left, max_battery=max_battery,
+                        low_battery=LOW_BATTERY_THRESHOLD, limit=limit)
@@ -0,0 +1,52 @@
+# server/api/spatial.py
+"""
+Spatial Query API
+-----------------
+지도 뷰포트/출동 판단용 공간 질의 (메모리 격자 인덱스, DB 조회 없음).
+ - GET /spatial/bbox    : 사각 영역 내 이벤트/센서/드론
+ - GET /spatial/radius  : 중심 좌표 반경(m) 내, 가까운 순
+ - GET /spatial/nearest : k-최근접 (예: 이벤트 지점에서 가장 가까운 드론)
+layers 는 쉼표 구분 (event,sensor,drone), 생략 시 전체.
+"""
+
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query
+
+from server.services.spatial_index import INDEX, LAYERS
+
+router = APIRouter(prefix="/spatial", tags=["spatial"])
+
+def _parse_layers(layers: Optional[str]) -> Optional[List[str]]:
+    if not layers:
+        return None
+    names = [l.strip() for l in layers.split(",") if l.strip()]
+    unknown = [l for l in names if l not in LAYERS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown layers: {unknown} (use {list(LAYERS)})")
+    return names
+
+@router.get("/bbox")
+def bbox(min_lat: float = Query(..., ge=-90, le=90), min_lon: float = Query(..., ge=-180, le=180),
+         max_lat: float = Query(..., ge=-90, le=90), max_lon: float = Query(..., ge=-180, le=180),
+         layers: Optional[str] = None, limit: int = Query(1000, ge=1, le=10000)):
+    if min_lat > max_lat or min_lon > max_lon:
+        raise HTTPException(status_code=400, detail="min must be <= max")
+    items = INDEX.bbox(min_lat, min_lon, max_lat, max_lon, _parse_layers(layers), limit)
+    return {"count": len(items), "items": items}
+
+@router.get("/radius")
+def radius(lat: float = Query(..., ge=-90, le=90), lon: float = Query(..., ge=-180, le=180),
+           radius_m: float = Query(..., gt=0, le=50_000),
+           layers: Optional[str] = None, limit: int = Query(1000, ge=1, le=10000)):
+    items = INDEX.radius(lat, lon, radius_m, _parse_layers(layers), limit)
+    return {"count": len(items), "items": items}
+
+@router.get("/nearest")
+def nearest(lat: float = Query(..., ge=-90, le=90), lon: float = Query(..., ge=-180, le=180),
+            k: int = Query(5, ge=1, le=100), layers: Optional[str] = None):
+    items = INDEX.nearest(lat, lon, k, _parse_layers(layers))
+    return {"count": len(items), "items": items}
+
+@router.get("/stats")
+def stats():
+    return INDEX.stats()
@@ -1,10 +1,12 @@
 # server/api/tdoa.py
-from typing import List
+import time
+from typing import List, Optional
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 
 from server.services.tdoa_solver import estimate_location, SENSOR_POSITIONS
 from server.services.waypoint_builder import build_waypoint, enqueue_waypoint, peek_queue_size
+from server.services.tracing import TRACER
 
 router = APIRouter(prefix="/tdoa", tags=["tdoa"])
 
@@ -14,6 +16,7 @@ class Arrival(BaseModel):
 
 class SolveRequest(BaseModel):
     arrivals: List[Arrival]
+    trace_id: Optional[str] = Field(None, max_length=64)   # 지정 시 항상 추적
 
 class SolveResponse(BaseModel):
     lat: float
@@ -21,19 +24,30 @@ class SolveResponse(BaseModel):
     used_sensors: List[str]
     waypoint_id: str
     queue_size: int
+    durable: bool = True          # False: 저널 커밋 확인 전에 응답 (재시작 시 유실 가능)
+    trace_id: Optional[str] = None
 
 @router.post("/solve", response_model=SolveResponse)
 def solve(req: SolveRequest):
+    received = time.time()
     if len(req.arrivals) < 3:
         raise HTTPException(status_code=400, detail="At least 3 arrivals required.")
     arrivals = [a.model_dump() for a in req.arrivals if a.sensor_id in SENSOR_POSITIONS]
     if len(arrivals) < 3:
         raise HTTPException(status_code=400, detail="Need 3+ known sensors.")
+    # 검증을 통과한 요청만 추적 (400 응답은 started 만 늘리고 끝나지 않으므로)
+    tr = TRACER.begin("tdoa", req.trace_id, received=received)
     lat, lon = estimate_location(arrivals)
+    if tr:
+        tr.mark("tdoa_solved")
 
-    # 웨이포인트 자동 생성 및 큐 삽입
+    # 웨이포인트 자동 생성 및 큐 삽입 (추적은 미션 디스패치 시 종료)
     wp = build_waypoint(lat, lon)
-    enqueue_waypoint(wp)
+    # 큐에 들어가는 즉시 디스패치될 수 있으므로 (enqueue 는 저널 커밋을 기다린다) 추적을 먼저 연결
+    if tr:
+        tr.mark("waypoint_enqueued")
+        TRACER.link(wp["id"], tr)
+    durable = enqueue_waypoint(wp)
 
     return SolveResponse(
         lat=lat,
@@ -41,4 +55,6 @@ def solve(req: SolveRequest):
         used_sensors=[a["sensor_id"] for a in arrivals],
         waypoint_id=wp["id"],
         queue_size=peek_queue_size(),
+        durable=durable,
+        trace_id=tr.trace_id if tr else None,
     )
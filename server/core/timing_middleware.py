@@ -0,0 +1,43 @@
+# server/core/timing_middleware.py
+"""
+Request Timing Middleware
+-------------------------
+순수 ASGI 미들웨어로 요청별 처리 시간을 라우트 템플릿 단위 히스토그램에 기록한다.
+(BaseHTTPMiddleware 와 달리 응답 본문을 감싸지 않으므로 SSE 스트리밍에도 부담이 없다)
+ - 라벨: method, route(예: /missions/next) — 경로 파라미터 값이 아닌 템플릿이라 카디널리티 고정
+ - 라우트에 매칭되지 않은 요청은 "<unmatched>" 하나로 묶는다
+"""
+
+import time
+from server.services.prom_metrics import HTTP_DURATION, HTTP_RESPONSES, HTTP_IN_FLIGHT
+
+_STATUS_CLASS = ("1xx", "2xx", "3xx", "4xx", "5xx")
+
+class TimingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.value += 1
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - t0
+            HTTP_IN_FLIGHT.value -= 1
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "<unmatched>"
+            method = scope["method"]
+            HTTP_DURATION.child(method, path).observe(elapsed)
+            HTTP_RESPONSES.inc(method, path, _STATUS_CLASS[min(max(status // 100, 1), 5) - 1])
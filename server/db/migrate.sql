@@ -23,6 +23,35 @@ CREATE TABLE IF NOT EXISTS logs (
   ts TEXT NOT NULL
 );
 
+-- 드론 비행 궤적 테이블 (track_history 배치 저장)
+CREATE TABLE IF NOT EXISTS drone_tracks (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  drone_id TEXT NOT NULL,
+  ts TEXT NOT NULL,
+  lat REAL NOT NULL,
+  lon REAL NOT NULL,
+  alt REAL,
+  speed_mps REAL,
+  battery REAL
+);
+
+-- AI 탐지 결과 테이블 (detection_store 배치 저장, id 는 저장소가 부여)
+CREATE TABLE IF NOT EXISTS detections (
+  id INTEGER PRIMARY KEY,
+  stream_id TEXT NOT NULL,
+  cls TEXT NOT NULL,
+  conf REAL NOT NULL,
+  ts TEXT NOT NULL,
+  bbox TEXT,
+  latency_ms REAL,
+  track_id INTEGER,
+  event TEXT
+);
+
 -- 인덱스 생성
 CREATE INDEX IF NOT EXISTS idx_audio_events_ts ON audio_events(ts);
 CREATE INDEX IF NOT EXISTS idx_audio_events_accepted ON audio_events(accepted);
+CREATE INDEX IF NOT EXISTS idx_drone_tracks_drone_ts ON drone_tracks(drone_id, ts);
+CREATE INDEX IF NOT EXISTS idx_detections_ts ON detections(ts);
+CREATE INDEX IF NOT EXISTS idx_detections_stream_ts ON detections(stream_id, ts);
+CREATE INDEX IF NOT EXISTS idx_detections_cls_ts ON detections(cls, ts);
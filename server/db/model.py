@@ -1,7 +1,7 @@
 # server/db/models.py
 import os
 from datetime import datetime, timezone
-from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, DateTime, Text
+from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, DateTime, Text, Index
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./drowni.db")
@@ -38,6 +38,38 @@ class Log(Base):
     ts = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
 
 
+class DroneTrack(Base):
+    __tablename__ = "drone_tracks"
+    __table_args__ = (Index("idx_drone_tracks_drone_ts", "drone_id", "ts"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    drone_id = Column(String, nullable=False)
+    ts = Column(DateTime, nullable=False)
+    lat = Column(Float, nullable=False)
+    lon = Column(Float, nullable=False)
+    alt = Column(Float, nullable=True)
+    speed_mps = Column(Float, nullable=True)
+    battery = Column(Float, nullable=True)
+
+class DetectionRecord(Base):
+    __tablename__ = "detections"
+    __table_args__ = (
+        Index("idx_detections_ts", "ts"),
+        Index("idx_detections_stream_ts", "stream_id", "ts"),
+        Index("idx_detections_cls_ts", "cls", "ts"),
+    )
+
+    id = Column(Integer, primary_key=True)      # detection_store 가 부여 (메모리 계층과 같은 id)
+    stream_id = Column(String, nullable=False)
+    cls = Column(String, nullable=False)
+    conf = Column(Float, nullable=False)
+    ts = Column(DateTime, nullable=False)
+    bbox = Column(Text, nullable=True)          # JSON 문자열
+    latency_ms = Column(Float, nullable=True)
+    track_id = Column(Integer, nullable=True)
+    event = Column(String, nullable=True)
+
+
 def init_db():
     """마이그레이션 SQL을 대체하는 최소 초기화 (테이블 생성)"""
     Base.metadata.create_all(bind=engine)
@@ -2,7 +2,7 @@
 import asyncio
 from datetime import datetime, timedelta, timezone
 from sqlalchemy import delete
-from server.db.models import SessionLocal, AudioEvent, Log
+from server.db.models import SessionLocal, AudioEvent, Log, DroneTrack, DetectionRecord
 import os
 
 RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "7"))
@@ -13,9 +13,11 @@ async def clean_database():
     try:
         de = db.execute(delete(AudioEvent).where(AudioEvent.ts < cutoff))
         dl = db.execute(delete(Log).where(Log.ts < cutoff))
+        dt = db.execute(delete(DroneTrack).where(DroneTrack.ts < cutoff))
+        dd = db.execute(delete(DetectionRecord).where(DetectionRecord.ts < cutoff.replace(tzinfo=None)))
         db.commit()
         print(f"[Retention] {datetime.now(timezone.utc).isoformat()} => "
-              f"audio_events:{de.rowcount}, logs:{dl.rowcount}")
+              f"audio_events:{de.rowcount}, logs:{dl.rowcount}, drone_tracks:{dt.rowcount}, detections:{dd.rowcount}")
     finally:
         db.close()
 
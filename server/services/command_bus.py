@@ -0,0 +1,147 @@
+# server/services/command_bus.py
+"""
+Command Bus
+-----------
+서버 내부 서비스가 RTL·로그 기록·브로드캐스트 등의 동작을 HTTP 루프백 없이 직접 호출하는 비동기 명령 버스.
+ - 명령별 핸들러(async) 등록: 타임아웃 / 재시도 횟수 / 백오프 지정
+ - dispatch(): 이벤트 루프 안에서 실행 (블로킹 I/O 는 핸들러가 스레드로 넘김)
+ - submit(): 결과를 기다리지 않는 실행, 다른 스레드에서도 호출 가능
+ - 감사 기록(audit trail): 최근 명령의 요청자/시도 횟수/소요 시간/결과를 보관
+"""
+
+from __future__ import annotations
+import asyncio, itertools, json, time
+from collections import deque
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from server.db.models import SessionLocal, Log
+from server.api.realtime import broadcast_status, broadcast_log, broadcast_event
+from server.services.metrics_collector import METRICS
+
+AUDIT_SIZE = 500
+
+Handler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+@dataclass
+class _Route:
+    handler: Handler
+    timeout: float
+    retries: int
+    backoff: float
+
+@dataclass
+class CommandRecord:
+    id: int
+    name: str
+    source: str
+    payload: Dict[str, Any]
+    issued_at: str
+    status: str = "pending"       # pending|ok|failed
+    attempts: int = 0
+    duration_ms: float = 0.0
+    error: Optional[str] = None
+    result: Any = None
+
+class CommandBus:
+    def __init__(self, audit_size: int = AUDIT_SIZE):
+        self._routes: Dict[str, _Route] = {}
+        self._audit: Deque[CommandRecord] = deque(maxlen=audit_size)
+        self._ids = itertools.count(1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def register(self, name: str, handler: Handler, timeout: float = 2.0,
+                 retries: int = 0, backoff: float = 0.1) -> None:
+        self._routes[name] = _Route(handler, timeout, retries, backoff)
+
+    async def dispatch(self, name: str, payload: Optional[Dict[str, Any]] = None,
+                       source: str = "internal") -> CommandRecord:
+        """명령 실행. 타임아웃/예외 시 등록된 재시도 정책에 따라 재실행하고 감사 기록을 남긴다."""
+        self._loop = asyncio.get_running_loop()
+        route = self._routes.get(name)
+        rec = CommandRecord(id=next(self._ids), name=name, source=source, payload=payload or {},
+                            issued_at=datetime.now(timezone.utc).isoformat())
+        self._audit.append(rec)
+        if route is None:
+            rec.status, rec.error = "failed", "unknown command"
+            return rec
+
+        t0 = time.perf_counter()
+        while True:
+            rec.attempts += 1
+            try:
+                rec.result = await asyncio.wait_for(route.handler(rec.payload), route.timeout)
+                rec.status, rec.error = "ok", None
+                break
+            except Exception as e:
+                rec.error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+                if rec.attempts > route.retries:
+                    rec.status = "failed"
+                    print(f"[CommandBus] {name} failed after {rec.attempts} attempt(s): {rec.error}")
+                    break
+                await asyncio.sleep(route.backoff * (2 ** (rec.attempts - 1)))
+        rec.duration_ms = round((time.perf_counter() - t0) * 1000, 3)
+        return rec
+
+    def submit(self, name: str, payload: Optional[Dict[str, Any]] = None,
+               source: str = "internal") -> None:
+        """결과를 기다리지 않고 실행. 이벤트 루프 밖(스레드풀 등)에서도 안전하게 호출 가능."""
+        try:
+            asyncio.get_running_loop().create_task(self.dispatch(name, payload, source))
+            return
+        except RuntimeError:
+            pass
+        if self._loop is None or self._loop.is_closed():
+            raise RuntimeError("command bus is not bound to a running event loop")
+        asyncio.run_coroutine_threadsafe(self.dispatch(name, payload, source), self._loop)
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+
+    def audit(self, limit: int = 100) -> List[Dict[str, Any]]:
+        recs = list(self._audit)[-limit:]
+        return [asdict(r) for r in reversed(recs)]
+
+
+BUS = CommandBus()
+
+# ───────────────────────────────────────────────
+# 기본 명령 핸들러
+# ───────────────────────────────────────────────
+def _write_log(level: str, message: str) -> int:
+    db = SessionLocal()
+    try:
+        entry = Log(level=level, message=message, ts=datetime.now(timezone.utc))
+        db.add(entry); db.commit()
+        return entry.id
+    finally:
+        db.close()
+
+async def _log_append(payload: Dict[str, Any]) -> int:
+    level, message = payload.get("level", "INFO"), payload["message"]
+    log_id = await asyncio.to_thread(_write_log, level, message)   # DB 쓰기는 스레드에서
+    broadcast_log(f"[{level}] {message} @ {datetime.now(timezone.utc).isoformat()}")
+    return log_id
+
+async def _drone_rtl(payload: Dict[str, Any]) -> Dict[str, Any]:
+    # 긴급 동작(카운트 + 관제 알림)은 즉시 수행, 로그 기록은 별도 명령으로 비동기 처리
+    METRICS.note_rtl()
+    broadcast_status(json.dumps({"type":"rtl_issued",
+                                 "reason":payload.get("reason"),
+                                 "mission_id":payload.get("mission_id"),
+                                 "ts":datetime.now(timezone.utc).isoformat()}))
+    BUS.submit("log.append", {"level":"INFO", "message":"[DRONE] RTL command issued."},
+               source="drone.rtl")
+    return {"status": "ok", "message": "Drone returning to base."}
+
+async def _broadcast_status(payload: Dict[str, Any]) -> None:
+    broadcast_status(payload["message"])
+
+async def _broadcast_event(payload: Dict[str, Any]) -> None:
+    broadcast_event(payload["message"])
+
+BUS.register("drone.rtl", _drone_rtl, timeout=1.0, retries=2, backoff=0.05)
+BUS.register("log.append", _log_append, timeout=5.0, retries=3, backoff=0.2)
+BUS.register("broadcast.status", _broadcast_status, timeout=0.5)
+BUS.register("broadcast.event", _broadcast_event, timeout=0.5)
@@ -0,0 +1,102 @@
+# server/services/deadline_scheduler.py
+"""
+Deadline Scheduler
+------------------
+키(key)별 만료 시각을 힙으로 관리하고, 가장 이른 만료 시각까지만 정확히 잠드는 스케줄러.
+ - schedule(): 만료 시각 등록/갱신 (하트비트·미션 시작 시 호출, 스레드 안전)
+ - cancel(): 등록 해제 (미션 종료 등)
+ - run(): 이벤트 루프에서 만료된 항목의 콜백만 실행 → 비용은 전체 개수가 아닌 만료 개수에 비례
+
+만료 시각을 늦추는 갱신(하트비트)은 힙에 새 항목을 넣지 않고 사전만 갱신하며,
+기존 힙 항목이 꺼내질 때 실제 만료 시각으로 다시 넣는다. 따라서 키당 힙 항목은 항상 1개.
+"""
+
+from __future__ import annotations
+import asyncio, heapq, itertools, threading, time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+class DeadlineScheduler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._heap: List[Tuple[float, int, Hashable, int]] = []   # (heap 시각, 순번, key, 버전)
+        self._entries: Dict[Hashable, List[Any]] = {}            # key → [만료 시각, heap 시각, 버전, 콜백]
+        self._seq = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._next_wake = float("inf")
+
+    def schedule(self, key: Hashable, deadline: float, callback: Callable[[Hashable], Any]) -> None:
+        """key 의 만료 시각(epoch 초)을 등록/갱신. 만료 시 callback(key) 호출 (코루틴 함수면 태스크로 실행)."""
+        with self._lock:
+            ent = self._entries.get(key)
+            if ent is not None and deadline >= ent[1]:
+                ent[0] = deadline; ent[3] = callback        # 힙 항목 유지, 꺼낼 때 재삽입
+                return
+            version = ent[2] + 1 if ent is not None else 0
+            self._entries[key] = [deadline, deadline, version, callback]
+            heapq.heappush(self._heap, (deadline, next(self._seq), key, version))
+            wake = deadline < self._next_wake
+        if wake:
+            self._kick()
+
+    def cancel(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._entries.pop(key, None) is not None   # 힙 항목은 꺼낼 때 버린다
+
+    def deadline(self, key: Hashable) -> Optional[float]:
+        with self._lock:
+            ent = self._entries.get(key)
+            return ent[0] if ent else None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _kick(self) -> None:
+        loop, wake = self._loop, self._wake
+        if loop is None or wake is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            wake.set()
+        else:
+            loop.call_soon_threadsafe(wake.set)
+
+    def _pop_due(self, now: float) -> List[Tuple[Hashable, Callable]]:
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, _, key, version = heapq.heappop(self._heap)
+                ent = self._entries.get(key)
+                if ent is None or ent[2] != version:
+                    continue                                 # 취소되었거나 더 이른 항목으로 대체됨
+                if ent[0] > now:
+                    ent[1] = ent[0]                          # 갱신된 만료 시각으로 재삽입
+                    heapq.heappush(self._heap, (ent[0], next(self._seq), key, version))
+                    continue
+                del self._entries[key]
+                due.append((key, ent[3]))
+            self._next_wake = self._heap[0][0] if self._heap else float("inf")
+        return due
+
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        while True:
+            self._wake.clear()
+            for key, callback in self._pop_due(time.time()):
+                try:
+                    res = callback(key)
+                    if asyncio.iscoroutine(res):
+                        asyncio.create_task(res)
+                except Exception as e:
+                    print(f"[Scheduler] callback error for {key}: {e}")
+            timeout = self._next_wake - time.time()
+            if timeout <= 0:
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), None if timeout == float("inf") else timeout)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,285 @@
+# server/services/detection_store.py
+"""
+Detection Store
+---------------
+AI 탐지 결과(/detections/push, /push_batch) 저장소. 메모리 계층 + DB 일괄 저장(write-through).
+ - 메모리: 최근 DETECTION_MEMORY_CAPACITY 건을 키 (ts_us, id) 로 정렬된 리스트 3종(전체/스트림별/클래스별)에 색인
+   → 스트림·클래스·시간 범위 질의는 bisect 로 구간만 훑고, 버퍼 전체를 복사하지 않는다
+ - 용량 초과 시 가장 오래된(ts 기준) 항목부터 제거하고 그 키를 floor 로 기록: floor 보다 새로운 데이터는 메모리에 전부 있음
+   (아직 DB 에 저장되지 않은 항목은 제거하지 않음 → floor 아래 데이터는 항상 DB 에 있다)
+ - DB 장애 시 저장 대기열은 DETECTION_PENDING_MAX 건까지만 보관, 넘치면 오래된 것부터 버리고 dropped 로 집계
+ - DB: DETECTION_FLUSH_SEC 마다 대기 행을 한 번에 INSERT (id 는 저장소가 부여 → 메모리/DB 가 같은 id 사용)
+ - 질의가 floor 아래까지 내려가면 나머지를 DB 에서 같은 정렬/커서 규칙으로 이어서 읽는다
+ - 페이지 커서: "<ts_us>:<id>" — 해당 키보다 오래된 항목부터 다음 페이지 (새 데이터가 들어와도 중복/누락 없음)
+"""
+
+from __future__ import annotations
+import asyncio, json, os, threading
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, func, insert, or_, select
+
+from server.db.models import SessionLocal, DetectionRecord
+
+DETECTION_MEMORY_CAPACITY = int(os.getenv("DETECTION_MEMORY_CAPACITY", "20000"))
+DETECTION_FLUSH_SEC = float(os.getenv("DETECTION_FLUSH_SEC", "1.0"))
+DETECTION_FLUSH_MAX = 5000
+DETECTION_PENDING_MAX = int(os.getenv("DETECTION_PENDING_MAX", "50000"))
+QUERY_LIMIT_MAX = 500
+
+Key = Tuple[int, int]   # (ts 마이크로초, id)
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_US = timedelta(microseconds=1)
+
+
+def _utc(ts: datetime) -> datetime:
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts.astimezone(timezone.utc)
+
+def _ts_us(ts: datetime) -> int:
+    # float timestamp() 는 마이크로초 자리에서 오차가 나므로 정수 연산
+    return (_utc(ts) - _EPOCH) // _US
+
+def _from_us(ts_us: int) -> datetime:
+    return _EPOCH + ts_us * _US
+
+def _naive(ts: datetime) -> datetime:
+    """DB 저장/비교용 naive UTC (SQLite 는 tz 정보를 보존하지 않음)."""
+    return _utc(ts).replace(tzinfo=None)
+
+def parse_cursor(cursor: str) -> Key:
+    ts_us, _, id_ = cursor.partition(":")
+    return int(ts_us), int(id_)
+
+def format_cursor(key: Key) -> str:
+    return f"{key[0]}:{key[1]}"
+
+
+class DetectionStore:
+    def __init__(self, capacity: int = DETECTION_MEMORY_CAPACITY, pending_max: int = DETECTION_PENDING_MAX):
+        self.capacity = capacity
+        self.pending_max = pending_max
+        self._lock = threading.Lock()
+        self._items: Dict[int, Dict] = {}
+        self._all: List[Key] = []
+        self._by_stream: Dict[str, List[Key]] = {}
+        self._by_cls: Dict[str, List[Key]] = {}
+        self._floor: Optional[Key] = None         # None: 메모리가 전체 데이터를 포함
+        self._next_id = 1
+        self._pending: List[Dict] = []
+        self._unflushed: set = set()              # DB 저장 전(대기열 또는 저장 중)인 id
+        self.added = 0
+        self.evicted = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.db_queries = 0
+
+    # ── 적재 ─────────────────────────────────────
+    def _index(self, key: Key, item: Dict) -> None:
+        self._items[key[1]] = item
+        insort(self._all, key)
+        insort(self._by_stream.setdefault(item["stream_id"], []), key)
+        insort(self._by_cls.setdefault(item["cls"], []), key)
+
+    def _evict(self) -> None:
+        while len(self._all) > self.capacity:
+            if self._all[0][1] in self._unflushed:
+                break                             # DB 저장 전: floor 를 넘기지 않고 저장 후 다시 제거
+            key = self._all.pop(0)
+            item = self._items.pop(key[1])
+            # 전체 최소 키이므로 스트림/클래스 목록에서도 맨 앞
+            for index, name in ((self._by_stream, item["stream_id"]), (self._by_cls, item["cls"])):
+                keys = index[name]
+                del keys[0]
+                if not keys:
+                    del index[name]
+            self._floor = key
+            self.evicted += 1
+
+    def add_many(self, items: List[Dict]) -> List[Dict]:
+        """탐지 dict 목록에 id 를 부여해 색인하고 DB 저장 대기열에 넣는다. id 가 붙은 항목을 반환."""
+        with self._lock:
+            for item in items:
+                item["ts"] = _utc(item["ts"])
+                item["id"] = self._next_id
+                self._next_id += 1
+                key = (_ts_us(item["ts"]), item["id"])
+                # floor 이하(메모리 범위보다 오래된) 항목은 DB 에만 둔다
+                if self._floor is None or key > self._floor:
+                    self._index(key, item)
+                self._pending.append(item)
+                self._unflushed.add(item["id"])
+            self._cap_pending()
+            self._evict()
+            self.added += len(items)
+        return items
+
+    def _cap_pending(self) -> None:
+        excess = len(self._pending) - self.pending_max
+        if excess > 0:
+            # DB 장애가 길어지면 오래된 대기 행부터 포기 (메모리에서는 일반 항목처럼 제거 대상이 됨)
+            for item in self._pending[:excess]:
+                self._unflushed.discard(item["id"])
+            del self._pending[:excess]
+            self.dropped += excess
+
+    # ── 질의 ─────────────────────────────────────
+    def query(self, stream_id: Optional[str] = None, cls: Optional[str] = None, min_conf: Optional[float] = None,
+              since: Optional[datetime] = None, until: Optional[datetime] = None, track_id: Optional[int] = None,
+              limit: int = 100, cursor: Optional[str] = None) -> Dict:
+        """최신순 필터 질의. since/until 은 포함 범위, cursor 는 이전 페이지의 next_cursor."""
+        limit = max(1, min(limit, QUERY_LIMIT_MAX))
+        upper: Optional[Key] = parse_cursor(cursor) if cursor else None            # 미포함
+        if until is not None:
+            u = (_ts_us(until) + 1, 0)
+            upper = u if upper is None else min(upper, u)
+        lower: Optional[Key] = (_ts_us(since), 0) if since is not None else None  # 포함
+
+        out: List[Dict] = []
+        with self._lock:
+            if stream_id is not None:
+                keys = self._by_stream.get(stream_id, [])
+            elif cls is not None:
+                keys = self._by_cls.get(cls, [])
+            else:
+                keys = self._all
+            hi = bisect_left(keys, upper) if upper is not None else len(keys)
+            lo = bisect_left(keys, lower) if lower is not None else 0
+            items = self._items
+            for i in range(hi - 1, lo - 1, -1):
+                item = items[keys[i][1]]
+                if ((cls is None or item["cls"] == cls) and (min_conf is None or item["conf"] >= min_conf)
+                        and (track_id is None or item.get("track_id") == track_id)):
+                    out.append(item)
+                    if len(out) > limit:
+                        break
+            floor = self._floor
+
+        source = "memory"
+        # 메모리 범위 아래까지 내려가야 하면 floor 이하 구간을 DB 에서 이어서 읽음
+        if len(out) <= limit and floor is not None and (lower is None or lower <= floor):
+            db_upper = floor if upper is None or upper > floor else upper
+            out.extend(self._query_db(stream_id, cls, min_conf, since, track_id, db_upper,
+                                      inclusive=upper is None or upper > floor,
+                                      limit=limit + 1 - len(out)))
+            source = "memory+db"
+
+        next_cursor = None
+        if len(out) > limit:
+            out = out[:limit]
+            last = out[-1]
+            next_cursor = format_cursor((_ts_us(last["ts"]), last["id"]))
+        return {"count": len(out), "items": out, "next_cursor": next_cursor, "source": source}
+
+    def _query_db(self, stream_id, cls, min_conf, since, track_id, upper: Key, inclusive: bool,
+                  limit: int) -> List[Dict]:
+        R = DetectionRecord
+        up_ts = _naive(_from_us(upper[0]))
+        conds = [or_(R.ts < up_ts, and_(R.ts == up_ts, R.id <= upper[1] if inclusive else R.id < upper[1]))]
+        if stream_id is not None:
+            conds.append(R.stream_id == stream_id)
+        if cls is not None:
+            conds.append(R.cls == cls)
+        if min_conf is not None:
+            conds.append(R.conf >= min_conf)
+        if since is not None:
+            conds.append(R.ts >= _naive(since))
+        if track_id is not None:
+            conds.append(R.track_id == track_id)
+        db = SessionLocal()
+        try:
+            rows = db.execute(select(R).where(*conds).order_by(R.ts.desc(), R.id.desc()).limit(limit)).scalars().all()
+        finally:
+            db.close()
+        self.db_queries += 1
+        return [_row_to_item(r) for r in rows]
+
+    def recent(self, limit: int = 50, stream_id: Optional[str] = None, track_id: Optional[int] = None) -> List[Dict]:
+        return self.query(stream_id=stream_id, track_id=track_id, limit=limit)["items"]
+
+    # ── DB 동기화 ────────────────────────────────
+    def take_pending(self, n: int = DETECTION_FLUSH_MAX) -> List[Dict]:
+        with self._lock:
+            rows = self._pending[:n]
+            del self._pending[:n]
+        return rows
+
+    def requeue(self, rows: List[Dict]) -> None:
+        with self._lock:
+            self._pending[:0] = rows
+            self._cap_pending()
+            self._evict()
+
+    def mark_flushed(self, rows: List[Dict]) -> None:
+        """DB 저장이 끝난 행을 제거 가능 상태로 바꾸고, 미뤄 둔 용량 초과분을 정리."""
+        with self._lock:
+            for item in rows:
+                self._unflushed.discard(item["id"])
+            self.flushed += len(rows)
+            self._evict()
+
+    def warm_start(self) -> int:
+        """DB 의 최신 capacity 건을 메모리에 적재하고 id 시퀀스를 이어받는다."""
+        R = DetectionRecord
+        db = SessionLocal()
+        try:
+            max_id = db.execute(select(func.max(R.id))).scalar() or 0
+            rows = db.execute(select(R).order_by(R.ts.desc(), R.id.desc()).limit(self.capacity)).scalars().all()
+        finally:
+            db.close()
+        with self._lock:
+            self._next_id = max(self._next_id, max_id + 1)
+            for r in reversed(rows):
+                item = _row_to_item(r)
+                self._index((_ts_us(item["ts"]), item["id"]), item)
+            if len(rows) >= self.capacity and rows:
+                self._floor = (_ts_us(_utc(rows[-1].ts)), rows[-1].id)
+        return len(rows)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"memory": len(self._all), "capacity": self.capacity, "streams": len(self._by_stream),
+                    "classes": len(self._by_cls), "pending": len(self._pending), "unflushed": len(self._unflushed),
+                    "added": self.added, "evicted": self.evicted, "flushed": self.flushed, "dropped": self.dropped,
+                    "db_queries": self.db_queries,
+                    "floor": format_cursor(self._floor) if self._floor else None}
+
+
+def _row_to_item(r: DetectionRecord) -> Dict:
+    return {"id": r.id, "stream_id": r.stream_id, "cls": r.cls, "conf": r.conf,
+            "bbox": json.loads(r.bbox) if r.bbox else None, "ts": _utc(r.ts),
+            "latency_ms": r.latency_ms, "track_id": r.track_id, "event": r.event}
+
+def _to_row(item: Dict) -> Dict:
+    return {"id": item["id"], "stream_id": item["stream_id"], "cls": item["cls"], "conf": item["conf"],
+            "bbox": json.dumps(item["bbox"]) if item.get("bbox") is not None else None,
+            "ts": _naive(item["ts"]), "latency_ms": item.get("latency_ms"),
+            "track_id": item.get("track_id"), "event": item.get("event")}
+
+
+STORE = DetectionStore()
+
+# ───────────────────────────────────────────────
+# DB 일괄 저장
+# ───────────────────────────────────────────────
+def _flush(rows: List[Dict]) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(insert(DetectionRecord), [_to_row(r) for r in rows])
+        db.commit()
+    finally:
+        db.close()
+
+async def run_detection_flusher():
+    while True:
+        await asyncio.sleep(DETECTION_FLUSH_SEC)
+        rows = STORE.take_pending()
+        if not rows:
+            continue
+        try:
+            await asyncio.to_thread(_flush, rows)
+            STORE.mark_flushed(rows)
+        except Exception as e:
+            print(f"[Detections] flush failed ({len(rows)} rows): {e}")
+            STORE.requeue(rows)   # 다음 주기에 재시도
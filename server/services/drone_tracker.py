@@ -5,13 +5,16 @@ Drone Tracker Service
 드론의 실시간 위치/상태 업데이트 API 및 SSE 브로드캐스트 헬퍼.
  - 드론 클라이언트(OSDK 등) → /tracker/update 로 주기적 보고
  - 서버는 상태를 저장 후 /realtime/status 로 브로드캐스트
+ - 보고 이력은 track_history 링 버퍼에 누적 → /tracker/history 로 (단순화된) 비행 경로 조회
 """
 
 from datetime import datetime, timezone
 from typing import Optional
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel, Field
 from server.api.realtime import broadcast_status
+from server.services import track_history
+from server.services.spatial_index import INDEX
 import json
 
 router = APIRouter(prefix="/tracker", tags=["tracker"])
@@ -34,6 +37,10 @@ def update_state(state: DroneState):
     드론이 주기적으로 자신의 상태(좌표, 고도, 속도 등)를 보고.
     """
     DRONE_STATE[state.drone_id] = state.model_dump()
+    track_history.record(state.drone_id, state.ts, state.lat, state.lon,
+                         state.alt, state.speed_mps, state.battery)
+    INDEX.upsert("drone", state.drone_id, state.lat, state.lon,
+                 alt=state.alt, battery=state.battery, ts=state.ts.isoformat())
     msg = json.dumps({
         "type": "drone_update",
         "drone_id": state.drone_id,
@@ -49,3 +56,28 @@ def update_state(state: DroneState):
 def get_current():
     """현재 저장된 모든 드론 상태 조회"""
     return list(DRONE_STATE.values())
+
+@router.get("/history")
+def get_history(drone_id: str,
+                since: Optional[datetime] = None,
+                max_points: Optional[int] = Query(None, ge=2, le=10000),
+                epsilon_m: Optional[float] = Query(None, gt=0)):
+    """
+    드론 비행 경로 조회 (메모리 링 버퍼, 최근 TRACK_CAPACITY 점).
+     - since: 이 시각 이후의 점만
+     - epsilon_m / max_points: RDP 단순화 (허용 편차 m / 목표 점 개수)
+    응답은 열 이름 + 행 배열 형태 (ts 는 epoch 초).
+    """
+    if since is not None and since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    arr = track_history.history(drone_id, since.timestamp() if since else None)
+    if arr is None:
+        raise HTTPException(status_code=404, detail=f"No track for {drone_id}")
+    pts = track_history.simplify(arr, max_points, epsilon_m)
+    return {
+        "drone_id": drone_id,
+        "columns": list(track_history.COLUMNS),
+        "raw_count": len(arr),
+        "count": len(pts),
+        "points": track_history.to_rows(pts),
+    }
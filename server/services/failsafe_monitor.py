@@ -1,60 +1,68 @@
 # server/services/failsafe_monitor.py
-import asyncio, time, requests, json
+import time, json
 from datetime import datetime, timezone
-from typing import Dict
+from typing import Dict, Hashable
 from server.api.realtime import broadcast_status
+from server.services.waypoint_builder import complete_waypoint
+from server.services.deadline_scheduler import DeadlineScheduler
+from server.services.command_bus import BUS
+from server.services.sensor_health import HEALTH, BATTERY_EMPTY_V
 
-API_BASE = "http://127.0.0.1:8000"
 HEARTBEAT_TIMEOUT = 60
-LOW_BATTERY_THRESHOLD = 3.5
+LOW_BATTERY_THRESHOLD = BATTERY_EMPTY_V   # 방전 예측(hours_left)이 경보 시점을 가리키도록 같은 값 사용
 MISSION_TIMEOUT = 10 * 60
-CHECK_INTERVAL = 30
 
 SENSOR_STATUS: Dict[str, float] = {}
-DRONE_MISSION_START: float | None = None
+MISSION_STARTS: Dict[str, float] = {}          # 진행 중 미션별 시작 시각 (다중 드론)
+DRONE_MISSION_START: float | None = None       # 가장 최근 시작한 미션
 DRONE_MISSION_ID: str | None = None
 
-def update_sensor_heartbeat(sensor_id: str, battery: float):
-    SENSOR_STATUS[sensor_id] = time.time()
-    if battery < LOW_BATTERY_THRESHOLD:
+# 하트비트 만료/미션 타임아웃 마감 시각 관리 (폴링 없이 다음 마감까지만 대기)
+SCHEDULER = DeadlineScheduler()
+
+def update_sensor_heartbeat(sensor_id: str, battery: float | None):
+    now = time.time()
+    SENSOR_STATUS[sensor_id] = now
+    HEALTH.update(sensor_id, battery, now)        # 패킷률/배터리 추세 (/sensors/health)
+    SCHEDULER.schedule(("sensor", sensor_id), now + HEARTBEAT_TIMEOUT, _on_heartbeat_lost)
+    if battery is not None and battery < LOW_BATTERY_THRESHOLD:
         print(f"[⚠️][{sensor_id}] Low battery: {battery:.2f}V")
 
-async def monitor_sensors():
-    while True:
-        now = time.time()
-        for sid, last_seen in list(SENSOR_STATUS.items()):
-            if now - last_seen > HEARTBEAT_TIMEOUT:
-                print(f"[⚠️][{sid}] Heartbeat lost for {int(now - last_seen)}s")
-        await asyncio.sleep(CHECK_INTERVAL)
+def _on_heartbeat_lost(key: Hashable):
+    sid = key[1]
+    last_seen = SENSOR_STATUS.get(sid, 0.0)
+    print(f"[⚠️][{sid}] Heartbeat lost for {int(time.time() - last_seen)}s")
 
-def mark_mission_start(mission_id: str):
+def mark_mission_start(mission_id: str, started_at: float | None = None):
     global DRONE_MISSION_START, DRONE_MISSION_ID
-    DRONE_MISSION_START = time.time(); DRONE_MISSION_ID = mission_id
+    DRONE_MISSION_START = started_at or time.time(); DRONE_MISSION_ID = mission_id
+    MISSION_STARTS[mission_id] = DRONE_MISSION_START
+    SCHEDULER.schedule(("mission", mission_id), DRONE_MISSION_START + MISSION_TIMEOUT, _on_mission_timeout)
     print(f"[DRONE] Mission START id={mission_id} at {DRONE_MISSION_START}")
 
 def mark_mission_end(mission_id: str | None = None, reason: str = "ack"):
     global DRONE_MISSION_START, DRONE_MISSION_ID
-    print(f"[DRONE] Mission END id={mission_id or DRONE_MISSION_ID} reason={reason}")
-    DRONE_MISSION_START = None; DRONE_MISSION_ID = None
+    mission_id = mission_id or DRONE_MISSION_ID
+    print(f"[DRONE] Mission END id={mission_id} reason={reason}")
+    complete_waypoint(mission_id)
+    SCHEDULER.cancel(("mission", mission_id))
+    MISSION_STARTS.pop(mission_id, None)
+    if mission_id == DRONE_MISSION_ID:
+        DRONE_MISSION_START = None; DRONE_MISSION_ID = None
 
-async def monitor_drone():
-    global DRONE_MISSION_START, DRONE_MISSION_ID
-    while True:
-        if DRONE_MISSION_START:
-            elapsed = time.time() - DRONE_MISSION_START
-            if elapsed > MISSION_TIMEOUT:
-                print(f"[⚠️][DRONE] Mission timeout ({elapsed:.0f}s) → auto RTL")
-                try:
-                    r = requests.post(f"{API_BASE}/drone/rtl", timeout=5)
-                    print("[AUTO-RTL]", r.status_code, r.text)
-                except Exception as e:
-                    print("[AUTO-RTL ERROR]", e)
-                broadcast_status(json.dumps({"type":"mission_timeout_rtl",
-                                             "mission_id":DRONE_MISSION_ID,
-                                             "ts":datetime.now(timezone.utc).isoformat()}))
-                mark_mission_end(DRONE_MISSION_ID, reason="timeout")
-        await asyncio.sleep(CHECK_INTERVAL)
+async def _on_mission_timeout(key: Hashable):
+    mission_id = key[1]
+    elapsed = time.time() - MISSION_STARTS.get(mission_id, time.time())
+    print(f"[⚠️][DRONE] Mission timeout ({elapsed:.0f}s) → auto RTL")
+    # 내부 명령 버스로 직접 RTL (HTTP 루프백/블로킹 호출 없음)
+    rec = await BUS.dispatch("drone.rtl", {"mission_id": mission_id, "reason": "mission_timeout"},
+                             source="failsafe")
+    print("[AUTO-RTL]", rec.status, f"{rec.duration_ms}ms", rec.error or "")
+    broadcast_status(json.dumps({"type":"mission_timeout_rtl",
+                                 "mission_id":mission_id,
+                                 "ts":datetime.now(timezone.utc).isoformat()}))
+    mark_mission_end(mission_id, reason="timeout")
 
 async def run_failsafe_monitor():
     print("[Failsafe] Monitor started at", datetime.now(timezone.utc).isoformat())
-    await asyncio.gather(monitor_sensors(), monitor_drone())
+    await SCHEDULER.run()
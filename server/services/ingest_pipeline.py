@@ -0,0 +1,347 @@
+# server/services/ingest_pipeline.py
+"""
+Audio Ingest Pipeline
+---------------------
+센서 업링크(HTTP /ingest/audio, MQTT) 공통 처리 경로.
+ - 업링크 포맷: JSON(단건/배열) 또는 바이너리 프레임(uplink_codec, magic b"DW") → parse_uplink()
+ - 판정(accepted) → DB 저장 → 메트릭/하트비트/공간 인덱스 갱신 → SSE 브로드캐스트
+ - 배치 처리: 여러 건을 한 세션·한 번의 커밋으로 저장 (커밋 fsync 비용을 배치 단위로 분산)
+ - MQTT: paho 네트워크 스레드는 검증된 페이로드를 submit_threadsafe() 로 이벤트 루프 큐에 넣기만 하고,
+   run_ingest_consumer() 가 INGEST_BATCH_MAX 건 / INGEST_BATCH_WAIT_MS 단위로 모아서 처리
+   (HTTP 루프백·블로킹 요청 없음, 느린 DB 커밋이 MQTT 수신을 막지 않음)
+ - DB 적재 실패/큐 포화 시 디스크 스풀(ingest_spool)에 기록한 뒤에만 QoS1 ack,
+   run_spool_replayer() 가 복구 후 배치 단위로 속도 제한을 두고 재처리
+ - 샘플링된 페이로드는 종단 간 추적(tracing): 검증 → DB 커밋 → 브로드캐스트 적재 → SSE 기록 시각 표시
+"""
+
+from __future__ import annotations
+import asyncio, json, os, time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field, PrivateAttr, field_validator
+
+from server.db.models import SessionLocal, AudioEvent
+from server.services.audio_event_filter import is_event_accepted
+from server.services.failsafe_monitor import update_sensor_heartbeat
+from server.services.metrics_collector import METRICS
+from server.services.spatial_index import INDEX
+from server.services import uplink_codec
+from server.services.ingest_spool import get_spool
+from server.api.realtime import broadcast_event
+from server.services.tracing import TRACER, Trace
+
+INGEST_QUEUE_MAX = int(os.getenv("INGEST_QUEUE_MAX", "10000"))
+INGEST_BATCH_MAX = int(os.getenv("INGEST_BATCH_MAX", "200"))
+INGEST_BATCH_WAIT_MS = float(os.getenv("INGEST_BATCH_WAIT_MS", "20"))
+
+# ───────────────────────────────────────────────
+# 요청 모델
+# ───────────────────────────────────────────────
+class IngestPayload(BaseModel):
+    sensor_id: str = Field(..., examples=["sensor-001"])
+    prob_help: float = Field(..., ge=0.0, le=1.0, examples=[0.95])
+    ts: Optional[datetime] = None
+    battery: Optional[float] = None
+    features: Optional[Dict[str, Any]] = None
+    meta: Optional[Dict[str, Any]] = None
+    trace_id: Optional[str] = Field(None, max_length=64)   # 센서가 지정한 추적 id (있으면 항상 추적)
+    _trace: Optional[Trace] = PrivateAttr(None)
+
+    @field_validator("ts", mode="before")
+    @classmethod
+    def parse_ts(cls, v):
+        if v is None or isinstance(v, datetime):
+            return v
+        return datetime.fromisoformat(str(v).replace("Z", "+00:00"))
+
+def parse_uplink(raw: bytes, binary: Optional[bool] = None,
+                 received_at: Optional[datetime] = None) -> List[IngestPayload]:
+    """
+    업링크 바디/메시지 → 검증된 페이로드 목록.
+    binary=None 이면 magic 바이트로 판별. ts 가 없는 JSON 항목은 received_at 으로 채운다.
+    형식 오류는 ValueError(UplinkDecodeError, json 오류), 스키마 오류는 ValidationError.
+    """
+    if binary is None:
+        binary = uplink_codec.is_binary(raw)
+    if binary:
+        return [IngestPayload.model_construct(**f) if _trusted(f) else IngestPayload.model_validate(f)
+                for f in uplink_codec.iter_frames(raw)]
+    items = json.loads(raw)
+    if isinstance(items, dict):
+        items = [items]
+    if not isinstance(items, list):
+        raise ValueError("expected a JSON object or array")
+    out = []
+    for it in items:
+        if received_at is not None and isinstance(it, dict):
+            it.setdefault("ts", received_at)
+        out.append(IngestPayload.model_validate(it))
+    return out
+
+def start_traces(payloads: List[IngestPayload], received: Optional[float] = None) -> None:
+    """샘플링된 페이로드에 추적을 붙인다. received: 업링크 수신 시각(epoch 초), 검증 완료는 지금."""
+    for p in payloads:
+        tr = TRACER.begin("ingest", p.trace_id, p.ts.timestamp() if p.ts else None, received)
+        if tr is not None:
+            tr.mark("validated")
+            p._trace = tr
+
+def _trusted(frame: Dict[str, Any]) -> bool:
+    # 바이너리 프레임은 타입이 구조적으로 보장되므로 값 범위만 확인하고 pydantic 검증을 건너뛴다
+    return 0.0 <= frame["prob_help"] <= 1.0 and bool(frame["sensor_id"])
+
+# ───────────────────────────────────────────────
+# 저장 / 후처리
+# ───────────────────────────────────────────────
+def persist_batch(payloads: List[IngestPayload], db=None) -> List[Tuple[int, bool, datetime]]:
+    """한 세션·한 커밋으로 저장. 반환: 입력 순서대로 (event_id, accepted, ts)."""
+    own = db is None
+    db = db or SessionLocal()
+    try:
+        rows, meta = [], []
+        for p in payloads:
+            ts = p.ts or datetime.now(timezone.utc)
+            accepted = is_event_accepted(p.prob_help)
+            rows.append(AudioEvent(
+                sensor_id=p.sensor_id,
+                prob_help=p.prob_help,
+                accepted=accepted,
+                ts=ts,
+                battery=p.battery,
+                features=json.dumps(p.features) if p.features else None,
+                meta=json.dumps(p.meta) if p.meta else None,
+            ))
+            meta.append((accepted, ts))
+        db.add_all(rows)
+        db.flush()                                   # id 확보 (커밋 후 재조회 없이)
+        ids = [r.id for r in rows]
+        db.commit()
+        for p in payloads:
+            if p._trace is not None:
+                p._trace.mark("db_commit")
+        return [(i, a, ts) for i, (a, ts) in zip(ids, meta)]
+    finally:
+        if own:
+            db.close()
+
+def publish(p: IngestPayload, ev_id: int, accepted: bool, ts: datetime) -> None:
+    """저장 이후 처리: 메트릭, 센서 하트비트/상태, 공간 인덱스, SSE 브로드캐스트."""
+    METRICS.note_audio_event(p.sensor_id, accepted)
+    update_sensor_heartbeat(p.sensor_id, p.battery)
+    tr = p._trace
+    if not accepted:
+        TRACER.finish(tr)
+        return
+    meta = p.meta or {}
+    if meta.get("lat") is not None and meta.get("lon") is not None:
+        try:
+            INDEX.upsert("event", ev_id, meta["lat"], meta["lon"], sensor_id=p.sensor_id,
+                         ts=ts.isoformat(), prob_help=p.prob_help)
+        except (ValueError, TypeError):
+            # 이미 커밋된 이벤트: 좌표가 잘못돼도 적재 응답은 성공으로 (재전송 → 중복 방지), 공간 인덱스만 생략
+            print(f"[Ingest] event {ev_id} from {p.sensor_id}: invalid meta lat/lon, not indexed")
+    broadcast_event(json.dumps({
+        "type": "audio_event",
+        "id": ev_id,
+        "ts": ts.isoformat(),
+        "sensor_id": p.sensor_id,
+        "prob_help": p.prob_help,
+        "lat": meta.get("lat"),
+        "lon": meta.get("lon"),
+        **({"trace_id": tr.trace_id} if tr is not None else {}),
+    }, default=str), trace=tr)
+
+def publish_all(payloads: List[IngestPayload], results: List[Tuple[int, bool, datetime]]) -> None:
+    """백그라운드 루프용: 커밋된 건의 후처리 실패는 기록만 하고 다음 건으로 (소비 태스크가 죽지 않도록)."""
+    for p, (ev_id, accepted, ts) in zip(payloads, results):
+        try:
+            publish(p, ev_id, accepted, ts)
+        except Exception as e:
+            print(f"[Ingest] publish failed for event {ev_id} ({p.sensor_id}): {e}")
+
+def ingest_batch(payloads: List[IngestPayload], db=None) -> List[Dict[str, Any]]:
+    """동기 경로 (HTTP 엔드포인트, 스레드풀에서 실행)."""
+    if not payloads:
+        return []
+    results = persist_batch(payloads, db)
+    out = []
+    for p, (ev_id, accepted, ts) in zip(payloads, results):
+        publish(p, ev_id, accepted, ts)
+        res = {"status": "accepted" if accepted else "queued", "event_id": ev_id, "accepted": accepted}
+        if p._trace is not None:
+            res["trace_id"] = p._trace.trace_id
+        out.append(res)
+    return out
+
+# ───────────────────────────────────────────────
+# MQTT → 이벤트 루프 큐 → 마이크로 배치
+# ───────────────────────────────────────────────
+class _Stats:
+    received = 0
+    dropped = 0
+    batches = 0
+    stored = 0
+    failed = 0
+    spooled = 0
+    replayed = 0
+    replay_rate = 0.0          # 최근 재처리 배치의 처리 속도 (건/초, 속도 제한 대기 포함)
+    last_batch = 0
+    last_batch_ms = 0.0
+
+STATS = _Stats()
+_QUEUE: Optional[asyncio.Queue] = None
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
+Ack = Optional[Callable[[], None]]
+
+def bind(loop: asyncio.AbstractEventLoop) -> None:
+    global _QUEUE, _LOOP
+    _LOOP = loop
+    _QUEUE = asyncio.Queue(maxsize=INGEST_QUEUE_MAX)
+
+def _ack(acks) -> None:
+    for ack in acks:
+        if ack is not None:
+            try:
+                ack()
+            except Exception as e:
+                print(f"[Ingest] ack failed: {e}")
+
+def _spool(payloads: List[IngestPayload], acks) -> bool:
+    """디스크 스풀에 기록(fsync) 후 ack. 스풀이 꺼져 있으면 False (→ 유실)."""
+    spool = get_spool()
+    if spool is None:
+        STATS.dropped += len(payloads)
+        return False
+    spool.append_many([p.model_dump_json().encode() for p in payloads])
+    STATS.spooled += len(payloads)
+    _ack(acks)
+    return True
+
+def _spool_off_loop(payloads: List[IngestPayload], acks) -> None:
+    try:
+        _spool(payloads, acks)
+    except OSError as e:
+        # ack 하지 않음 → 브로커가 QoS1 재전송
+        print(f"[Ingest] spool write failed: {e}")
+
+def _put(item) -> None:
+    try:
+        _QUEUE.put_nowait(item)
+    except asyncio.QueueFull:
+        # 드문 경합(큐 포화 = 과부하): 파일 기록 + fsync 가 루프를 막지 않도록 스레드풀에서 스풀
+        _LOOP.run_in_executor(None, _spool_off_loop, [item[0]], [item[1]])
+
+def submit_threadsafe(payloads: List[IngestPayload], ack: Ack = None, received: Optional[float] = None) -> bool:
+    """
+    다른 스레드(paho 네트워크 스레드)에서 호출. 한 MQTT 메시지의 페이로드 묶음을 넘기고,
+    모두 DB 또는 스풀에 안전하게 기록된 뒤 ack() 가 한 번 호출된다.
+    루프가 준비되지 않았거나 적재 큐가 가득 차면 호출 스레드에서 바로 스풀.
+    received: 메시지 수신 시각 (추적용, 없으면 지금)
+    """
+    STATS.received += len(payloads)
+    start_traces(payloads, received)
+    if not payloads:
+        _ack([ack])
+        return True
+    if _LOOP is None or _LOOP.is_closed() or _QUEUE.qsize() + len(payloads) > INGEST_QUEUE_MAX:
+        return _spool(payloads, [ack])
+    last = len(payloads) - 1
+    for i, p in enumerate(payloads):
+        # ack 는 메시지의 마지막 페이로드에만 (큐는 FIFO, 앞 항목이 먼저 기록됨)
+        _LOOP.call_soon_threadsafe(_put, (p, ack if i == last else None))
+    return True
+
+def queue_depth() -> int:
+    return _QUEUE.qsize() if _QUEUE is not None else 0
+
+async def run_ingest_consumer():
+    if _QUEUE is None:
+        bind(asyncio.get_running_loop())
+    wait = INGEST_BATCH_WAIT_MS / 1000.0
+    while True:
+        batch = [await _QUEUE.get()]
+        deadline = time.monotonic() + wait
+        while len(batch) < INGEST_BATCH_MAX:
+            try:
+                batch.append(_QUEUE.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(_QUEUE.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        payloads = [p for p, _ in batch]
+        acks = [a for _, a in batch]
+        t0 = time.perf_counter()
+        try:
+            results = await asyncio.to_thread(persist_batch, payloads)
+        except Exception as e:
+            STATS.failed += len(batch)
+            print(f"[Ingest] batch of {len(batch)} failed: {e} → spool")
+            try:
+                await asyncio.to_thread(_spool, payloads, acks)
+            except OSError as se:
+                # 스풀도 실패하면 ack 하지 않는다 → 브로커가 QoS1 재전송
+                print(f"[Ingest] spool write failed: {se}")
+            continue
+        _ack(acks)
+        publish_all(payloads, results)
+        STATS.batches += 1
+        STATS.stored += len(batch)
+        STATS.last_batch = len(batch)
+        STATS.last_batch_ms = round((time.perf_counter() - t0) * 1000, 2)
+
+# ───────────────────────────────────────────────
+# 스풀 재처리 (장애 복구 후 배치 단위, 속도 제한)
+# ───────────────────────────────────────────────
+SPOOL_REPLAY_BATCH = int(os.getenv("INGEST_SPOOL_REPLAY_BATCH", "500"))
+SPOOL_REPLAY_RATE = float(os.getenv("INGEST_SPOOL_REPLAY_RATE", "2000"))   # 건/초 상한
+SPOOL_RETRY_SEC = 5.0
+
+def _replay_batch(spool) -> Tuple[List[IngestPayload], List[Tuple[int, bool, datetime]], Tuple[int, int]]:
+    records, position = spool.read_batch(SPOOL_REPLAY_BATCH)
+    payloads = []
+    for rec in records:
+        try:
+            payloads.append(IngestPayload.model_validate_json(rec))
+        except ValueError as e:
+            print(f"[Ingest] skipping corrupt spool record: {e}")
+    results = persist_batch(payloads) if payloads else []
+    spool.commit(position, len(records))
+    return payloads, results, position
+
+async def run_spool_replayer():
+    spool = get_spool()
+    if spool is None:
+        return
+    if spool.depth:
+        print(f"[Ingest] {spool.depth} spooled uplinks pending replay")
+    while True:
+        # 스풀이 비었거나 실시간 트래픽이 밀려 있으면 대기 (실시간 적재 우선)
+        if spool.depth == 0 or queue_depth() >= INGEST_BATCH_MAX:
+            await asyncio.sleep(1.0)
+            continue
+        t0 = time.perf_counter()
+        try:
+            payloads, results, _ = await asyncio.to_thread(_replay_batch, spool)
+        except Exception as e:
+            print(f"[Ingest] spool replay failed: {e} (retry in {SPOOL_RETRY_SEC:.0f}s)")
+            await asyncio.sleep(SPOOL_RETRY_SEC)
+            continue
+        publish_all(payloads, results)
+        STATS.replayed += len(payloads)
+        # 속도 제한: 배치 크기 / 상한 속도 만큼은 최소 소요되도록 대기
+        budget = len(payloads) / SPOOL_REPLAY_RATE if SPOOL_REPLAY_RATE > 0 else 0.0
+        elapsed = time.perf_counter() - t0
+        if budget > elapsed:
+            await asyncio.sleep(budget - elapsed)
+        STATS.replay_rate = round(len(payloads) / max(time.perf_counter() - t0, 1e-6), 1)
+        if spool.depth == 0:
+            STATS.replay_rate = 0.0
+            print(f"[Ingest] spool drained ({spool.replayed_total} replayed)")
@@ -0,0 +1,172 @@
+# server/services/ingest_spool.py
+"""
+Ingest Spool
+------------
+DB 적재가 실패하거나 적재 큐가 가득 찼을 때 MQTT 업링크를 잃지 않도록 로컬 디스크에 쌓아 두는 스풀.
+ - 추가 전용 세그먼트 파일: <SPOOL_DIR>/seg-000000000001.log, 레코드 = 4바이트 길이 + JSON(IngestPayload)
+ - 세그먼트는 SPOOL_SEGMENT_BYTES 를 넘으면 새 파일로 넘어가고, 다 재처리된 세그먼트는 삭제
+ - append_many() 는 한 번의 write + fsync → 반환 후에야 MQTT QoS1 PUBACK 을 보낸다 (유실 없음)
+ - 재처리 위치(세그먼트 번호, 오프셋)는 cursor 파일에 원자적으로 기록 → 재시작 후 이어서 재처리
+   (커서 기록 직전에 죽으면 마지막 배치가 한 번 더 적재될 수 있음: at-least-once)
+"""
+
+from __future__ import annotations
+import json, os, re, struct, threading
+from typing import List, Optional, Tuple
+
+SPOOL_DIR = os.getenv("INGEST_SPOOL_DIR", "./spool")
+SPOOL_SEGMENT_BYTES = int(os.getenv("INGEST_SPOOL_SEGMENT_BYTES", str(4 * 1024 * 1024)))
+_READ_CHUNK = 256 * 1024
+
+_LEN = struct.Struct("<I")
+_SEG_RE = re.compile(r"^seg-(\d{12})\.log$")
+
+
+class Spool:
+    def __init__(self, path: str = SPOOL_DIR, segment_bytes: int = SPOOL_SEGMENT_BYTES):
+        self.path = path
+        self.segment_bytes = segment_bytes
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self.segments: List[int] = sorted(int(m.group(1)) for f in os.listdir(path)
+                                          if (m := _SEG_RE.match(f)))
+        self.cursor: Tuple[int, int] = self._load_cursor()
+        self._writer = None
+        self._writer_seg = 0
+        # 남은 레코드 수는 시작 시 한 번 세고 이후 증감으로 유지
+        self.depth = self._count_pending()
+        self.spooled_total = 0
+        self.replayed_total = 0
+
+    # ── 파일 경로/커서 ───────────────────────────
+    def _seg_path(self, seg: int) -> str:
+        return os.path.join(self.path, f"seg-{seg:012d}.log")
+
+    def _load_cursor(self) -> Tuple[int, int]:
+        try:
+            with open(os.path.join(self.path, "cursor")) as f:
+                seg, off = json.load(f)
+                return int(seg), int(off)
+        except (OSError, ValueError, TypeError):
+            return (self.segments[0] if self.segments else 0, 0)
+
+    def _save_cursor(self) -> None:
+        tmp = os.path.join(self.path, "cursor.tmp")
+        with open(tmp, "w") as f:
+            json.dump(list(self.cursor), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(self.path, "cursor"))
+
+    def _count_pending(self) -> int:
+        n = 0
+        for seg in self.segments:
+            start = self.cursor[1] if seg == self.cursor[0] else 0
+            if seg < self.cursor[0]:
+                continue
+            n += len(self._scan(seg, start, None, chunk=None)[0])
+        return n
+
+    # ── 쓰기 ─────────────────────────────────────
+    def append_many(self, records: List[bytes]) -> None:
+        """레코드 여러 개를 한 번의 write + fsync 로 기록 (호출 스레드에서 블로킹)."""
+        if not records:
+            return
+        buf = b"".join(_LEN.pack(len(r)) + r for r in records)
+        with self._lock:
+            if self._writer is None or self._writer.tell() >= self.segment_bytes:
+                self._rotate()
+            self._writer.write(buf)
+            self._writer.flush()
+            os.fsync(self._writer.fileno())
+            self.depth += len(records)
+            self.spooled_total += len(records)
+
+    def _rotate(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        seg = (self.segments[-1] + 1) if self.segments else max(self.cursor[0], 1)
+        self.segments.append(seg)
+        self._writer = open(self._seg_path(seg), "ab")
+        self._writer_seg = seg
+        if len(self.segments) == 1:
+            self.cursor = (seg, 0)
+
+    # ── 읽기/재처리 ──────────────────────────────
+    def _scan(self, seg: int, offset: int, limit: Optional[int],
+              chunk: Optional[int] = _READ_CHUNK) -> Tuple[List[bytes], int]:
+        """seg 의 offset 부터 완성된 레코드를 최대 limit 개 (chunk 바이트씩 읽음, None 이면 끝까지)."""
+        out: List[bytes] = []
+        try:
+            with open(self._seg_path(seg), "rb") as f:
+                f.seek(offset)
+                data = f.read(-1 if chunk is None else chunk)
+                # 레코드 하나가 chunk 보다 크면 더 읽는다
+                while chunk is not None and len(data) >= _LEN.size and _LEN.size + _LEN.unpack_from(data)[0] > len(data):
+                    more = f.read(chunk)
+                    if not more:
+                        break
+                    data += more
+        except OSError:
+            return out, offset
+        mv, pos = memoryview(data), 0
+        while pos + _LEN.size <= len(mv) and (limit is None or len(out) < limit):
+            (n,) = _LEN.unpack_from(mv, pos)
+            if pos + _LEN.size + n > len(mv):
+                break                               # 기록 중이던 꼬리 (다음 읽기에서 완성)
+            out.append(bytes(mv[pos + _LEN.size:pos + _LEN.size + n]))
+            pos += _LEN.size + n
+        return out, offset + pos
+
+    def read_batch(self, limit: int) -> Tuple[List[bytes], Tuple[int, int]]:
+        """커서 위치부터 최대 limit 개. 반환한 위치는 적재 성공 후 commit() 으로 확정."""
+        with self._lock:
+            seg, off = self.cursor
+            while True:
+                records, end = self._scan(seg, off, limit)
+                if records:
+                    return records, (seg, end)
+                nxt = [s for s in self.segments if s > seg]
+                if not nxt or seg == self._writer_seg:
+                    return [], (seg, off)
+                # 현재 세그먼트를 다 읽었고 다음 세그먼트가 있으면 넘어간다
+                self._drop(seg)
+                seg, off = nxt[0], 0
+                self.cursor = (seg, 0)
+                self._save_cursor()
+
+    def commit(self, position: Tuple[int, int], n: int) -> None:
+        with self._lock:
+            self.cursor = position
+            self.depth = max(0, self.depth - n)
+            self.replayed_total += n
+            self._save_cursor()
+
+    def _drop(self, seg: int) -> None:
+        try:
+            os.remove(self._seg_path(seg))
+        except OSError:
+            pass
+        if seg in self.segments:
+            self.segments.remove(seg)
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = 0
+            for seg in self.segments:
+                try:
+                    size += os.path.getsize(self._seg_path(seg))
+                except OSError:
+                    pass
+            return {"depth": self.depth, "segments": len(self.segments), "bytes": size,
+                    "spooled_total": self.spooled_total, "replayed_total": self.replayed_total}
+
+
+_SPOOL: Optional[Spool] = None
+
+def get_spool() -> Optional[Spool]:
+    """SPOOL_DIR 가 빈 문자열이면 스풀 비활성화 (None)."""
+    global _SPOOL
+    if _SPOOL is None and SPOOL_DIR:
+        _SPOOL = Spool()
+    return _SPOOL
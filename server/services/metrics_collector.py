@@ -2,95 +2,274 @@
 """
 Metrics Collector
 -----------------
-- 오디오 이벤트/탐지/미션/RTL 등을 카운팅
-- 분 단위 타임시리즈(최근 30분) 집계
+- 오디오 이벤트/탐지/미션/RTL 등을 카운팅 (스레드 안전)
+- 다중 해상도 타임시리즈: 1초(1시간 보관) / 1분(24시간) / 1시간(30일)
+  · 버킷 경계는 벽시계(UTC epoch) 기준으로 정렬 → 프로세스 시작 시각과 무관
+  · 카운트는 1초 링에만 기록하고, 분/시 링은 완료된 하위 버킷을 합산(다운샘플)해서 채움
+  · 고정 크기 링 버퍼 → 보관 기간과 무관하게 메모리 일정
+- 선택적 파일 영속화(METRICS_PERSIST_PATH): 분/시 링과 누적값을 주기적으로 저장, 재시작 시 복원
+- 라벨별 카운터(센서/스트림/탐지 클래스): Space-Saving 스케치로 상위 LABEL_CAPACITY 개 키만 추적
+  → 센서 수가 아무리 늘어도 메모리 상한 고정, 폭주하는 노드는 항상 상위에 남음
 """
 
 from __future__ import annotations
-import asyncio
-from dataclasses import dataclass, field
+import asyncio, heapq, json, os, threading, time
 from datetime import datetime, timezone
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
-WINDOW_MINUTES = 30
+FIELDS = ("audio_events", "detections", "missions_enqueued", "missions_completed", "rtl_issued")
+_IDX = {f: i for i, f in enumerate(FIELDS)}
+
+# 해상도 이름 → (버킷 길이 초, 보관 버킷 수)
+RESOLUTIONS: Dict[str, Tuple[int, int]] = {
+  "1s": (1, 3600),
+  "1m": (60, 24 * 60),
+  "1h": (3600, 30 * 24),
+}
+DEFAULT_RESOLUTION = "1m"
+DEFAULT_RANGE_SEC = 30 * 60
+
+PERSIST_PATH = os.getenv("METRICS_PERSIST_PATH", "")     # 빈 문자열이면 영속화하지 않음
+PERSIST_INTERVAL_SEC = 300
+
+LABEL_CAPACITY = int(os.getenv("METRICS_LABEL_CAPACITY", "256"))
+LABEL_FAMILIES = ("audio_by_sensor", "accepted_by_sensor", "detections_by_stream", "detections_by_class")
+
+
+class _Ring:
+  """bucket 번호(= epoch // 해상도)로 인덱싱되는 고정 크기 링. 슬롯의 bucket 이 다르면 빈 값으로 취급."""
+
+  def __init__(self, resolution: int, size: int):
+    self.resolution = resolution
+    self.size = size
+    self.buckets = [-1] * size
+    self.values = [[0] * len(FIELDS) for _ in range(size)]
+
+  def slot(self, bucket: int) -> List[int]:
+    i = bucket % self.size
+    if self.buckets[i] != bucket:
+      self.buckets[i] = bucket
+      vals = self.values[i]
+      for k in range(len(vals)):
+        vals[k] = 0
+    return self.values[i]
+
+  def get(self, bucket: int) -> Optional[List[int]]:
+    i = bucket % self.size
+    return self.values[i] if self.buckets[i] == bucket else None
+
+  def dump(self) -> Dict:
+    return {str(b): v for b, v in zip(self.buckets, self.values) if b >= 0 and any(v)}
+
+  def load(self, data: Dict) -> None:
+    for b, v in data.items():
+      self.slot(int(b))[:] = v
+
+
+class TopKCounter:
+  """
+  Space-Saving 스케치. 최대 capacity 개 키만 추적하며, 가득 찬 상태에서 새 키가 오면
+  가장 작은 카운트의 키를 내보내고 그 값을 오차(error)로 물려받는다.
+   - count: 상한 추정치, count - error: 보장된 하한
+   - 실제 빈도가 total / capacity 를 넘는 키는 반드시 추적됨
+  최소 카운트 키는 지연 갱신 힙으로 찾는다 (키당 힙 항목 1개, 꺼낼 때 카운트가 바뀌었으면 재삽입).
+  """
+
+  def __init__(self, capacity: int = LABEL_CAPACITY):
+    self.capacity = capacity
+    self.entries: Dict[str, List[float]] = {}     # key → [count, error, last_seen]
+    self._heap: List[Tuple[float, str]] = []      # (삽입 시점 count, key)
+    self.total = 0
+    self.evictions = 0
+    self._lock = threading.Lock()
+
+  def inc(self, key: str, n: int = 1) -> None:
+    now = time.time()
+    with self._lock:
+      self.total += n
+      ent = self.entries.get(key)
+      if ent is not None:
+        ent[0] += n; ent[2] = now
+        return
+      if len(self.entries) < self.capacity:
+        self.entries[key] = [n, 0, now]
+        heapq.heappush(self._heap, (n, key))
+        return
+      while True:
+        c, victim = heapq.heappop(self._heap)
+        cur = self.entries[victim][0]
+        if cur == c:
+          break
+        heapq.heappush(self._heap, (cur, victim))
+      floor = self.entries.pop(victim)[0]
+      self.evictions += 1
+      self.entries[key] = [floor + n, floor, now]
+      heapq.heappush(self._heap, (floor + n, key))
+
+  def top(self, k: int = 20, silent_sec: Optional[float] = None) -> Dict:
+    """상위 k 개 키. silent_sec 가 주어지면 그 시간 동안 보고가 없던 키만 (조용해진 센서/스트림 찾기)."""
+    now = time.time()
+    with self._lock:
+      items = list(self.entries.items())
+      total, evictions = self.total, self.evictions
+    if silent_sec is not None:
+      items = [it for it in items if now - it[1][2] >= silent_sec]
+      items.sort(key=lambda it: it[1][2])
+    else:
+      items.sort(key=lambda it: it[1][0], reverse=True)
+    rows = [{"key": key, "count": int(c), "error": int(e),
+             "last_seen": datetime.fromtimestamp(seen, timezone.utc).isoformat()}
+            for key, (c, e, seen) in items[:k]]
+    return {"total": total, "tracked": len(self.entries), "capacity": self.capacity,
+            "evictions": evictions, "items": rows,
+            "other": total - sum(r["count"] for r in rows)}
 
-@dataclass
-class MinuteBucket:
-  ts: str
-  audio_events: int = 0
-  detections: int = 0
-  missions_enqueued: int = 0
-  missions_completed: int = 0
-  rtl_issued: int = 0
 
-@dataclass
 class Metrics:
-  # 누적 카운터
-  total_audio_events: int = 0
-  total_detections: int = 0
-  total_missions_enqueued: int = 0
-  total_missions_completed: int = 0
-  total_rtl_issued: int = 0
-  # 최근 30분 타임시리즈
-  series: List[MinuteBucket] = field(default_factory=list)
-  # 현재 분 카운터
-  cur_audio: int = 0
-  cur_det: int = 0
-  cur_msq: int = 0
-  cur_msc: int = 0
-  cur_rtl: int = 0
-
-  def _roll_minute(self):
-    now = datetime.now(timezone.utc).replace(second=0, microsecond=0).isoformat()
-    self.series.append(MinuteBucket(
-      ts=now,
-      audio_events=self.cur_audio,
-      detections=self.cur_det,
-      missions_enqueued=self.cur_msq,
-      missions_completed=self.cur_msc,
-      rtl_issued=self.cur_rtl,
-    ))
-    if len(self.series) > WINDOW_MINUTES:
-      self.series.pop(0)
-    self.cur_audio = self.cur_det = self.cur_msq = self.cur_msc = self.cur_rtl = 0
-
-  def note_audio_event(self):
-    self.total_audio_events += 1
-    self.cur_audio += 1
-
-  def note_detection(self):
-    self.total_detections += 1
-    self.cur_det += 1
+  def __init__(self):
+    self._lock = threading.Lock()
+    self.totals = [0] * len(FIELDS)
+    self.levels = [_Ring(res, size) for res, size in RESOLUTIONS.values()]
+    # 각 상위 레벨에서 아직 다운샘플되지 않은(진행 중인) bucket 번호
+    self._open = [None] * len(self.levels)
+    # 라벨별 카운터 (family 이름 → 스케치)
+    self.labels: Dict[str, TopKCounter] = {name: TopKCounter() for name in LABEL_FAMILIES}
+
+  # ── 기록 ─────────────────────────────────────
+  def _advance(self, now: float) -> None:
+    """상위 레벨의 bucket 경계를 넘었으면 직전 bucket 을 하위 레벨 합산으로 확정."""
+    for lv in range(1, len(self.levels)):
+      ring, finer = self.levels[lv], self.levels[lv - 1]
+      cur = int(now) // ring.resolution
+      done = self._open[lv]
+      if done is not None and done != cur:
+        ratio = ring.resolution // finer.resolution
+        total = [0] * len(FIELDS)
+        for fb in range(done * ratio, (done + 1) * ratio):
+          vals = finer.get(fb)
+          if vals:
+            for k, v in enumerate(vals):
+              total[k] += v
+        if any(total):
+          ring.slot(done)[:] = total
+      self._open[lv] = cur
+
+  def _note(self, field: str, n: int = 1) -> None:
+    now = time.time()
+    k = _IDX[field]
+    with self._lock:
+      self._advance(now)
+      self.totals[k] += n
+      self.levels[0].slot(int(now))[k] += n
+
+  def note_audio_event(self, sensor_id: Optional[str] = None, accepted: bool = False):
+    self._note("audio_events")
+    if sensor_id:
+      self.labels["audio_by_sensor"].inc(sensor_id)
+      if accepted:
+        self.labels["accepted_by_sensor"].inc(sensor_id)
+
+  def note_detection(self, stream_id: Optional[str] = None, cls: Optional[str] = None, n: int = 1):
+    self._note("detections", n)
+    if stream_id:
+      self.labels["detections_by_stream"].inc(stream_id, n)
+    if cls:
+      self.labels["detections_by_class"].inc(cls, n)
 
   def note_mission_enqueued(self):
-    self.total_missions_enqueued += 1
-    self.cur_msq += 1
+    self._note("missions_enqueued")
 
   def note_mission_completed(self):
-    self.total_missions_completed += 1
-    self.cur_msc += 1
+    self._note("missions_completed")
 
   def note_rtl(self):
-    self.total_rtl_issued += 1
-    self.cur_rtl += 1
+    self._note("rtl_issued")
+
+  def tick(self) -> None:
+    """기록이 없는 동안에도 상위 레벨 bucket 을 확정 (스케줄러에서 주기 호출)."""
+    with self._lock:
+      self._advance(time.time())
 
-  def snapshot(self) -> Dict:
+  # ── 조회 ─────────────────────────────────────
+  def _value(self, lv: int, bucket: int, now_bucket0: int) -> List[int]:
+    ring = self.levels[lv]
+    if lv == 0 or bucket != self._open[lv]:
+      vals = ring.get(bucket)
+      return vals[:] if vals else [0] * len(FIELDS)
+    # 진행 중인 bucket 은 하위 레벨에서 즉석 합산
+    finer = self.levels[lv - 1]
+    ratio = ring.resolution // finer.resolution
+    total = [0] * len(FIELDS)
+    last = now_bucket0 // finer.resolution
+    for fb in range(bucket * ratio, min((bucket + 1) * ratio, last + 1)):
+      for k, v in enumerate(self._value(lv - 1, fb, now_bucket0)):
+        total[k] += v
+    return total
+
+  def series(self, resolution: str = DEFAULT_RESOLUTION, range_sec: int = DEFAULT_RANGE_SEC) -> List[Dict]:
+    """해상도별 최근 range_sec 구간 타임시리즈 (오래된 순, 진행 중인 마지막 bucket 포함)."""
+    lv = list(RESOLUTIONS).index(resolution)
+    res, size = RESOLUTIONS[resolution]
+    n = max(1, min(range_sec // res, size))
+    now = int(time.time())
+    with self._lock:
+      self._advance(now)
+      cur = now // res
+      rows = [(b, self._value(lv, b, now)) for b in range(cur - n + 1, cur + 1)]
+    return [
+      {"ts": datetime.fromtimestamp(b * res, timezone.utc).isoformat(), **dict(zip(FIELDS, vals))}
+      for b, vals in rows
+    ]
+
+  def totals_dict(self) -> Dict[str, int]:
+    with self._lock:
+      return dict(zip(FIELDS, self.totals))
+
+  def snapshot(self, resolution: str = DEFAULT_RESOLUTION, range_sec: int = DEFAULT_RANGE_SEC) -> Dict:
     return {
-      "totals": {
-        "audio_events": self.total_audio_events,
-        "detections": self.total_detections,
-        "missions_enqueued": self.total_missions_enqueued,
-        "missions_completed": self.total_missions_completed,
-        "rtl_issued": self.total_rtl_issued,
-      },
-      "series": [b.__dict__ for b in self.series],
+      "totals": self.totals_dict(),
+      "resolution": resolution,
+      "range_sec": range_sec,
+      "series": self.series(resolution, range_sec),
       "generated_at": datetime.now(timezone.utc).isoformat(),
     }
 
+  # ── 영속화 ───────────────────────────────────
+  def save(self, path: str) -> None:
+    with self._lock:
+      data = {"totals": self.totals[:], "levels": {name: ring.dump() for name, ring
+                                                  in zip(RESOLUTIONS, self.levels) if name != "1s"}}
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+      json.dump(data, f)
+    os.replace(tmp, path)
+
+  def load(self, path: str) -> None:
+    try:
+      with open(path) as f:
+        data = json.load(f)
+    except (OSError, ValueError):
+      return
+    with self._lock:
+      self.totals = (data.get("totals", []) + [0] * len(FIELDS))[:len(FIELDS)]
+      for name, ring in zip(RESOLUTIONS, self.levels):
+        if name in data.get("levels", {}):
+          ring.load(data["levels"][name])
+
+
 METRICS = Metrics()
 
 async def run_metrics_scheduler():
-  # 60초마다 분 버킷 롤링
+  # 1초마다 상위 해상도 bucket 확정, PERSIST_INTERVAL_SEC 마다 선택적 파일 저장
+  if PERSIST_PATH:
+    METRICS.load(PERSIST_PATH)
+  last_save = time.time()
   while True:
-    await asyncio.sleep(60)
-    METRICS._roll_minute()
+    await asyncio.sleep(1)
+    METRICS.tick()
+    if PERSIST_PATH and time.time() - last_save >= PERSIST_INTERVAL_SEC:
+      last_save = time.time()
+      try:
+        await asyncio.to_thread(METRICS.save, PERSIST_PATH)
+      except OSError as e:
+        print(f"[Metrics] persist failed: {e}")
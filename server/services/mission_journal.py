@@ -0,0 +1,170 @@
+# server/services/mission_journal.py
+"""
+Mission Journal
+---------------
+미션 큐/진행 중 미션 상태를 재시작 후에도 복구하기 위한 추가 전용(append-only) 저널.
+ - 저장소: 별도 SQLite 파일 (WAL 모드, synchronous=FULL)
+ - 기록: enqueue / dispatch / requeue / complete 연산을 순번(seq)과 함께 추가
+ - 그룹 커밋: 전용 writer 스레드가 대기 중인 기록을 한 트랜잭션(fsync 1회)으로 묶어 커밋
+ - 스냅샷: 주기적으로 전체 상태를 저장하고 그 이전 저널을 삭제 → 복구 시간 상한 유지
+ - 복구: 스냅샷 + 이후 저널 재생으로 큐와 진행 중 미션을 재구성
+"""
+
+from __future__ import annotations
+import json, os, sqlite3, threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+JOURNAL_PATH = os.getenv("MISSION_JOURNAL_PATH", "./missions.db")   # 빈 문자열이면 저널 비활성화
+SNAPSHOT_EVERY_OPS = 500         # 마지막 스냅샷 이후 이 연산 수를 넘으면 스냅샷
+SNAPSHOT_INTERVAL_SEC = 60       # 스냅샷 점검 주기
+DURABLE_WAIT_TIMEOUT = 2.0       # enqueue 가 커밋 완료를 기다리는 최대 시간
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS journal (
+  seq INTEGER PRIMARY KEY,
+  op TEXT NOT NULL,
+  mission_id TEXT,
+  body TEXT
+);
+CREATE TABLE IF NOT EXISTS snapshot (
+  id INTEGER PRIMARY KEY CHECK (id = 1),
+  seq INTEGER NOT NULL,
+  body TEXT NOT NULL
+);
+"""
+
+class MissionJournal:
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._cv = threading.Condition()
+        self._pending: List[Tuple] = []      # (seq, op, mission_id, body) 또는 ("snapshot", seq, body)
+        self._seq = 0                        # 마지막으로 할당된 순번
+        self._durable_seq = 0                # 디스크에 커밋 완료된 순번
+        self._ops_since_snapshot = 0
+        self._writer: Optional[threading.Thread] = None
+        self.durable_timeouts = 0            # wait_durable 시간 초과 횟수
+
+    # ── 열기/복구 ─────────────────────────────────
+    def open(self) -> None:
+        if self._conn is not None:
+            return
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=FULL")
+        conn.executescript(_SCHEMA)
+        self._conn = conn
+        row = conn.execute("SELECT MAX(seq) FROM journal").fetchone()
+        snap = conn.execute("SELECT seq FROM snapshot WHERE id = 1").fetchone()
+        self._seq = self._durable_seq = max(row[0] or 0, snap[0] if snap else 0)
+        self._writer = threading.Thread(target=self._write_loop, name="mission-journal", daemon=True)
+        self._writer.start()
+
+    def load(self) -> Tuple[Deque[Dict], Dict[str, Dict]]:
+        """스냅샷 + 이후 저널을 재생하여 (대기 큐, 진행 중 미션) 을 복원."""
+        self.open()
+        queue: Deque[Dict] = deque()
+        inflight: Dict[str, Dict] = {}
+        snap = self._conn.execute("SELECT seq, body FROM snapshot WHERE id = 1").fetchone()
+        since = 0
+        if snap:
+            since, body = snap[0], json.loads(snap[1])
+            queue.extend(body["queue"]); inflight.update(body["inflight"])
+        rows = self._conn.execute(
+            "SELECT op, mission_id, body FROM journal WHERE seq > ? ORDER BY seq", (since,))
+        n = 0
+        for op, mission_id, body in rows:
+            apply_op(queue, inflight, op, mission_id, json.loads(body) if body else None)
+            n += 1
+        self._ops_since_snapshot = n
+        return queue, inflight
+
+    # ── 기록 ─────────────────────────────────────
+    def append(self, op: str, mission_id: Optional[str], body=None) -> int:
+        """연산을 커밋 대기열에 추가하고 순번을 반환 (블로킹 없음)."""
+        self.open()
+        payload = json.dumps(body, default=str) if body is not None else None
+        with self._cv:
+            self._seq += 1
+            self._pending.append((self._seq, op, mission_id, payload))
+            self._ops_since_snapshot += 1
+            self._cv.notify_all()
+            return self._seq
+
+    def wait_durable(self, seq: int, timeout: float = DURABLE_WAIT_TIMEOUT) -> bool:
+        """seq 까지 디스크 커밋이 끝날 때까지 대기 (같은 배치의 다른 기록과 fsync 를 공유)."""
+        with self._cv:
+            ok = self._cv.wait_for(lambda: self._durable_seq >= seq, timeout)
+            if not ok:
+                self.durable_timeouts += 1
+            return ok
+
+    def needs_snapshot(self) -> bool:
+        return self._ops_since_snapshot >= SNAPSHOT_EVERY_OPS
+
+    def snapshot(self, queue: List[Dict], inflight: Dict[str, Dict]) -> None:
+        """
+        현재 상태를 스냅샷으로 예약. 호출자는 상태 변경과 append 를 막는 잠금을 잡은 채 호출해야
+        스냅샷과 순번이 일치한다.
+        """
+        self.open()
+        body = json.dumps({"queue": queue, "inflight": inflight}, default=str)
+        with self._cv:
+            self._pending.append(("snapshot", self._seq, body))
+            self._ops_since_snapshot = 0
+            self._cv.notify_all()
+
+    # ── writer 스레드 (그룹 커밋) ──────────────────
+    def _write_loop(self) -> None:
+        while True:
+            with self._cv:
+                self._cv.wait_for(lambda: self._pending)
+                batch, self._pending = self._pending, []
+            last = self._durable_seq
+            try:
+                self._conn.execute("BEGIN")
+                for item in batch:
+                    if item[0] == "snapshot":
+                        _, seq, body = item
+                        self._conn.execute(
+                            "INSERT OR REPLACE INTO snapshot (id, seq, body) VALUES (1, ?, ?)", (seq, body))
+                        self._conn.execute("DELETE FROM journal WHERE seq <= ?", (seq,))
+                    else:
+                        self._conn.execute(
+                            "INSERT INTO journal (seq, op, mission_id, body) VALUES (?, ?, ?, ?)", item)
+                        last = item[0]
+                self._conn.execute("COMMIT")
+            except Exception as e:
+                print(f"[Journal] commit failed: {e}")
+                try:
+                    self._conn.execute("ROLLBACK")
+                except sqlite3.Error:
+                    pass
+                with self._cv:
+                    self._pending[:0] = batch   # 다음 배치에서 재시도
+                threading.Event().wait(0.5)
+                continue
+            with self._cv:
+                self._durable_seq = max(self._durable_seq, last)
+                self._cv.notify_all()
+
+
+def apply_op(queue: Deque[Dict], inflight: Dict[str, Dict], op: str,
+             mission_id: Optional[str], body) -> None:
+    """저널 연산 1건을 상태에 반영 (waypoint_builder 의 메모리 연산과 동일한 의미)."""
+    if op == "enqueue":
+        queue.append(body)
+    elif op == "dispatch":
+        taken = {leg["id"] for leg in body.get("legs", [])} | {mission_id}
+        kept = [wp for wp in queue if wp["id"] not in taken]
+        queue.clear(); queue.extend(kept)
+        inflight[mission_id] = body
+    elif op == "requeue":
+        inflight.pop(mission_id, None)
+        queue.extendleft(reversed(body))
+    elif op == "complete":
+        inflight.pop(mission_id, None)
+
+
+JOURNAL: Optional[MissionJournal] = MissionJournal(JOURNAL_PATH) if JOURNAL_PATH else None
@@ -2,37 +2,57 @@
 """
 MQTT Bridge Service
 -------------------
-센서 노드 → (MQTT) → 서버 HTTP /ingest/audio 변환 중계
+센서 노드 → (MQTT) → 적재 파이프라인(ingest_pipeline) 직접 전달
+ - on_message(paho 네트워크 스레드): JSON 또는 바이너리 프레임(uplink_codec) 디코딩 + 검증만 하고
+   이벤트 루프 큐에 넣음
+ - 실제 저장/브로드캐스트는 루프의 run_ingest_consumer() 가 마이크로 배치로 처리
+   (예전의 127.0.0.1:8000 HTTP 루프백 + 블로킹 requests.post 제거)
+ - QoS1 + 수동 ack: 적재 또는 디스크 스풀 기록이 끝난 메시지만 ack (ingest_spool 참고)
+ - MQTT_CONSUMERS > 0 이면 drowni/audio/<shard>/<sensor_id> 토픽을 여러 소비자 프로세스가 나눠 구독 (mqtt_shards)
 """
 
-import asyncio, json, requests
+import asyncio, os, time
 from datetime import datetime, timezone
 from paho.mqtt import client as mqtt
+from pydantic import ValidationError
+
+from server.services import ingest_pipeline, mqtt_shards
 
 MQTT_BROKER = "localhost"
 MQTT_PORT = 1883
 MQTT_TOPIC = "drowni/audio"
-
-API_URL = "http://127.0.0.1:8000/ingest/audio"
+MQTT_CLIENT_ID = os.getenv("MQTT_CLIENT_ID", "drowni-bridge")
 
 def on_connect(client, userdata, flags, rc):
     print(f"[MQTT] Connected with code {rc}")
-    client.subscribe(MQTT_TOPIC)
+    client.subscribe(MQTT_TOPIC, qos=1)
 
 def on_message(client, userdata, msg):
+    # QoS1 수동 ack: DB 또는 디스크 스풀에 기록된 뒤에만 PUBACK → 서버 장애 중에도 유실 없음
+    ack = (lambda: client.ack(msg.mid, msg.qos)) if msg.qos > 0 else None
+    received = time.time()
     try:
-        payload = json.loads(msg.payload.decode())
-        if "sensor_id" not in payload:
-            print("[MQTT] Invalid payload, skipping")
-            return
-        payload.setdefault("ts", datetime.now(timezone.utc).isoformat())
-        r = requests.post(API_URL, json=payload, timeout=5)
-        print(f"[MQTT→HTTP] {payload['sensor_id']} → {r.status_code}")
-    except Exception as e:
-        print(f"[MQTT] Error: {e}")
+        payloads = ingest_pipeline.parse_uplink(msg.payload, received_at=datetime.now(timezone.utc))
+    except (ValueError, ValidationError) as e:
+        print(f"[MQTT] Invalid payload, skipping: {e}")
+        if ack:
+            ack()                       # 재전송해도 소용없는 메시지
+        return
+    if not ingest_pipeline.submit_threadsafe(payloads, ack, received):
+        print("[MQTT] Ingest pipeline unavailable and spool disabled, dropping message")
 
 async def run_mqtt_bridge():
-    client = mqtt.Client()
+    ingest_pipeline.bind(asyncio.get_running_loop())
+    asyncio.create_task(ingest_pipeline.run_ingest_consumer())
+    asyncio.create_task(ingest_pipeline.run_spool_replayer())
+    if mqtt_shards.MQTT_CONSUMERS > 0:
+        # 샤딩 모드: 디코딩/검증을 소비자 프로세스들로 분산 (mqtt_shards 참고)
+        mqtt_shards.start_consumers(mqtt_shards.MQTT_CONSUMERS, MQTT_BROKER, MQTT_PORT, MQTT_TOPIC, MQTT_CLIENT_ID)
+        while True:
+            await asyncio.sleep(10)
+            mqtt_shards.respawn_dead()
+    # 고정 client_id + clean_session=False → 미확인(QoS1) 메시지를 재접속 후 다시 받음
+    client = mqtt.Client(client_id=MQTT_CLIENT_ID, clean_session=False, manual_ack=True)
     client.on_connect = on_connect
     client.on_message = on_message
     client.connect(MQTT_BROKER, MQTT_PORT, 60)
@@ -0,0 +1,153 @@
+# server/services/mqtt_shards.py
+"""
+Sharded MQTT Consumers
+----------------------
+센서가 수천 개일 때 단일 paho 클라이언트(네트워크 스레드 1개)의 디코딩/검증이 코어 하나를 포화시키는 문제를
+여러 소비자 프로세스로 나눠 해결한다. (MQTT_CONSUMERS > 0 일 때 사용, 0 이면 기존 단일 클라이언트)
+
+토픽 샤딩:
+  drowni/audio/<shard>/<sensor_id>   shard = crc32(sensor_id) % MQTT_SHARDS  (topic_for() 참고)
+  워커 i 는 shard % MQTT_CONSUMERS == i 인 샤드만 구독, 기존 단일 토픽 drowni/audio 는 워커 0 이 구독
+  → 한 센서의 메시지는 항상 같은 워커 → 같은 파이프 → 같은 적재 큐를 거치므로 센서별 순서 유지
+  (MQTT5 $share 공유 구독은 메시지를 임의 분배해 센서별 순서가 깨지므로 쓰지 않는다)
+
+프로세스 구성:
+  워커: paho 수신 → parse_uplink(디코딩+검증) → 5ms/256건 단위로 묶어 out 큐로 전달
+  부모: 워커별 수신 스레드가 ingest_pipeline.submit_threadsafe() 로 넘김 (배치 적재/스풀은 기존 경로)
+  ack: 부모가 DB 커밋 또는 스풀 기록 후 mid 를 워커의 ack 큐로 돌려주면 워커가 QoS1 PUBACK
+"""
+
+from __future__ import annotations
+import multiprocessing as mp
+import os, threading, time, zlib
+from datetime import datetime, timezone
+from typing import List, Optional
+
+MQTT_CONSUMERS = int(os.getenv("MQTT_CONSUMERS", "0"))
+MQTT_SHARDS = int(os.getenv("MQTT_SHARDS", "64"))
+FLUSH_SEC = 0.005
+FLUSH_MAX = 256
+
+
+def shard_of(sensor_id: str, shards: int = MQTT_SHARDS) -> int:
+    return zlib.crc32(sensor_id.encode()) % shards
+
+def topic_for(sensor_id: str, base: str = "drowni/audio", shards: int = MQTT_SHARDS) -> str:
+    """센서 측 발행 토픽."""
+    return f"{base}/{shard_of(sensor_id, shards)}/{sensor_id}"
+
+def worker_topics(index: int, workers: int, base: str = "drowni/audio", shards: int = MQTT_SHARDS) -> List[str]:
+    topics = [f"{base}/{s}/+" for s in range(index, shards, workers)]
+    if index == 0:
+        topics.append(base)
+    return topics
+
+# ───────────────────────────────────────────────
+# 워커 프로세스
+# ───────────────────────────────────────────────
+def _worker_main(index: int, workers: int, broker: str, port: int, base: str, client_id: str,
+                 out_q: "mp.Queue", ack_q: "mp.Queue", gen: int = 0) -> None:
+    from paho.mqtt import client as mqtt
+    from pydantic import ValidationError
+    from server.services.ingest_pipeline import parse_uplink
+
+    pending: list = []
+    lock = threading.Lock()
+
+    def flush():
+        nonlocal pending
+        with lock:
+            items, pending = pending, []
+        if items:
+            out_q.put((gen, items))
+
+    def on_connect(client, userdata, flags, rc):
+        client.subscribe([(t, 1) for t in worker_topics(index, workers, base)])
+        print(f"[MQTT#{index}] Connected with code {rc}")
+
+    def on_message(client, userdata, msg):
+        try:
+            payloads = parse_uplink(msg.payload, received_at=datetime.now(timezone.utc))
+        except (ValueError, ValidationError) as e:
+            print(f"[MQTT#{index}] Invalid payload, skipping: {e}")
+            if msg.qos > 0:
+                client.ack(msg.mid, msg.qos)
+            return
+        with lock:
+            pending.append((msg.mid if msg.qos > 0 else None, [p.model_dump() for p in payloads]))
+            full = len(pending) >= FLUSH_MAX
+        if full:
+            flush()
+
+    client = mqtt.Client(client_id=f"{client_id}-{index}", clean_session=False, manual_ack=True)
+    client.on_connect = on_connect
+    client.on_message = on_message
+    client.connect(broker, port, 60)
+    client.loop_start()
+
+    def acker():
+        while True:
+            g, mid = ack_q.get()
+            if g == gen:                # 재기동 전 프로세스의 mid 는 무시 (브로커가 재전송)
+                client.ack(mid, 1)
+
+    threading.Thread(target=acker, daemon=True).start()
+    while True:
+        time.sleep(FLUSH_SEC)
+        flush()
+
+# ───────────────────────────────────────────────
+# 부모 프로세스
+# ───────────────────────────────────────────────
+class _Worker:
+    def __init__(self, index: int, args: tuple, out_q: "mp.Queue", ack_q: "mp.Queue"):
+        self.index, self.args, self.out_q, self.ack_q = index, args, out_q, ack_q
+        self.proc: Optional["mp.Process"] = None
+        self.messages = 0
+        self.restarts = 0
+        self.gen = 0              # 재기동 세대 (ack 를 올바른 연결로 돌려보내기 위함)
+
+    def spawn(self) -> None:
+        self.gen += 1
+        self.proc = mp.get_context("spawn").Process(
+            target=_worker_main, name=f"mqtt-consumer-{self.index}", daemon=True,
+            args=self.args + (self.out_q, self.ack_q, self.gen))
+        self.proc.start()
+
+
+WORKERS: List[_Worker] = []
+
+def _pump(w: _Worker) -> None:
+    """워커 → 적재 파이프라인 (부모의 수신 스레드). 워커 안에서 이미 검증됐으므로 model_construct."""
+    from server.services import ingest_pipeline
+    P = ingest_pipeline.IngestPayload
+    ack_q = w.ack_q
+    while True:
+        gen, items = w.out_q.get()
+        for mid, dicts in items:
+            ack = (lambda g=gen, m=mid: ack_q.put((g, m))) if mid is not None else None
+            if not ingest_pipeline.submit_threadsafe([P.model_construct(**d) for d in dicts], ack):
+                print(f"[MQTT#{w.index}] Ingest pipeline unavailable and spool disabled, dropping message")
+        w.messages += len(items)
+
+def start_consumers(workers: int, broker: str, port: int, base: str, client_id: str) -> List[_Worker]:
+    ctx = mp.get_context("spawn")
+    for i in range(workers):
+        w = _Worker(i, (i, workers, broker, port, base, client_id), ctx.Queue(maxsize=1024), ctx.Queue())
+        w.spawn()
+        threading.Thread(target=_pump, args=(w,), name=f"mqtt-pump-{i}", daemon=True).start()
+        WORKERS.append(w)
+    print(f"[MQTT] {workers} consumer processes over {MQTT_SHARDS} shards ({broker}:{port})")
+    return WORKERS
+
+def respawn_dead() -> None:
+    """죽은 워커 재기동 (같은 client_id 로 재접속 → 브로커가 미확인 메시지 재전송)."""
+    for w in WORKERS:
+        if w.proc is not None and not w.proc.is_alive():
+            print(f"[MQTT#{w.index}] consumer exited ({w.proc.exitcode}), restarting")
+            w.restarts += 1
+            w.spawn()
+
+def worker_stats() -> List[dict]:
+    return [{"index": w.index, "pid": w.proc.pid, "alive": w.proc.is_alive(),
+             "messages": w.messages, "restarts": w.restarts} for w in WORKERS]
@@ -0,0 +1,220 @@
+# server/services/prom_metrics.py
+"""
+Prometheus / OpenMetrics Exposition
+-----------------------------------
+운영 지표(지연 시간 분포, 동시 처리 요청 수, DB 커밋 시간, SSE 구독/큐 상태)를
+Prometheus 텍스트 포맷 또는 OpenMetrics 포맷으로 노출.
+ - Histogram: 버킷 배열을 미리 할당, observe() 는 이분 탐색 + 정수 증가만 수행
+ - 라벨 조합(메서드·라우트 템플릿)별 히스토그램은 최초 1회만 생성 → 요청당 할당 없음
+ - 비즈니스 카운터(METRICS)와 미션 큐 상태는 수집 시점에 읽어서 함께 출력
+"""
+
+from __future__ import annotations
+import threading, time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from sqlalchemy import event
+
+from server.db.models import SessionLocal
+from server.api.realtime import subscriber_stats
+from server.services.metrics_collector import METRICS
+from server.services.waypoint_builder import peek_queue_size, inflight_missions
+from server.services.mission_journal import JOURNAL
+from server.services import ingest_pipeline, mqtt_shards
+from server.services.ingest_spool import get_spool
+
+# 요청 지연 버킷 (초): 1ms ~ 10s
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)   # 마지막 칸 = +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    def cumulative(self) -> Tuple[List[int], float]:
+        with self._lock:
+            counts, total = self.counts[:], self.sum
+        acc, out = 0, []
+        for c in counts:
+            acc += c
+            out.append(acc)
+        return out, total
+
+class HistogramFamily:
+    """라벨 값 튜플 → Histogram. 라벨 조합은 라우트 수로 제한됨."""
+    def __init__(self, name: str, help_: str, labels: Sequence[str], bounds: Sequence[float]):
+        self.name, self.help, self.labels, self.bounds = name, help_, tuple(labels), tuple(bounds)
+        self.children: Dict[Tuple[str, ...], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def child(self, *values: str) -> Histogram:
+        h = self.children.get(values)
+        if h is None:
+            with self._lock:
+                h = self.children.setdefault(values, Histogram(self.bounds))
+        return h
+
+class CounterFamily:
+    def __init__(self, name: str, help_: str, labels: Sequence[str]):
+        self.name, self.help, self.labels = name, help_, tuple(labels)
+        self.children: Dict[Tuple[str, ...], int] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *values: str, n: int = 1) -> None:
+        with self._lock:
+            self.children[values] = self.children.get(values, 0) + n
+
+# ───────────────────────────────────────────────
+# 지표 정의
+# ───────────────────────────────────────────────
+HTTP_DURATION = HistogramFamily("drowni_http_request_duration_seconds",
+                                "HTTP request duration by route template",
+                                ("method", "route"), LATENCY_BUCKETS)
+HTTP_RESPONSES = CounterFamily("drowni_http_responses_total",
+                               "HTTP responses by route template and status class",
+                               ("method", "route", "status"))
+DB_COMMIT = Histogram(DB_BUCKETS)
+
+class _InFlight:
+    value = 0
+
+HTTP_IN_FLIGHT = _InFlight()
+
+# 수집 시점에 값을 읽는 게이지/카운터: name → (type, help, 콜백 → [(라벨 dict, 값)])
+_COLLECTORS: Dict[str, Tuple[str, str, Callable[[], List[Tuple[Dict[str, str], float]]]]] = {}
+
+def register_collector(name: str, type_: str, help_: str,
+                       fn: Callable[[], List[Tuple[Dict[str, str], float]]]) -> None:
+    _COLLECTORS[name] = (type_, help_, fn)
+
+# 기본 수집기: SSE 구독자/브로드캐스트 큐, 비즈니스 카운터, 미션 큐
+register_collector("drowni_sse_subscribers", "gauge", "Connected SSE subscribers per channel",
+                   lambda: [({"channel": ch}, st["subscribers"]) for ch, st in subscriber_stats().items()])
+register_collector("drowni_sse_queue_depth", "gauge", "Messages waiting in SSE subscriber queues per channel",
+                   lambda: [({"channel": ch}, st["queued"]) for ch, st in subscriber_stats().items()])
+register_collector("drowni_sse_queue_depth_max", "gauge", "Deepest single SSE subscriber queue per channel",
+                   lambda: [({"channel": ch}, st["max_queued"]) for ch, st in subscriber_stats().items()])
+register_collector("drowni_events_total", "counter", "Business events counted by the metrics collector",
+                   lambda: [({"kind": k}, v) for k, v in METRICS.totals_dict().items()])
+PROM_LABEL_TOP = 20   # 스크레이프 시 family 별로 내보낼 상위 키 수 (나머지는 key="other")
+
+def _labelled_events():
+    rows = []
+    for family, counter in METRICS.labels.items():
+        top = counter.top(PROM_LABEL_TOP)
+        rows += [({"family": family, "key": r["key"]}, r["count"]) for r in top["items"]]
+        rows.append(({"family": family, "key": "other"}, top["other"]))
+    return rows
+
+# 상위 키 집합이 스크레이프마다 바뀌어(진입/퇴출, other 감소) 단조 증가가 보장되지 않으므로 counter 가 아닌 gauge
+register_collector("drowni_labelled_events", "gauge",
+                   "Per sensor/stream/class event counts (top-k snapshot, remainder in key=other)", _labelled_events)
+register_collector("drowni_mission_queue_size", "gauge", "Waypoints waiting for dispatch",
+                   lambda: [({}, peek_queue_size())])
+register_collector("drowni_missions_inflight", "gauge", "Dispatched missions not yet acked",
+                   lambda: [({}, len(inflight_missions()))])
+register_collector("drowni_mission_journal_durable_timeouts_total", "counter",
+                   "Enqueues answered before the mission journal commit was confirmed",
+                   lambda: [({}, JOURNAL.durable_timeouts if JOURNAL else 0)])
+def _spool_stat(key: str) -> float:
+    spool = get_spool()
+    return spool.stats()[key] if spool is not None else 0
+
+register_collector("drowni_ingest_queue_depth", "gauge", "MQTT payloads waiting for the ingest batcher",
+                   lambda: [({}, ingest_pipeline.queue_depth())])
+register_collector("drowni_ingest_messages_total", "counter", "MQTT ingest pipeline message outcomes",
+                   lambda: [({"outcome": k}, getattr(ingest_pipeline.STATS, k))
+                            for k in ("received", "stored", "dropped", "failed", "spooled", "replayed")])
+register_collector("drowni_ingest_spool_depth", "gauge", "Uplinks waiting in the disk spool for replay",
+                   lambda: [({}, _spool_stat("depth"))])
+register_collector("drowni_ingest_spool_bytes", "gauge", "Disk used by spool segments",
+                   lambda: [({}, _spool_stat("bytes"))])
+register_collector("drowni_ingest_spool_replay_rate", "gauge", "Recent spool replay throughput (uplinks/s)",
+                   lambda: [({}, ingest_pipeline.STATS.replay_rate)])
+register_collector("drowni_mqtt_consumer_messages_total", "counter", "MQTT messages forwarded per consumer process",
+                   lambda: [({"worker": str(w["index"])}, w["messages"]) for w in mqtt_shards.worker_stats()])
+register_collector("drowni_ingest_batches_total", "counter", "Micro-batches committed by the ingest batcher",
+                   lambda: [({}, ingest_pipeline.STATS.batches)])
+
+# ───────────────────────────────────────────────
+# DB 커밋 시간 (SQLAlchemy 세션 이벤트)
+# ───────────────────────────────────────────────
+@event.listens_for(SessionLocal, "before_commit")
+def _before_commit(session):
+    session.info["_commit_t0"] = time.perf_counter()
+
+@event.listens_for(SessionLocal, "after_commit")
+def _after_commit(session):
+    t0 = session.info.pop("_commit_t0", None)
+    if t0 is not None:
+        DB_COMMIT.observe(time.perf_counter() - t0)
+
+# ───────────────────────────────────────────────
+# 텍스트 포맷 출력
+# ───────────────────────────────────────────────
+def _esc(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_esc(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _fmt(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+def _histogram_lines(out: List[str], name: str, names: Sequence[str], values: Sequence[str],
+                     bounds: Sequence[float], h: Histogram) -> None:
+    cum, total = h.cumulative()
+    for b, c in zip(list(bounds) + [float("inf")], cum):
+        le = 'le="%s"' % _fmt(b)
+        out.append(f"{name}_bucket{_labels(names, values, le)} {c}")
+    out.append(f"{name}_sum{_labels(names, values)} {_fmt(total)}")
+    out.append(f"{name}_count{_labels(names, values)} {cum[-1]}")
+
+def render(openmetrics: bool = False) -> str:
+    out: List[str] = []
+
+    def header(name: str, type_: str, help_: str):
+        # OpenMetrics 는 카운터 family 이름에서 _total 접미사를 뺀다
+        family = name[:-6] if openmetrics and type_ == "counter" and name.endswith("_total") else name
+        out.append(f"# HELP {family} {help_}")
+        out.append(f"# TYPE {family} {type_}")
+
+    header("drowni_http_requests_in_flight", "gauge", "HTTP requests currently being served")
+    out.append(f"drowni_http_requests_in_flight {HTTP_IN_FLIGHT.value}")
+
+    header(HTTP_DURATION.name, "histogram", HTTP_DURATION.help)
+    for values, h in list(HTTP_DURATION.children.items()):
+        _histogram_lines(out, HTTP_DURATION.name, HTTP_DURATION.labels, values, HTTP_DURATION.bounds, h)
+
+    header(HTTP_RESPONSES.name, "counter", HTTP_RESPONSES.help)
+    for values, n in list(HTTP_RESPONSES.children.items()):
+        out.append(f"{HTTP_RESPONSES.name}{_labels(HTTP_RESPONSES.labels, values)} {n}")
+
+    header("drowni_db_commit_duration_seconds", "histogram", "SQLAlchemy session commit duration")
+    _histogram_lines(out, "drowni_db_commit_duration_seconds", (), (), DB_BUCKETS, DB_COMMIT)
+
+    for name, (type_, help_, fn) in list(_COLLECTORS.items()):
+        header(name, type_, help_)
+        for labels, value in fn():
+            out.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {_fmt(value)}")
+
+    if openmetrics:
+        out.append("# EOF")
+    return "\n".join(out) + "\n"
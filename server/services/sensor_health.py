@@ -0,0 +1,174 @@
+# server/services/sensor_health.py
+"""
+Sensor Health Table
+-------------------
+센서 노드별 상태를 NumPy 배열(열 단위)로 보관하는 메모리 테이블. DB 조회 없이 O(센서 수)로 응답.
+ - last_seen / first_seen / 수신 패킷 수 / 패킷 간격 EWMA(→ 분당 패킷률)
+ - 배터리 시계열: 센서당 BATTERY_WINDOW 칸 링 (BATTERY_SAMPLE_SEC 간격으로 샘플링 → 수 시간 추세)
+ - 방전 추정: 전 센서에 대해 한 번에 최소제곱 기울기(V/h)를 계산하고,
+   BATTERY_EMPTY_V 도달까지 남은 시간을 예측 → 배터리 교체 일정 수립용
+행(row)은 센서 최초 보고 시 할당되고, 배열은 용량이 차면 2배로 늘린다.
+"""
+
+from __future__ import annotations
+import os, threading, time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+BATTERY_WINDOW = int(os.getenv("SENSOR_BATTERY_WINDOW", "96"))
+BATTERY_SAMPLE_SEC = float(os.getenv("SENSOR_BATTERY_SAMPLE_SEC", "300"))   # 96 × 5분 = 8시간
+BATTERY_EMPTY_V = float(os.getenv("SENSOR_BATTERY_EMPTY_V", "3.5"))     # 페일세이프 저전압 경보 기준과 동일
+MIN_TREND_SAMPLES = 4
+RATE_ALPHA = 0.2          # 패킷 간격 EWMA 가중치
+
+SORT_KEYS = ("sensor_id", "last_seen", "rate_per_min", "battery", "slope_v_per_h", "hours_left", "packets")
+
+# 열 이름 → (배터리 창 폭의 2차원 여부, 초기값)
+_COLUMNS = {
+    "last_seen": (False, np.nan),
+    "first_seen": (False, np.nan),
+    "packets": (False, 0.0),
+    "gap_ewma": (False, np.nan),      # 패킷 간격 EWMA (초)
+    "battery": (False, np.nan),       # 최신 전압
+    "bat_t": (True, np.nan),          # 배터리 샘플 시각 링
+    "bat_v": (True, np.nan),          # 배터리 샘플 전압 링
+    "bat_head": (False, 0.0),
+    "bat_last": (False, -np.inf),     # 마지막 샘플 시각
+}
+
+
+class SensorHealthTable:
+    def __init__(self, capacity: int = 64):
+        self._lock = threading.Lock()
+        self.index: Dict[str, int] = {}
+        self.ids: List[str] = []
+        self._alloc(capacity)
+
+    def _alloc(self, capacity: int) -> None:
+        for name, (wide, fill) in _COLUMNS.items():
+            new = np.full((capacity, BATTERY_WINDOW) if wide else capacity, fill, dtype=np.float64)
+            old = getattr(self, name, None)
+            if old is not None:
+                new[:len(old)] = old
+            setattr(self, name, new)
+        self.capacity = capacity
+
+    # ── 갱신 ─────────────────────────────────────
+    def update(self, sensor_id: str, battery: Optional[float], now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        with self._lock:
+            i = self.index.get(sensor_id)
+            if i is None:
+                i = len(self.ids)
+                if i >= self.capacity:
+                    self._alloc(self.capacity * 2)
+                self.index[sensor_id] = i
+                self.ids.append(sensor_id)
+                self.first_seen[i] = now
+            else:
+                gap = max(now - self.last_seen[i], 1e-3)
+                prev = self.gap_ewma[i]
+                self.gap_ewma[i] = gap if prev != prev else RATE_ALPHA * gap + (1 - RATE_ALPHA) * prev
+            self.last_seen[i] = now
+            self.packets[i] += 1
+            if battery is not None:
+                self.battery[i] = battery
+                if now - self.bat_last[i] >= BATTERY_SAMPLE_SEC:
+                    h = int(self.bat_head[i])
+                    self.bat_t[i, h] = now
+                    self.bat_v[i, h] = battery
+                    self.bat_head[i] = (h + 1) % BATTERY_WINDOW
+                    self.bat_last[i] = now
+
+    # ── 조회 ─────────────────────────────────────
+    def compute(self, now: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """전 센서 지표를 열 단위로 계산 (배터리 추세는 행 단위 벡터화 최소제곱)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            n = len(self.ids)
+            ids = np.array(self.ids, dtype=object)
+            last_seen = self.last_seen[:n].copy()
+            packets = self.packets[:n].copy()
+            gap = self.gap_ewma[:n].copy()
+            battery = self.battery[:n].copy()
+            t = self.bat_t[:n].copy()
+            v = self.bat_v[:n].copy()
+
+        mask = ~np.isnan(v)
+        cnt = mask.sum(axis=1)
+        # 시간 원점을 현재로 옮겨 정밀도 유지 (시간 단위)
+        th = np.where(mask, (t - now) / 3600.0, 0.0)
+        vv = np.where(mask, v, 0.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mt = th.sum(axis=1) / cnt
+            mv = vv.sum(axis=1) / cnt
+            dt = np.where(mask, th - mt[:, None], 0.0)
+            dv = np.where(mask, vv - mv[:, None], 0.0)
+            slope = (dt * dv).sum(axis=1) / (dt * dt).sum(axis=1)          # V/h
+            slope[cnt < MIN_TREND_SAMPLES] = np.nan
+            # 회귀선 기준 현재 전압 → 방전 전압까지 남은 시간
+            v_now = mv - slope * mt
+            hours_left = np.where(slope < 0, (BATTERY_EMPTY_V - v_now) / slope, np.inf)
+            hours_left = np.where(np.isnan(slope), np.nan, np.maximum(hours_left, 0.0))
+            rate = 60.0 / gap
+
+        return {"sensor_id": ids, "last_seen": last_seen, "age_sec": now - last_seen,
+                "packets": packets, "rate_per_min": rate, "battery": battery,
+                "samples": cnt.astype(np.float64), "slope_v_per_h": slope, "hours_left": hours_left}
+
+    def query(self, sort: str = "hours_left", desc: bool = False, stale_after: Optional[float] = None,
+              only: Optional[str] = None, max_hours_left: Optional[float] = None,
+              max_battery: Optional[float] = None, low_battery: float = 3.5,
+              limit: int = 500, now: Optional[float] = None) -> Dict:
+        now = time.time() if now is None else now
+        cols = self.compute(now)
+        n = len(cols["sensor_id"])
+        stale = cols["age_sec"] > stale_after if stale_after is not None else np.zeros(n, dtype=bool)
+        low = cols["battery"] < low_battery
+        keep = np.ones(n, dtype=bool)
+        if only == "stale":
+            keep &= stale
+        elif only == "alive":
+            keep &= ~stale
+        elif only == "low_battery":
+            keep &= low
+        if max_hours_left is not None:
+            keep &= cols["hours_left"] <= max_hours_left
+        if max_battery is not None:
+            keep &= cols["battery"] <= max_battery
+
+        idx = np.flatnonzero(keep)
+        key = cols[sort][idx]
+        if sort == "sensor_id":
+            order = sorted(range(len(idx)), key=lambda j: key[j], reverse=desc)
+        else:
+            # NaN(추정 불가)은 정렬 방향과 무관하게 항상 뒤로
+            k = key.astype(np.float64)
+            k = np.where(np.isnan(k), -np.inf if desc else np.inf, k)
+            order = np.argsort(-k if desc else k, kind="stable")
+        idx = idx[np.asarray(order, dtype=np.intp)][:limit]
+
+        def num(x, nd=3):
+            x = float(x)
+            return None if x != x else (None if x == np.inf else round(x, nd))
+
+        items = [{
+            "sensor_id": cols["sensor_id"][i],
+            "last_seen": datetime.fromtimestamp(cols["last_seen"][i], timezone.utc).isoformat(),
+            "age_sec": num(cols["age_sec"][i], 1),
+            "stale": bool(stale[i]),
+            "packets": int(cols["packets"][i]),
+            "rate_per_min": num(cols["rate_per_min"][i]),
+            "battery": num(cols["battery"][i]),
+            "low_battery": bool(low[i]),
+            "battery_samples": int(cols["samples"][i]),
+            "slope_v_per_h": num(cols["slope_v_per_h"][i], 5),
+            "hours_left": num(cols["hours_left"][i], 2),
+        } for i in idx]
+        return {"total": n, "matched": int(keep.sum()), "stale": int(stale.sum()),
+                "low_battery": int(low.sum()), "items": items}
+
+
+HEALTH = SensorHealthTable()
@@ -0,0 +1,141 @@
+# server/services/sortie_planner.py
+"""
+Sortie Planner
+--------------
+큐에 쌓인 인접 웨이포인트를 묶어 한 번의 출격(sortie)으로 비행하는 다중 레그 미션 계획.
+ - 후보: 선두 웨이포인트 반경 SORTIE_RADIUS_M 이내의 대기 웨이포인트
+ - 제약: 드론 항속 시간(배터리 잔량 반영) - 예비율, 최대 레그 수
+ - 순서: 최근접 이웃(nearest-neighbour) + 2-opt (드론 현재 위치 출발 → 기지 복귀 경로)
+ - 거리: 하버사인 거리, 좌표쌍 단위 캐시 → 디스패치마다 수십 개 대상에 대해 ms 단위로 완료
+"""
+
+from __future__ import annotations
+import math, os
+from functools import lru_cache
+from itertools import islice
+from typing import Dict, List, Optional, Sequence, Tuple
+from server.services.drone_tracker import DRONE_STATE
+
+# 기지(이착륙 지점) 좌표
+HOME = (float(os.getenv("DROWNI_HOME_LAT", "37.2771")),
+        float(os.getenv("DROWNI_HOME_LON", "127.7352")))
+
+DRONE_ENDURANCE_SEC = float(os.getenv("DRONE_ENDURANCE_SEC", "1200"))  # 만충 기준 비행 가능 시간
+SORTIE_RESERVE = 0.25          # 항속 시간 중 남겨둘 예비율
+SORTIE_RADIUS_M = 500.0        # 선두 목표와 함께 묶을 수 있는 최대 거리
+SORTIE_MAX_LEGS = 8            # 한 출격당 최대 목표 수
+SORTIE_SCAN = 64               # 후보 탐색 범위 (큐 앞쪽 N개, FIFO 공정성 + 계산량 상한)
+BATTERY_FULL_V = 4.2
+BATTERY_EMPTY_V = 3.5
+TWO_OPT_MAX_PASSES = 8
+
+EARTH_RADIUS_M = 6_371_000.0
+
+@lru_cache(maxsize=65536)
+def _pair_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+def distance_m(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    """두 (lat, lon) 사이의 거리(m). 순서와 무관하게 같은 캐시 항목을 사용."""
+    if a > b:
+        a, b = b, a
+    return _pair_distance(a[0], a[1], b[0], b[1])
+
+def distance_matrix(points: Sequence[Tuple[float, float]]) -> List[List[float]]:
+    n = len(points)
+    dist = [[0.0] * n for _ in range(n)]
+    for i in range(n):
+        for j in range(i + 1, n):
+            dist[i][j] = dist[j][i] = distance_m(points[i], points[j])
+    return dist
+
+def tour_length(dist: List[List[float]], tour: Sequence[int]) -> float:
+    return sum(dist[tour[i]][tour[i + 1]] for i in range(len(tour) - 1))
+
+def nearest_neighbour(dist: List[List[float]], nodes: Sequence[int],
+                      start: int = 0, end: int = 0) -> List[int]:
+    """start 에서 출발해 가장 가까운 미방문 노드를 차례로 방문하고 end 로 끝나는 경로."""
+    tour, left, cur = [start], set(nodes) - {start, end}, start
+    while left:
+        cur = min(left, key=dist[cur].__getitem__)
+        tour.append(cur); left.remove(cur)
+    tour.append(end)
+    return tour
+
+def two_opt(dist: List[List[float]], tour: List[int]) -> List[int]:
+    """양 끝(출발점/기지)을 고정한 채 교차 구간을 뒤집어 경로를 개선."""
+    tour = tour[:]
+    n = len(tour)
+    for _ in range(TWO_OPT_MAX_PASSES):
+        improved = False
+        for i in range(1, n - 2):
+            a, b = tour[i - 1], tour[i]
+            for k in range(i + 1, n - 1):
+                c, e = tour[k], tour[k + 1]
+                if dist[a][c] + dist[b][e] < dist[a][b] + dist[c][e] - 1e-6:
+                    tour[i:k + 1] = reversed(tour[i:k + 1])
+                    b = tour[i]
+                    improved = True
+        if not improved:
+            break
+    return tour
+
+def endurance_for(battery_v: Optional[float]) -> float:
+    """배터리 전압으로 남은 비행 가능 시간(초)을 선형 추정. 값이 없으면 만충으로 간주."""
+    if battery_v is None:
+        return DRONE_ENDURANCE_SEC
+    frac = (battery_v - BATTERY_EMPTY_V) / (BATTERY_FULL_V - BATTERY_EMPTY_V)
+    return DRONE_ENDURANCE_SEC * min(max(frac, 0.0), 1.0)
+
+def plan_sortie(head: Dict, pending: Sequence[Dict],
+                origin: Tuple[float, float] = HOME,
+                endurance_sec: float = DRONE_ENDURANCE_SEC) -> Dict:
+    """
+    head 웨이포인트를 반드시 포함하고, pending 중 인접한 웨이포인트를
+    비행 시간 예산 안에서 최대한 묶어 방문 순서를 정한다.
+
+    return: {"legs": [wp, ...] (방문 순), "distance_m": float, "duration_sec": float}
+    """
+    speed = max(float(head.get("speed_mps") or 5.0), 0.1)
+    budget = endurance_sec * (1.0 - SORTIE_RESERVE)
+
+    head_pos = (head["lat"], head["lon"])
+    scan = list(islice(pending, SORTIE_SCAN))
+    near = sorted((distance_m(head_pos, (wp["lat"], wp["lon"])), i) for i, wp in enumerate(scan))
+    cands = [scan[i] for d, i in near if d <= SORTIE_RADIUS_M][:SORTIE_MAX_LEGS - 1]
+
+    # 노드 0 = 출발점(드론 현재 위치), 1 = 기지(복귀), 2 = head, 3.. = 후보
+    wps = [head] + cands
+    dist = distance_matrix([origin, HOME] + [(wp["lat"], wp["lon"]) for wp in wps])
+    loiter = [0.0, 0.0] + [float(wp.get("loiter_sec") or 0.0) for wp in wps]
+
+    # 가까운 후보부터 최소 삽입 비용으로 경로에 넣어 보고, 예산을 넘으면 제외
+    tour = [0, 2, 1]
+    length, hover = tour_length(dist, tour), loiter[2]
+    for c in range(3, len(wps) + 2):
+        cost, pos = min((dist[tour[k]][c] + dist[c][tour[k + 1]] - dist[tour[k]][tour[k + 1]], k + 1)
+                        for k in range(len(tour) - 1))
+        if (length + cost) / speed + hover + loiter[c] <= budget:
+            tour.insert(pos, c)
+            length += cost; hover += loiter[c]
+
+    best = two_opt(dist, nearest_neighbour(dist, tour, start=0, end=1))
+    if tour_length(dist, best) > length:
+        best = two_opt(dist, tour)
+    length = tour_length(dist, best)
+
+    return {
+        "legs": [wps[i - 2] for i in best[1:-1]],
+        "distance_m": round(length, 1),
+        "duration_sec": round(length / speed + hover, 1),
+    }
+
+def current_origin(drone_id: Optional[str]) -> Tuple[Tuple[float, float], float]:
+    """드론의 최근 보고 위치/배터리로 출발점과 항속 시간을 정한다. 보고가 없으면 기지 기준."""
+    st = DRONE_STATE.get(drone_id) if drone_id else None
+    if not st:
+        return HOME, DRONE_ENDURANCE_SEC
+    return (st["lat"], st["lon"]), endurance_for(st.get("battery"))
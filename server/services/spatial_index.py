@@ -0,0 +1,217 @@
+# server/services/spatial_index.py
+"""
+Spatial Index
+-------------
+최근 수락된 이벤트 / 등록된 센서 / 드론 현재 위치를 메모리 격자(grid) 인덱스로 관리.
+ - 레이어: "event", "sensor", "drone" — 레이어별로 id → 점, 셀 → id 집합
+ - 셀 크기 GRID_CELL_DEG(기본 0.005° ≈ 550m) → 지도 뷰포트/출동 반경 질의는 주변 몇 개 셀만 조사
+ - upsert 는 O(1) (셀이 바뀐 경우에만 이동), 이벤트 레이어는 최근 SPATIAL_EVENT_CAPACITY 개만 보관
+ - 질의: bbox, radius(m), k-최근접(셀 고리를 넓혀 가며 탐색, k 번째 거리보다 먼 고리는 중단)
+"""
+
+from __future__ import annotations
+import json, math, os, threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+GRID_CELL_DEG = float(os.getenv("SPATIAL_CELL_DEG", "0.005"))
+SPATIAL_EVENT_CAPACITY = int(os.getenv("SPATIAL_EVENT_CAPACITY", "50000"))
+LAYERS = ("event", "sensor", "drone")
+
+_EARTH_R = 6_371_000.0
+_M_PER_DEG_LAT = 110_540.0
+
+Cell = Tuple[int, int]
+
+
+def _cell(lat: float, lon: float) -> Cell:
+    return (math.floor(lat / GRID_CELL_DEG), math.floor(lon / GRID_CELL_DEG))
+
+def _cells(r0: int, c0: int, r1: int, c1: int) -> Iterable[Cell]:
+    return ((r, c) for r in range(r0, r1 + 1) for c in range(c0, c1 + 1))
+
+def _coord(v: Any) -> float:
+    """좌표 값 → float. 숫자가 아니거나 유한하지 않으면 ValueError."""
+    f = float(v)
+    if not math.isfinite(f):
+        raise ValueError(f"non-finite coordinate: {v!r}")
+    return f
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * _EARTH_R * math.asin(math.sqrt(a))
+
+
+class _Layer:
+    def __init__(self, capacity: Optional[int] = None):
+        self.points: "OrderedDict[str, Tuple[float, float, Cell, Dict[str, Any]]]" = OrderedDict()
+        self.cells: Dict[Cell, Set[str]] = {}
+        self.capacity = capacity
+
+    def upsert(self, key: str, lat: float, lon: float, data: Dict[str, Any]) -> None:
+        c = _cell(lat, lon)
+        old = self.points.pop(key, None)
+        if old is not None and old[2] != c:
+            self._unlink(key, old[2])
+        self.points[key] = (lat, lon, c, data)     # 삽입 순서 = 최근 갱신 순
+        self.cells.setdefault(c, set()).add(key)
+        if self.capacity is not None:
+            while len(self.points) > self.capacity:
+                k, (_, _, oc, _) = self.points.popitem(last=False)
+                self._unlink(k, oc)
+
+    def remove(self, key: str) -> bool:
+        old = self.points.pop(key, None)
+        if old is None:
+            return False
+        self._unlink(key, old[2])
+        return True
+
+    def _unlink(self, key: str, c: Cell) -> None:
+        ids = self.cells.get(c)
+        if ids is not None:
+            ids.discard(key)
+            if not ids:
+                del self.cells[c]
+
+    def in_cells(self, cells: Iterable[Cell]) -> Iterable[Tuple[str, Tuple[float, float, Cell, Dict[str, Any]]]]:
+        for c in cells:
+            for key in self.cells.get(c, ()):
+                yield key, self.points[key]
+
+
+class SpatialIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.layers: Dict[str, _Layer] = {
+            "event": _Layer(SPATIAL_EVENT_CAPACITY),
+            "sensor": _Layer(),
+            "drone": _Layer(),
+        }
+
+    # ── 갱신 ─────────────────────────────────────
+    def upsert(self, layer: str, key: str, lat: float, lon: float, **data: Any) -> None:
+        """좌표가 숫자가 아니면 ValueError/TypeError (인덱스는 변경하지 않음)."""
+        lat, lon = _coord(lat), _coord(lon)
+        with self._lock:
+            self.layers[layer].upsert(str(key), lat, lon, data)
+
+    def remove(self, layer: str, key: str) -> bool:
+        with self._lock:
+            return self.layers[layer].remove(str(key))
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {name: {"points": len(l.points), "cells": len(l.cells)} for name, l in self.layers.items()}
+
+    # ── 질의 ─────────────────────────────────────
+    @staticmethod
+    def _row(layer: str, key: str, p, dist: Optional[float] = None) -> Dict[str, Any]:
+        row = {"layer": layer, "id": key, "lat": p[0], "lon": p[1], **p[3]}
+        if dist is not None:
+            row["distance_m"] = round(dist, 1)
+        return row
+
+    def _layers(self, layers: Optional[Iterable[str]]) -> List[str]:
+        return [l for l in (layers or LAYERS) if l in self.layers]
+
+    def bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+             layers: Optional[Iterable[str]] = None, limit: int = 1000) -> List[Dict[str, Any]]:
+        (r0, c0), (r1, c1) = _cell(min_lat, min_lon), _cell(max_lat, max_lon)
+        n_cells = max(r1 - r0 + 1, 0) * max(c1 - c0 + 1, 0)     # 셀 목록을 만들기 전에 개수만 계산
+        out: List[Dict[str, Any]] = []
+        with self._lock:
+            for name in self._layers(layers):
+                layer = self.layers[name]
+                # 뷰포트 셀 수가 점유 셀 수보다 많으면 전체 순회가 더 싸다 (전 세계 bbox 도 메모리 부담 없음)
+                src = layer.points.items() if n_cells > len(layer.cells) else layer.in_cells(_cells(r0, c0, r1, c1))
+                for key, p in src:
+                    if min_lat <= p[0] <= max_lat and min_lon <= p[1] <= max_lon:
+                        out.append(self._row(name, key, p))
+                        if len(out) >= limit:
+                            return out
+        return out
+
+    def radius(self, lat: float, lon: float, radius_m: float,
+               layers: Optional[Iterable[str]] = None, limit: int = 1000) -> List[Dict[str, Any]]:
+        dlat = radius_m / _M_PER_DEG_LAT
+        dlon = min(dlat / max(math.cos(math.radians(lat)), 1e-6), 180.0)   # 극 근처에서도 경도 폭 360° 이내
+        (r0, c0), (r1, c1) = _cell(lat - dlat, lon - dlon), _cell(lat + dlat, lon + dlon)
+        n_cells = (r1 - r0 + 1) * (c1 - c0 + 1)
+        hits: List[Tuple[float, Dict[str, Any]]] = []
+        with self._lock:
+            for name in self._layers(layers):
+                layer = self.layers[name]
+                src = layer.points.items() if n_cells > len(layer.cells) else layer.in_cells(_cells(r0, c0, r1, c1))
+                for key, p in src:
+                    d = haversine_m(lat, lon, p[0], p[1])
+                    if d <= radius_m:
+                        hits.append((d, self._row(name, key, p, d)))
+        hits.sort(key=lambda h: h[0])
+        return [row for _, row in hits[:limit]]
+
+    def nearest(self, lat: float, lon: float, k: int = 5,
+                layers: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """
+        k-최근접. 중심 셀에서 고리(ring) 단위로 넓혀 가며 후보를 모으고,
+        다음 고리까지의 최소 거리가 현재 k 번째 거리보다 크면 중단.
+        """
+        r0, c0 = _cell(lat, lon)
+        cell_m = GRID_CELL_DEG * _M_PER_DEG_LAT * max(math.cos(math.radians(lat)), 1e-6)
+        found: List[Tuple[float, str, str, Any]] = []
+        with self._lock:
+            names = self._layers(layers)
+            n_cells = sum(len(self.layers[name].cells) for name in names)
+            ring = -1
+            while True:
+                ring += 1
+                if 8 * ring > n_cells:
+                    # 고리가 점유 셀 수보다 커지면 남은 점유 셀을 직접 훑는 편이 싸다 (먼 외톨이 점 대비)
+                    for name in names:
+                        layer = self.layers[name]
+                        cells = [c for c in layer.cells if max(abs(c[0] - r0), abs(c[1] - c0)) >= ring]
+                        for key, p in layer.in_cells(cells):
+                            d = haversine_m(lat, lon, p[0], p[1])
+                            found.append((d, name, key, p))
+                    break
+                if ring == 0:
+                    cells = [(r0, c0)]
+                else:
+                    cells = [(r0 + dr, c0 + dc) for dr in range(-ring, ring + 1)
+                             for dc in (-ring, ring)]
+                    cells += [(r0 + dr, c0 + dc) for dr in (-ring, ring)
+                              for dc in range(-ring + 1, ring)]
+                for name in names:
+                    for key, p in self.layers[name].in_cells(cells):
+                        d = haversine_m(lat, lon, p[0], p[1])
+                        found.append((d, name, key, p))
+                if len(found) >= k:
+                    found.sort(key=lambda h: h[0])
+                    del found[k:]
+                    # 고리 ring+1 의 점은 중심에서 최소 ring * 셀 크기 이상 떨어져 있음
+                    if found[-1][0] <= ring * cell_m:
+                        break
+        found.sort(key=lambda h: h[0])
+        return [self._row(name, key, p, d) for d, name, key, p in found[:k]]
+
+
+INDEX = SpatialIndex()
+
+def seed_sensors(positions: Dict[str, Tuple[float, float]]) -> None:
+    for sid, (lat, lon) in positions.items():
+        INDEX.upsert("sensor", sid, lat, lon)
+
+def warm_start(rows: Iterable[Tuple[Any, str, Any, float, Optional[str]]]) -> int:
+    """DB 의 최근 accepted 이벤트 (id, sensor_id, ts, prob_help, meta JSON) 로 이벤트 레이어 채우기 (오래된 순)."""
+    n = 0
+    for ev_id, sensor_id, ts, prob, meta in rows:
+        try:
+            m = json.loads(meta) if meta else {}
+            INDEX.upsert("event", ev_id, m["lat"], m["lon"], sensor_id=sensor_id,
+                         ts=ts.isoformat() if ts else None, prob_help=prob)
+        except (ValueError, KeyError, TypeError):
+            continue
+        n += 1
+    return n
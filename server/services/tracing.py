@@ -0,0 +1,143 @@
+# server/services/tracing.py
+"""
+End-to-end Latency Tracing
+--------------------------
+센서가 소리를 들은 시각부터 관제 화면에 전달될 때까지 어느 구간에서 시간이 쓰이는지 측정.
+ - trace id: 센서가 보낸 값(IngestPayload.trace_id / TDOA 요청 trace_id)을 그대로 쓰거나 적재 시 부여
+ - 샘플링: 센서가 trace id 를 보낸 요청은 항상, 나머지는 TRACE_SAMPLE_RATE 확률로만 추적
+   (미추적 요청은 난수 1회 + None 비교만 하므로 오버헤드가 거의 없다)
+ - 구간 표시(mark): 각 단계 완료 시각(wall clock)을 기록, 단계 지연 = 직전 표시와의 차
+   ingest : sensor(센서 ts) → received → validated → db_commit → broadcast_enqueue → sse_write
+   tdoa   : received → tdoa_solved → waypoint_enqueued → mission_dispatched
+ - 완료된 추적은 종류·단계별 최근 TRACE_WINDOW 건 창에 모아 /admin/traces 에서 백분위수로 조회
+ - 비동기 단계(미션 디스패치 등)까지 이어지는 추적은 link()/take() 로 키(웨이포인트 id)에 잠시 보관
+ - sensor 구간은 센서와 서버 시계 차이를 그대로 포함한다 (NTP 동기화 전제)
+"""
+
+from __future__ import annotations
+import os, random, threading, time, uuid
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
+
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.05"))
+TRACE_WINDOW = int(os.getenv("TRACE_WINDOW", "2048"))     # 단계별 백분위수 계산용 최근 표본 수
+TRACE_RECENT = 50                                         # /admin/traces 에 보여줄 최근 추적 수
+TRACE_PENDING_MAX = 1000                                  # 디스패치 대기 중인 추적 상한 (오래된 것부터 폐기)
+PERCENTILES = (0.5, 0.9, 0.99)
+
+
+class Trace:
+    __slots__ = ("trace_id", "kind", "marks", "done")
+
+    def __init__(self, trace_id: str, kind: str):
+        self.trace_id = trace_id
+        self.kind = kind
+        self.marks: List[Tuple[str, float]] = []
+        self.done = False
+
+    def mark(self, stage: str, at: Optional[float] = None) -> None:
+        self.marks.append((stage, time.time() if at is None else at))
+
+    def stages(self) -> List[Tuple[str, float]]:
+        """(단계, 직전 표시 이후 ms) 목록."""
+        m = self.marks
+        return [(m[i][0], (m[i][1] - m[i - 1][1]) * 1000.0) for i in range(1, len(m))]
+
+    def to_dict(self) -> Dict:
+        return {"trace_id": self.trace_id, "kind": self.kind,
+                "start": self.marks[0][1] if self.marks else None,
+                "total_ms": round((self.marks[-1][1] - self.marks[0][1]) * 1000.0, 3) if self.marks else 0.0,
+                "stages": [{"stage": s, "ms": round(ms, 3)} for s, ms in self.stages()]}
+
+
+class Tracer:
+    def __init__(self, sample_rate: float = TRACE_SAMPLE_RATE, window: int = TRACE_WINDOW):
+        self.sample_rate = sample_rate
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples: Dict[Tuple[str, str], deque] = {}      # (kind, stage) → 최근 ms
+        self._recent: deque = deque(maxlen=TRACE_RECENT)
+        self._pending: "OrderedDict[str, Trace]" = OrderedDict()
+        self.started = 0
+        self.finished = 0
+        self.expired = 0
+
+    # ── 시작 / 종료 ─────────────────────────────
+    def begin(self, kind: str, trace_id: Optional[str] = None, origin: Optional[float] = None,
+              received: Optional[float] = None) -> Optional[Trace]:
+        """샘플링 판정 후 Trace 생성 (미추적이면 None). origin: 센서 측 발생 시각(epoch 초)."""
+        if not trace_id and random.random() >= self.sample_rate:
+            return None
+        tr = Trace(trace_id or uuid.uuid4().hex[:16], kind)
+        if origin is not None:
+            tr.mark("sensor", origin)
+        tr.mark("received", received)
+        self.started += 1
+        return tr
+
+    def finish(self, tr: Optional[Trace]) -> None:
+        if tr is None:
+            return
+        with self._lock:
+            if tr.done:
+                return
+            tr.done = True
+            stages = tr.stages()
+            for stage, ms in stages:
+                self._sample(tr.kind, stage, ms)
+            if tr.marks:
+                self._sample(tr.kind, "total", (tr.marks[-1][1] - tr.marks[0][1]) * 1000.0)
+            self._recent.append(tr)
+            self.finished += 1
+
+    def _sample(self, kind: str, stage: str, ms: float) -> None:
+        q = self._samples.get((kind, stage))
+        if q is None:
+            q = self._samples[(kind, stage)] = deque(maxlen=self.window)
+        q.append(ms)
+
+    # ── 비동기 단계 연결 ────────────────────────
+    def link(self, key: str, tr: Optional[Trace]) -> None:
+        """나중 단계(예: 미션 디스패치)에서 이어 표시할 추적을 보관."""
+        if tr is None:
+            return
+        with self._lock:
+            self._pending[key] = tr
+            while len(self._pending) > TRACE_PENDING_MAX:
+                self._pending.popitem(last=False)     # 디스패치되지 않은 오래된 추적은 집계하지 않고 폐기
+                self.expired += 1
+
+    def take(self, key: str) -> Optional[Trace]:
+        if not self._pending:
+            return None
+        with self._lock:
+            return self._pending.pop(key, None)
+
+    # ── 조회 ────────────────────────────────────
+    def snapshot(self, recent: int = 10) -> Dict:
+        with self._lock:
+            samples = {k: list(v) for k, v in self._samples.items()}
+            last = list(self._recent)[-recent:] if recent > 0 else []
+            pending = len(self._pending)
+        kinds: Dict[str, Dict] = {}
+        for (kind, stage), values in samples.items():
+            values.sort()
+            n = len(values)
+            kinds.setdefault(kind, {})[stage] = {
+                "count": n,
+                **{f"p{int(q * 100)}_ms": round(values[min(int(q * n), n - 1)], 3) for q in PERCENTILES},
+                "max_ms": round(values[-1], 3),
+            }
+        return {"sample_rate": self.sample_rate, "window": self.window,
+                "started": self.started, "finished": self.finished,
+                "pending": pending, "expired": self.expired,
+                "kinds": kinds, "recent": [tr.to_dict() for tr in reversed(last)]}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+            self._recent.clear()
+            self.started = self.finished = self.expired = 0
+
+
+TRACER = Tracer()
@@ -0,0 +1,167 @@
+# server/services/track_history.py
+"""
+Drone Track History
+-------------------
+드론별 비행 궤적을 고정 크기 NumPy 링 버퍼에 보관하고, 지도 렌더링용으로 단순화해서 제공.
+ - 열: ts(epoch 초), lat, lon, alt, speed_mps, battery (float64, 값이 없으면 NaN)
+ - 단순화: Ramer-Douglas-Peucker(RDP). 각 점의 중요도(분할 시 최대 편차)를 한 번에 계산해
+   epsilon(m) 기준 또는 목표 점 개수(상위 중요도 N개) 기준으로 선택
+ - 영속화: 수신한 점을 모아 두었다가 주기적으로 drone_tracks 테이블에 일괄 INSERT
+"""
+
+from __future__ import annotations
+import asyncio, math, threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import insert
+
+from server.db.models import SessionLocal, DroneTrack
+
+COLUMNS = ("ts", "lat", "lon", "alt", "speed_mps", "battery")
+TRACK_CAPACITY = 7200          # 드론당 보관 점 수 (1Hz 보고 기준 2시간)
+TRACK_FLUSH_SEC = 5.0          # DB 일괄 저장 주기
+TRACK_FLUSH_MAX = 5000         # 한 번에 저장할 최대 행 수
+
+_M_PER_DEG_LAT = 110_540.0
+_M_PER_DEG_LON = 111_320.0
+
+
+class TrackBuffer:
+    def __init__(self, capacity: int = TRACK_CAPACITY):
+        self.data = np.full((capacity, len(COLUMNS)), np.nan)
+        self.head = 0      # 다음에 쓸 위치
+        self.count = 0
+
+    def append(self, row: Tuple[float, ...]) -> None:
+        self.data[self.head] = row
+        self.head = (self.head + 1) % len(self.data)
+        self.count = min(self.count + 1, len(self.data))
+
+    def view(self, since: Optional[float] = None) -> np.ndarray:
+        """시간순 사본. since(epoch 초) 이후의 점만."""
+        if self.count < len(self.data):
+            arr = self.data[:self.count].copy()
+        else:
+            arr = np.concatenate((self.data[self.head:], self.data[:self.head]))
+        if since is not None:
+            arr = arr[np.searchsorted(arr[:, 0], since, side="left"):]
+        return arr
+
+
+_TRACKS: Dict[str, TrackBuffer] = {}
+_PENDING: List[Dict] = []
+_LOCK = threading.Lock()
+
+
+def _opt(v: Optional[float]) -> float:
+    return np.nan if v is None else float(v)
+
+def record(drone_id: str, ts: datetime, lat: float, lon: float, alt: Optional[float],
+           speed_mps: Optional[float], battery: Optional[float]) -> None:
+    """드론 상태 보고 1건을 궤적 버퍼와 DB 저장 대기열에 추가."""
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    t = ts.timestamp()
+    with _LOCK:
+        buf = _TRACKS.get(drone_id)
+        if buf is None:
+            buf = _TRACKS[drone_id] = TrackBuffer()
+        if buf.count and t < buf.data[(buf.head - 1) % len(buf.data), 0]:
+            return   # 순서가 뒤바뀐 보고는 무시 (시간순 정렬 유지 → since 이진 탐색)
+        buf.append((t, lat, lon, _opt(alt), _opt(speed_mps), _opt(battery)))
+        if len(_PENDING) < TRACK_FLUSH_MAX * 10:
+            _PENDING.append({"drone_id": drone_id, "ts": ts, "lat": lat, "lon": lon,
+                             "alt": alt, "speed_mps": speed_mps, "battery": battery})
+
+def history(drone_id: str, since: Optional[float] = None) -> Optional[np.ndarray]:
+    with _LOCK:
+        buf = _TRACKS.get(drone_id)
+        return buf.view(since) if buf else None
+
+# ───────────────────────────────────────────────
+# RDP 단순화
+# ───────────────────────────────────────────────
+def _project(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """위경도를 첫 점 기준 국소 평면(m)으로 변환."""
+    lat0 = lat[0]
+    x = (lon - lon[0]) * _M_PER_DEG_LON * math.cos(math.radians(lat0))
+    y = (lat - lat0) * _M_PER_DEG_LAT
+    return np.column_stack((x, y))
+
+def rdp_importance(xy: np.ndarray) -> np.ndarray:
+    """
+    RDP 분할 과정에서 각 점이 선택되는 편차(m). 양 끝점은 inf.
+    자식 점의 값은 부모 값 이하로 제한 → 임계값 eps 이상인 점 집합 = RDP(eps) 결과.
+    """
+    n = len(xy)
+    imp = np.zeros(n)
+    if n == 0:
+        return imp
+    imp[0] = imp[-1] = np.inf
+    stack = [(0, n - 1, np.inf)]
+    while stack:
+        i, j, cap = stack.pop()
+        if j - i < 2:
+            continue
+        a, b = xy[i], xy[j]
+        seg = b - a
+        pts = xy[i + 1:j] - a
+        L2 = float(seg @ seg)
+        if L2 == 0.0:
+            d = np.hypot(pts[:, 0], pts[:, 1])
+        else:
+            t = np.clip((pts @ seg) / L2, 0.0, 1.0)
+            d = np.hypot(pts[:, 0] - t * seg[0], pts[:, 1] - t * seg[1])
+        k = int(np.argmax(d))
+        dmax = min(float(d[k]), cap)
+        m = i + 1 + k
+        imp[m] = dmax
+        stack.append((i, m, dmax))
+        stack.append((m, j, dmax))
+    return imp
+
+def simplify(arr: np.ndarray, max_points: Optional[int] = None,
+             epsilon_m: Optional[float] = None) -> np.ndarray:
+    """궤적 행렬을 epsilon(m) 및/또는 최대 점 개수 기준으로 단순화 (시간순 유지)."""
+    n = len(arr)
+    if n <= 2 or (max_points is None and epsilon_m is None):
+        return arr
+    imp = rdp_importance(_project(arr[:, 1], arr[:, 2]))
+    keep = np.ones(n, dtype=bool) if epsilon_m is None else imp >= epsilon_m
+    if max_points is not None and keep.sum() > max_points:
+        idx = np.flatnonzero(keep)
+        top = idx[np.argpartition(-imp[idx], max(max_points, 2) - 1)[:max(max_points, 2)]]
+        keep = np.zeros(n, dtype=bool); keep[top] = True
+    return arr[keep]
+
+def to_rows(arr: np.ndarray) -> List[List[Optional[float]]]:
+    """JSON 응답용: NaN → None"""
+    return [[None if v != v else v for v in row] for row in arr.tolist()]
+
+# ───────────────────────────────────────────────
+# DB 일괄 저장
+# ───────────────────────────────────────────────
+def _flush(rows: List[Dict]) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(insert(DroneTrack), rows)
+        db.commit()
+    finally:
+        db.close()
+
+async def run_track_flusher():
+    while True:
+        await asyncio.sleep(TRACK_FLUSH_SEC)
+        with _LOCK:
+            rows = _PENDING[:TRACK_FLUSH_MAX]
+            del _PENDING[:TRACK_FLUSH_MAX]
+        if not rows:
+            continue
+        try:
+            await asyncio.to_thread(_flush, rows)
+        except Exception as e:
+            print(f"[Track] flush failed ({len(rows)} rows): {e}")
+            with _LOCK:
+                _PENDING[:0] = rows   # 다음 주기에 재시도
@@ -1,12 +1,28 @@
 # server/services/waypoint_builder.py
 from __future__ import annotations
+import asyncio, threading
 from datetime import datetime, timezone
 from collections import deque
-from typing import Deque, Dict, Optional
+from typing import Deque, Dict, List, Optional
 import uuid
 
+from server.services.sortie_planner import plan_sortie, current_origin
+from server.services.mission_journal import JOURNAL, SNAPSHOT_INTERVAL_SEC, DURABLE_WAIT_TIMEOUT
+
 _MISSION_QUEUE: Deque[Dict] = deque(maxlen=1000)
 
+# 큐/진행 중 미션 변경과 저널 기록을 한 단위로 묶는 잠금
+# (스레드풀의 enqueue 와 이벤트 루프의 dispatch 가 동시에 큐를 수정하므로 필요)
+_LOCK = threading.RLock()
+
+# 디스패치 후 ack/timeout 전까지의 진행 중 미션 (mission_id → waypoint)
+_INFLIGHT: Dict[str, Dict] = {}
+
+# 큐/미션 상태 변화를 기다리는 코루틴들 (long-poll, 미션 채널)
+# enqueue 는 스레드풀(sync 엔드포인트)에서도 호출되므로 이벤트 루프로 안전하게 넘겨서 깨운다.
+_WAITERS: List[asyncio.Future] = []
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
 def build_waypoint(lat: float, lon: float, altitude: float = 50.0,
                    speed_mps: float = 5.0, loiter_sec: float = 0.0) -> Dict:
     return {
@@ -18,12 +34,168 @@ def build_waypoint(lat: float, lon: float, altitude: float = 50.0,
         "created_at": datetime.now(timezone.utc).isoformat(),
     }
 
-def enqueue_waypoint(wp: Dict) -> None:
-    _MISSION_QUEUE.append(wp)
+def _wake_waiters() -> None:
+    """이벤트 루프 스레드에서 실행: 대기 중인 모든 코루틴을 깨운다."""
+    waiters = _WAITERS[:]
+    _WAITERS.clear()
+    for fut in waiters:
+        if not fut.done():
+            fut.set_result(None)
+
+def _notify() -> None:
+    if _LOOP is None:
+        return
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is _LOOP:
+        _wake_waiters()
+    elif not _LOOP.is_closed():
+        # 다른 스레드: 루프에서 큐 확인과 대기 등록이 원자적으로 일어나므로 항상 예약해야 깨움을 놓치지 않는다
+        _LOOP.call_soon_threadsafe(_wake_waiters)
+
+async def wait_for_change(timeout: float) -> bool:
+    """
+    큐에 미션이 들어오거나 진행 중 미션이 끝날 때까지 최대 timeout 초 대기.
+    변화가 있으면 True, 타임아웃이면 False.
+    """
+    global _LOOP
+    loop = asyncio.get_running_loop()
+    _LOOP = loop
+    fut = loop.create_future()
+    _WAITERS.append(fut)
+    try:
+        await asyncio.wait_for(fut, timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        if fut in _WAITERS:
+            _WAITERS.remove(fut)
+
+def _journal(op: str, mission_id: Optional[str], body=None) -> int:
+    return JOURNAL.append(op, mission_id, body) if JOURNAL else 0
+
+def _in_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+def enqueue_waypoint(wp: Dict) -> bool:
+    """큐에 추가. 반환값: 저널 커밋 확인 여부 (시간 초과 시 False — 큐에는 이미 들어가 있다)."""
+    with _LOCK:
+        _MISSION_QUEUE.append(wp)
+        seq = _journal("enqueue", wp["id"], wp)
+    # 스레드풀에서 호출된 경우 그룹 커밋(fsync)이 끝날 때까지 대기 → 응답 시점에 유실 없음
+    durable = True
+    if JOURNAL and not _in_event_loop():
+        durable = JOURNAL.wait_durable(seq)
+        if not durable:
+            print(f"[Missions] journal commit not confirmed within {DURABLE_WAIT_TIMEOUT}s: {wp['id']} (seq={seq})")
+    _notify()
+    return durable
 
-def get_next_waypoint() -> Optional[Dict]:
-    if not _MISSION_QUEUE: return None
-    wp = _MISSION_QUEUE.popleft(); wp["status"] = "dispatched"; return wp
+def requeue_waypoint(wp: Dict) -> None:
+    """전달에 실패한 미션을 큐 맨 앞으로 되돌린다. 출격에 묶였던 레그도 개별 웨이포인트로 복원."""
+    with _LOCK:
+        _INFLIGHT.pop(wp["id"], None)
+        restored = [dict(leg, status="queued", created_at=wp["created_at"])
+                    for leg in wp.pop("legs", []) if leg["id"] != wp["id"]]
+        for k in ("drone_id", "distance_m", "duration_sec", "dispatched_at"):
+            wp.pop(k, None)
+        wp["status"] = "queued"
+        front = [wp] + restored
+        _MISSION_QUEUE.extendleft(reversed(front))
+        _journal("requeue", wp["id"], front)
+    _notify()
+
+def _leg(wp: Dict) -> Dict:
+    return {k: wp[k] for k in ("id", "lat", "lon", "alt", "speed_mps", "loiter_sec")}
+
+def get_next_waypoint(drone_id: Optional[str] = None) -> Optional[Dict]:
+    """
+    선두 웨이포인트를 꺼내고, 인접한 대기 웨이포인트를 묶어 다중 레그 출격으로 디스패치.
+    반환 미션의 id/lat/lon 은 선두 웨이포인트 그대로이며,
+    최적화된 전체 방문 순서는 "legs" 에 담긴다 (단일 목표면 레그 1개).
+    """
+    with _LOCK:
+        if not _MISSION_QUEUE: return None
+        wp = _MISSION_QUEUE.popleft()
+        origin, endurance = current_origin(drone_id)
+        sortie = plan_sortie(wp, _MISSION_QUEUE, origin, endurance)
+        merged = {leg["id"] for leg in sortie["legs"]} - {wp["id"]}
+        if merged:
+            for other in _MISSION_QUEUE:
+                if other["id"] in merged:
+                    other["status"] = "dispatched"; other["sortie_id"] = wp["id"]
+            kept = [other for other in _MISSION_QUEUE if other["id"] not in merged]
+            _MISSION_QUEUE.clear(); _MISSION_QUEUE.extend(kept)
+
+        wp.update(status="dispatched",
+                  legs=[_leg(leg) for leg in sortie["legs"]],
+                  distance_m=sortie["distance_m"], duration_sec=sortie["duration_sec"],
+                  dispatched_at=datetime.now(timezone.utc).isoformat())
+        if drone_id:
+            wp["drone_id"] = drone_id
+        _INFLIGHT[wp["id"]] = wp
+        _journal("dispatch", wp["id"], wp)
+    return wp
+
+async def wait_next_waypoint(timeout: float, drone_id: Optional[str] = None) -> Optional[Dict]:
+    """
+    long-poll 디스패치: 큐가 비어 있으면 미션이 들어올 때까지(최대 timeout 초) 대기.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        wp = get_next_waypoint(drone_id)
+        if wp:
+            return wp
+        remaining = deadline - loop.time()
+        if remaining <= 0 or not await wait_for_change(remaining):
+            return None
+
+def complete_waypoint(mission_id: Optional[str]) -> Optional[Dict]:
+    """ack/timeout 으로 끝난 미션을 진행 중 목록에서 제거."""
+    with _LOCK:
+        wp = _INFLIGHT.pop(mission_id, None) if mission_id else None
+        if wp:
+            _journal("complete", mission_id)
+    _notify()
+    return wp
+
+def is_inflight(mission_id: str) -> bool:
+    return mission_id in _INFLIGHT
 
 def peek_queue_size() -> int:
     return len(_MISSION_QUEUE)
+
+def inflight_missions() -> List[Dict]:
+    with _LOCK:
+        return list(_INFLIGHT.values())
+
+def restore_missions() -> int:
+    """
+    서버 시작 시 저널로부터 대기 큐와 진행 중 미션을 복원.
+    return: 복원된 미션 수 (대기 + 진행 중)
+    """
+    if not JOURNAL:
+        return 0
+    queue, inflight = JOURNAL.load()
+    with _LOCK:
+        _MISSION_QUEUE.clear(); _MISSION_QUEUE.extend(queue)
+        _INFLIGHT.clear(); _INFLIGHT.update(inflight)
+        # 복원 직후 스냅샷을 남겨 다음 재시작 시 재생할 저널을 최소화
+        JOURNAL.snapshot(list(_MISSION_QUEUE), dict(_INFLIGHT))
+    return len(queue) + len(inflight)
+
+async def run_journal_compactor():
+    # 주기적으로 저널 길이를 확인하여 스냅샷 → 복구 시간 상한 유지
+    while True:
+        await asyncio.sleep(SNAPSHOT_INTERVAL_SEC)
+        if JOURNAL and JOURNAL.needs_snapshot():
+            with _LOCK:
+                JOURNAL.snapshot(list(_MISSION_QUEUE), dict(_INFLIGHT))
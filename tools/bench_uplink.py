@@ -0,0 +1,83 @@
+# tools/bench_uplink.py
+"""
+JSON vs 바이너리 업링크 비교 벤치마크
+ - 페이로드 크기 (바이트)
+ - 디코딩만 / 디코딩 + 검증(parse_uplink) 처리량
+사용: python -m tools.bench_uplink [--n 20000] [--bands 16]
+"""
+
+import argparse, json, random, time
+from datetime import datetime, timezone
+
+from server.services import uplink_codec
+from server.services.ingest_pipeline import parse_uplink
+
+
+def make_events(n: int, bands: int):
+    now_ms = int(time.time() * 1000)
+    return [{
+        "sensor_id": f"sensor-{i % 500:03d}",
+        "prob_help": round(random.uniform(0.5, 0.99), 3),
+        "ts_ms": now_ms + i,
+        "battery": round(random.uniform(3.4, 4.2), 2),
+        "lat": 37.27 + random.random() * 0.01,
+        "lon": 127.73 + random.random() * 0.01,
+        "features": [random.random() for _ in range(bands + 1)],
+    } for i in range(n)]
+
+
+def to_json(e) -> bytes:
+    names = uplink_codec.feature_names(len(e["features"]))
+    return json.dumps({
+        "sensor_id": e["sensor_id"],
+        "prob_help": e["prob_help"],
+        "ts": datetime.fromtimestamp(e["ts_ms"] / 1000, timezone.utc).isoformat(),
+        "battery": e["battery"],
+        "features": dict(zip(names, e["features"])),
+        "meta": {"lat": e["lat"], "lon": e["lon"]},
+    }).encode()
+
+
+def to_binary(e) -> bytes:
+    return uplink_codec.encode(e["sensor_id"], e["prob_help"], e["ts_ms"], e["battery"],
+                               e["lat"], e["lon"], e["features"])
+
+
+def bench(label: str, msgs, fn) -> float:
+    t0 = time.perf_counter()
+    for m in msgs:
+        fn(m)
+    dt = time.perf_counter() - t0
+    print(f"  {label:<28} {len(msgs) / dt:>10,.0f} msg/s  ({dt / len(msgs) * 1e6:6.2f} µs/msg)")
+    return dt
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=20000)
+    ap.add_argument("--bands", type=int, default=16, help="mel 밴드 수 (특성 = rms + bands)")
+    args = ap.parse_args()
+
+    events = make_events(args.n, args.bands)
+    js = [to_json(e) for e in events]
+    bn = [to_binary(e) for e in events]
+    batch = b"".join(bn)
+
+    print(f"[bench_uplink] n={args.n} bands={args.bands}")
+    print(f"  size  json   {sum(map(len, js)) / args.n:7.1f} B/msg")
+    print(f"  size  binary {sum(map(len, bn)) / args.n:7.1f} B/msg")
+    print("decode only")
+    bench("json.loads", js, json.loads)
+    bench("uplink_codec.decode", bn, uplink_codec.decode)
+    print("decode + validate (parse_uplink)")
+    t_json = bench("json", js, lambda m: parse_uplink(m, binary=False))
+    t_bin = bench("binary", bn, lambda m: parse_uplink(m, binary=True))
+    t0 = time.perf_counter()
+    parse_uplink(batch, binary=True)
+    t_batch = time.perf_counter() - t0
+    print(f"  {'binary (one concatenated body)':<28} {args.n / t_batch:>10,.0f} msg/s")
+    print(f"speedup binary vs json: {t_json / t_bin:.1f}x per message, {t_json / t_batch:.1f}x batched")
+
+
+if __name__ == "__main__":
+    main()
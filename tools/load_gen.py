@@ -0,0 +1,352 @@
+# tools/load_gen.py
+"""
+다중 센서 비동기 부하 생성기 (ingest 용량 산정용)
+
+N 개 센서가 설정한 속도/버스트 프로파일로 업링크를 보내는 상황을 로컬 서버에 재현합니다.
+  - 모드: http (/ingest/audio 1건씩), batch (/ingest/audio/batch), mqtt (drowni/audio 또는 샤드 토픽, QoS 0/1)
+  - 바디: JSON 또는 --binary (application/x-drowni-uplink)
+  - 프로파일: steady (일정), burst (주기적으로 --burst-mult 배), ramp (0 → 목표 속도로 선형 증가)
+  - 개방 루프(open-loop) 스케줄링: 응답을 기다리지 않고 예정 시각에 보냄. 지연은 "예정 시각 → 완료"로 측정해
+    서버가 느려질 때 클라이언트 대기(coordinated omission)가 지연에서 빠지지 않게 합니다.
+  - 결과: 지연 히스토그램(p50/p90/p99/p99.9/max), 상태 코드/오류 집계, 처리량 요약 (--json 으로 저장 가능)
+
+사용 예:
+  python -m tools.load_gen --sensors 500 --rate 2 --duration 30
+  python -m tools.load_gen --mode batch --batch-size 100 --sensors 2000 --rate 5 --binary
+  python -m tools.load_gen --mode mqtt --qos 1 --sharded --sensors 1000 --rate 1 --profile burst
+"""
+
+import argparse, asyncio, json, math, random, threading, time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import httpx
+
+from server.services import uplink_codec
+
+BASE_LAT, BASE_LON = 37.2775, 127.7355
+
+
+# ───────────────────────────────────────────────
+# 지연 히스토그램 (로그 버킷, 상대 오차 ~2.5 %)
+# ───────────────────────────────────────────────
+class LatencyHistogram:
+    RATIO = 1.05
+    MIN_US = 10.0
+
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self.n = 0
+        self.max_ms = 0.0
+        self.sum_ms = 0.0
+        self._lock = threading.Lock()           # MQTT 콜백 스레드에서도 기록
+
+    def add(self, ms: float, n: int = 1) -> None:
+        us = max(ms * 1000.0, self.MIN_US)
+        b = int(math.log(us / self.MIN_US, self.RATIO))
+        with self._lock:
+            self.counts[b] += n
+            self.n += n
+            self.sum_ms += ms * n
+            if ms > self.max_ms:
+                self.max_ms = ms
+
+    def percentile(self, q: float) -> float:
+        if not self.n:
+            return 0.0
+        target = q * self.n
+        seen = 0
+        for b in sorted(self.counts):
+            seen += self.counts[b]
+            if seen >= target:
+                # 버킷 중앙값 (ms) — 관측 최댓값을 넘지 않도록 제한
+                return min(self.MIN_US * self.RATIO ** (b + 0.5) / 1000.0, self.max_ms)
+        return self.max_ms
+
+    def summary(self) -> Dict[str, float]:
+        return {"count": self.n, "mean_ms": round(self.sum_ms / max(self.n, 1), 2),
+                **{f"p{str(q * 100).rstrip('0').rstrip('.')}_ms": round(self.percentile(q), 2)
+                   for q in (0.5, 0.9, 0.99, 0.999)},
+                "max_ms": round(self.max_ms, 2)}
+
+
+class Stats:
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.status: Counter = Counter()        # HTTP 상태 코드 / "mqtt_ok"
+        self.errors: Counter = Counter()        # 예외 종류
+        self.events_target = 0.0                # 프로파일상 보내야 할 이벤트 수 (실행 구간 적분)
+        self.events_sent = 0                    # 보낸 이벤트 수 (배치 내 건수 포함)
+        self.max_lag_ms = 0.0                   # 스케줄 대비 최대 지연 (클라이언트가 못 따라간 정도)
+        self.events_ok = 0
+        self.requests = 0                       # HTTP 요청 / MQTT 메시지 수
+        self.per_sec: Counter = Counter()       # 초별 완료 이벤트 수
+        self.elapsed = 0.0
+
+    def done(self, t0: float, scheduled: float, n: int, ok: bool, key) -> None:
+        now = time.perf_counter()
+        self.latency.add((now - scheduled) * 1000.0, n)
+        self.status[key] += 1
+        if ok:
+            self.events_ok += n
+            self.per_sec[int(now - t0)] += n
+
+
+# ───────────────────────────────────────────────
+# 센서 / 페이로드
+# ───────────────────────────────────────────────
+class Sensor:
+    __slots__ = ("sensor_id", "battery", "lat", "lon")
+
+    def __init__(self, i: int, rng: random.Random):
+        self.sensor_id = f"load-{i:05d}"
+        self.battery = rng.uniform(3.7, 4.2)
+        self.lat = BASE_LAT + rng.uniform(-0.02, 0.02)
+        self.lon = BASE_LON + rng.uniform(-0.02, 0.02)
+
+    def event(self, rng: random.Random, binary: bool):
+        self.battery = max(3.3, self.battery - 0.00005)
+        prob = round(rng.betavariate(2, 5), 3)  # 대부분 낮고 가끔 임계값(0.9) 이상
+        if binary:
+            return uplink_codec.encode(self.sensor_id, prob, int(time.time() * 1000), battery=round(self.battery, 3),
+                                       lat=self.lat, lon=self.lon, features=[round(rng.random(), 3)])
+        return {"sensor_id": self.sensor_id, "prob_help": prob, "ts": datetime.now(timezone.utc).isoformat(),
+                "battery": round(self.battery, 3), "features": {"rms": round(rng.random(), 3)},
+                "meta": {"lat": self.lat, "lon": self.lon}}
+
+
+def target_rate(profile: str, base: float, t: float, duration: float, burst_every: float,
+                burst_len: float, burst_mult: float) -> float:
+    """시각 t 의 목표 이벤트/초."""
+    if profile == "ramp":
+        return base * min(t / max(duration, 1e-9), 1.0)
+    if profile == "burst" and (t % burst_every) < burst_len:
+        return base * burst_mult
+    return base
+
+
+# ───────────────────────────────────────────────
+# 전송기
+# ───────────────────────────────────────────────
+class HttpSender:
+    def __init__(self, args, stats: Stats):
+        self.args = args
+        self.stats = stats
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        self.client = httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout)
+        self.sem = asyncio.Semaphore(args.concurrency)
+        self.path = "/ingest/audio/batch" if args.mode == "batch" else "/ingest/audio"
+
+    async def send(self, t0: float, scheduled: float, events: list) -> None:
+        if self.args.binary:
+            kw = {"content": b"".join(events), "headers": {"Content-Type": uplink_codec.CONTENT_TYPE}}
+        else:
+            kw = {"json": events if self.args.mode == "batch" else events[0]}
+        async with self.sem:
+            self.stats.requests += 1
+            try:
+                r = await self.client.post(self.path, **kw)
+                self.stats.done(t0, scheduled, len(events), r.status_code < 400, r.status_code)
+            except Exception as e:
+                self.stats.errors[type(e).__name__] += 1
+                self.stats.done(t0, scheduled, len(events), False, "error")
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class MqttSender:
+    """paho 네트워크 스레드 사용. QoS1 은 PUBACK(on_publish) 시각으로 지연 측정, QoS0 은 소켓 기록 시각."""
+
+    def __init__(self, args, stats: Stats):
+        from paho.mqtt import client as mqtt
+        self.args = args
+        self.stats = stats
+        self._pending: Dict[int, tuple] = {}
+        self._early: Dict[int, float] = {}       # publish() 반환 전에 도착한 PUBACK
+        self._lock = threading.RLock()           # publish() 안에서 on_publish 가 바로 불려도 교착 없음
+        self.client = mqtt.Client(client_id=f"load-gen-{random.randrange(1 << 30)}")
+        self.client.max_inflight_messages_set(args.concurrency)
+        self.client.max_queued_messages_set(0)
+        self.client.on_publish = self._on_publish
+        self.client.connect(args.broker, args.port, 60)
+        self.client.loop_start()
+        self._topic_for = None
+        if args.sharded:
+            from server.services.mqtt_shards import topic_for
+            self._topic_for = topic_for
+
+    def _on_publish(self, client, userdata, mid, *rest):
+        with self._lock:
+            item = self._pending.pop(mid, None)
+            if item is None:
+                self._early[mid] = time.perf_counter()
+                return
+        t0, scheduled, n = item
+        self.stats.done(t0, scheduled, n, True, "mqtt_ok")
+
+    async def send(self, t0: float, scheduled: float, events: list, sensor_id: str) -> None:
+        payload = events[0] if self.args.binary else json.dumps(events[0])
+        topic = self._topic_for(sensor_id) if self._topic_for else "drowni/audio"
+        self.stats.requests += 1
+        with self._lock:
+            info = self.client.publish(topic, payload, qos=self.args.qos)
+            if info.rc != 0:
+                self.stats.errors[f"mqtt_rc_{info.rc}"] += 1
+                self.stats.done(t0, scheduled, 1, False, "error")
+                return
+            early = self._early.pop(info.mid, None)
+            if early is None:
+                self._pending[info.mid] = (t0, scheduled, 1)
+                return
+        self.stats.done(t0, scheduled, 1, True, "mqtt_ok")
+
+    async def close(self) -> None:
+        # 미확인 QoS1 메시지를 잠시 기다린 뒤 종료
+        deadline = time.perf_counter() + 5.0
+        while self._pending and time.perf_counter() < deadline:
+            await asyncio.sleep(0.05)
+        with self._lock:
+            lost = len(self._pending)
+        if lost:
+            self.stats.errors["mqtt_unacked"] += lost
+        self.client.loop_stop()
+        self.client.disconnect()
+
+
+# ───────────────────────────────────────────────
+# 스케줄러 (개방 루프)
+# ───────────────────────────────────────────────
+async def run(args) -> Stats:
+    rng = random.Random(args.seed)
+    sensors = [Sensor(i, rng) for i in range(args.sensors)]
+    stats = Stats()
+    sender = MqttSender(args, stats) if args.mode == "mqtt" else HttpSender(args, stats)
+    base_rate = args.sensors * args.rate
+    tick = 0.01
+    tasks: set = set()
+    carry = 0.0
+    next_sensor = 0
+    batch: List = []
+    batch_sched: Optional[float] = None
+
+    def spawn(coro):
+        task = asyncio.create_task(coro)
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    # 스케줄은 벽시계가 아니라 tick 단위 예정 시각으로 진행: 루프가 밀려도 놓친 tick 의 이벤트를
+    # 그대로 (늦게) 보내고, 지연은 원래 예정 시각부터 잰다 → 목표 건수와 지연이 과소 집계되지 않음
+    t0 = time.perf_counter()
+    i = 0
+    while i * tick < args.duration - 1e-9:
+        t = i * tick
+        next_tick = t0 + t
+        due = target_rate(args.profile, base_rate, t, args.duration, args.burst_every,
+                          args.burst_len, args.burst_mult) * min(tick, args.duration - t)
+        stats.events_target += due
+        carry += due
+        n = int(carry + 1e-9)                   # 부동소수 누적 오차로 마지막 1건이 빠지지 않게
+        carry -= n
+        now = time.perf_counter()
+        stats.max_lag_ms = max(stats.max_lag_ms, (now - next_tick) * 1000.0)
+        for _ in range(n):
+            s = sensors[next_sensor]
+            next_sensor = (next_sensor + 1) % len(sensors)
+            ev = s.event(rng, args.binary)
+            stats.events_sent += 1
+            if args.mode == "batch":
+                if batch_sched is None:
+                    batch_sched = next_tick
+                batch.append(ev)
+                if len(batch) >= args.batch_size:
+                    spawn(sender.send(t0, batch_sched, batch))
+                    batch, batch_sched = [], None
+            elif args.mode == "mqtt":
+                await sender.send(t0, next_tick, [ev], s.sensor_id)
+            else:
+                spawn(sender.send(t0, next_tick, [ev]))
+        # 배치가 오래 차지 않으면(저속) 최대 대기 후 전송
+        if batch and now - batch_sched >= args.batch_wait:
+            spawn(sender.send(t0, batch_sched, batch))
+            batch, batch_sched = [], None
+        i += 1
+        await asyncio.sleep(max(0.0, t0 + i * tick - time.perf_counter()))
+
+    if batch:
+        spawn(sender.send(t0, batch_sched, batch))
+    if tasks:
+        await asyncio.wait(tasks, timeout=args.timeout + 5)
+    await sender.close()
+    stats.elapsed = time.perf_counter() - t0
+    return stats
+
+
+def report(args, stats: Stats) -> dict:
+    elapsed = stats.elapsed
+    timeline = [stats.per_sec.get(i, 0) for i in range(int(math.ceil(elapsed)))]
+    out = {
+        "config": {k: v for k, v in vars(args).items() if k != "json"},
+        "elapsed_s": round(elapsed, 2),
+        "events_target": round(stats.events_target),
+        "events_sent": stats.events_sent,
+        "shortfall": max(round(stats.events_target) - stats.events_sent, 0),
+        "max_schedule_lag_ms": round(stats.max_lag_ms, 2),
+        "events_ok": stats.events_ok,
+        "requests": stats.requests,
+        "error_rate": round(1 - stats.events_ok / max(stats.events_sent, 1), 4),
+        "throughput_eps": round(stats.events_ok / max(elapsed, 1e-9), 1),
+        "peak_eps": max(timeline, default=0),
+        "latency": stats.latency.summary(),
+        "status": {str(k): v for k, v in stats.status.items()},
+        "errors": dict(stats.errors),
+        "timeline_eps": timeline,
+    }
+    lat = out["latency"]
+    print(f"[load_gen] {args.mode} x{args.sensors} sensors @ {args.rate}/s ({args.profile}, "
+          f"{'binary' if args.binary else 'json'}) for {elapsed:.1f}s")
+    print(f"  events   target={out['events_target']} sent={stats.events_sent} ok={stats.events_ok} "
+          f"error_rate={out['error_rate'] * 100:.2f}% requests={stats.requests}")
+    print(f"  schedule shortfall={out['shortfall']} max_lag={out['max_schedule_lag_ms']}ms")
+    print(f"  thruput  {out['throughput_eps']} ev/s (peak {out['peak_eps']} ev/s)")
+    print(f"  latency  p50={lat['p50_ms']}ms p90={lat['p90_ms']}ms p99={lat['p99_ms']}ms "
+          f"p99.9={lat['p99.9_ms']}ms max={lat['max_ms']}ms")
+    print(f"  status   {out['status']}  errors {out['errors']}")
+    return out
+
+
+def main():
+    p = argparse.ArgumentParser(description="Multi-sensor async load generator for ingest / MQTT")
+    p.add_argument("--mode", choices=["http", "batch", "mqtt"], default="http")
+    p.add_argument("--url", default="http://127.0.0.1:8000")
+    p.add_argument("--broker", default="localhost")
+    p.add_argument("--port", type=int, default=1883)
+    p.add_argument("--qos", type=int, choices=[0, 1], default=1)
+    p.add_argument("--sharded", action="store_true", help="publish to drowni/audio/<shard>/<sensor_id>")
+    p.add_argument("--sensors", type=int, default=100)
+    p.add_argument("--rate", type=float, default=1.0, help="events/s per sensor")
+    p.add_argument("--duration", type=float, default=10.0)
+    p.add_argument("--profile", choices=["steady", "burst", "ramp"], default="steady")
+    p.add_argument("--burst-every", type=float, default=10.0)
+    p.add_argument("--burst-len", type=float, default=2.0)
+    p.add_argument("--burst-mult", type=float, default=5.0)
+    p.add_argument("--batch-size", type=int, default=100)
+    p.add_argument("--batch-wait", type=float, default=0.1, help="max seconds to fill a batch")
+    p.add_argument("--binary", action="store_true")
+    p.add_argument("--concurrency", type=int, default=64, help="max in-flight requests / QoS1 messages")
+    p.add_argument("--timeout", type=float, default=10.0)
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--json", help="write the summary as JSON to this path")
+    args = p.parse_args()
+
+    stats = asyncio.run(run(args))
+    out = report(args, stats)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(out, f, indent=2)
+        print(f"[load_gen] Summary written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,22 @@
 # tools/sensor_sim.py
-import time, random, requests
+import sys, time, random, requests
 from datetime import datetime, timezone
 
+from server.services import uplink_codec
+
 URL = "http://127.0.0.1:8000/ingest/audio"
 SENSOR_ID = "sensor-001"
+BINARY = "--binary" in sys.argv     # 압축 바이너리 업링크 (application/x-drowni-uplink)
 
 def one_shot(prob: float | None = None):
     prob_help = prob if prob is not None else round(random.uniform(0.6, 0.99), 3)
+    if BINARY:
+        body = uplink_codec.encode(SENSOR_ID, prob_help, int(time.time() * 1000),
+                                   battery=round(random.uniform(3.4, 4.2), 2),
+                                   lat=37.2775, lon=127.7355, features=[round(random.random(), 3)])
+        r = requests.post(URL, data=body, headers={"Content-Type": uplink_codec.CONTENT_TYPE}, timeout=5)
+        print(f"[{prob_help:.2f}] → {r.status_code}: {r.json()} ({len(body)} B)")
+        return
     payload = {
         "sensor_id": SENSOR_ID,
         "prob_help": prob_help,